@@ -1,18 +1,52 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 import os
+import asyncio
+import time
+import uuid
 import tempfile
 import shutil
 from pathlib import Path
 from dotenv import load_dotenv
-import urllib.request
+from pydantic import BaseModel
 import urllib.parse
+import http.client
+import ssl
+import random
 import json
-from typing import Dict, Any
+import mimetypes
+import re
+import hashlib
+import copy
+import threading
+import contextvars
+import cProfile
+import pstats
+import io
+import zipfile
+import sqlite3
+import wave
+import heapq
+import math
+import bisect
+import itertools
+import operator
+import array
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, Iterator, NamedTuple, Optional, Union
 import logging
 from pydub import AudioSegment
-from pydub.exceptions import CouldntDecodeError
+from pydub.utils import get_prober_name
+
+try:
+    import audioop  # removed from the standard library in Python 3.13
+except ImportError:
+    audioop = None
 
 # Load environment variables
 load_dotenv()
@@ -23,27 +57,138 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="AI Post Report API", version="1.0.0")
 
-# CORS middleware to allow frontend requests
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, specify exact origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
 # Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "./uploads"))
 MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "50"))
 MAX_FILE_SIZE_BYTES = MAX_FILE_SIZE_MB * 1024 * 1024
 
+# Background job configuration
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_EVENTS_HEARTBEAT_SECONDS = 15
+
+# Batch endpoint: recordings per request (zip entries included) and how many run at once
+BATCH_MAX_FILES = int(os.getenv("BATCH_MAX_FILES", "50"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "3"))
+
 # Ensure upload directory exists
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-# OpenAI API endpoints
-OPENAI_TRANSCRIPTION_URL = "https://api.openai.com/v1/audio/transcriptions"
-OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+# Upload writes: read/write buffer for uploads (plain and resumable), where
+# resumable upload sessions keep their data, and how long an idle one lives
+UPLOAD_WRITE_BUFFER_BYTES = int(os.getenv("UPLOAD_WRITE_BUFFER_KB", "1024")) * 1024
+UPLOAD_SESSION_DIR = UPLOAD_DIR / "sessions"
+UPLOAD_SESSION_TTL_SECONDS = int(os.getenv("UPLOAD_SESSION_TTL_SECONDS", "86400"))
+
+# Transcript/report cache configuration
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_DIR = UPLOAD_DIR / "cache"
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", "256"))
+CACHE_DISK_MAX_BYTES = int(os.getenv("CACHE_DISK_MAX_MB", "512")) * 1024 * 1024
+
+# Report store: completed reports are archived in a SQLite database with a
+# full-text index (GET /api/reports); a background task commits them in
+# batches of up to REPORT_STORE_BATCH_SIZE, waiting REPORT_STORE_FLUSH_SECONDS
+# after the first so a burst lands in one transaction
+REPORT_STORE_ENABLED = os.getenv("REPORT_STORE_ENABLED", "true").lower() == "true"
+REPORT_STORE_PATH = Path(os.getenv("REPORT_STORE_PATH", str(UPLOAD_DIR / "reports.db")))
+REPORT_STORE_BATCH_SIZE = int(os.getenv("REPORT_STORE_BATCH_SIZE", "200"))
+REPORT_STORE_FLUSH_SECONDS = float(os.getenv("REPORT_STORE_FLUSH_SECONDS", "0.5"))
+REPORT_STORE_QUEUE_SIZE = int(os.getenv("REPORT_STORE_QUEUE_SIZE", "10000"))
+REPORT_STORE_PAGE_SIZE_MAX = 100
+
+# Chat model and prompt version; bump REPORT_PROMPT_VERSION whenever the
+# extraction prompt changes so cached reports from the old prompt are ignored
+CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-4")
+TRANSCRIPTION_MODEL = "whisper-1"
+REPORT_PROMPT_VERSION = "1"
+
+# OpenAI API endpoints (base URL is overridable so a local stub can stand in)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_TRANSCRIPTION_PATH = "/audio/transcriptions"
+OPENAI_CHAT_PATH = "/chat/completions"
+
+# Upstream HTTP client configuration
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "8"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+UPSTREAM_BACKOFF_BASE_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_BASE_SECONDS", "0.5"))
+UPSTREAM_BACKOFF_MAX_SECONDS = float(os.getenv("UPSTREAM_BACKOFF_MAX_SECONDS", "8"))
+TRANSCRIPTION_TIMEOUT_SECONDS = float(os.getenv("TRANSCRIPTION_TIMEOUT_SECONDS", "300"))
+CHAT_TIMEOUT_SECONDS = float(os.getenv("CHAT_TIMEOUT_SECONDS", "120"))
+# Upstream admission control: concurrency and per-minute budgets for each
+# lane (0 = learn the limit from the API's rate-limit headers), and how many
+# calls may wait for a slot before new work is refused with 429
+TRANSCRIPTION_MAX_CONCURRENCY = int(os.getenv("TRANSCRIPTION_MAX_CONCURRENCY", "8"))
+TRANSCRIPTION_REQUESTS_PER_MINUTE = int(os.getenv("TRANSCRIPTION_REQUESTS_PER_MINUTE", "0"))
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "8"))
+CHAT_REQUESTS_PER_MINUTE = int(os.getenv("CHAT_REQUESTS_PER_MINUTE", "0"))
+CHAT_TOKENS_PER_MINUTE = int(os.getenv("CHAT_TOKENS_PER_MINUTE", "0"))
+CHAT_COMPLETION_TOKEN_ESTIMATE = int(os.getenv("CHAT_COMPLETION_TOKEN_ESTIMATE", "1000"))
+ADMISSION_QUEUE_LIMIT = int(os.getenv("ADMISSION_QUEUE_LIMIT", "64"))
+# In-flight limits for requests that do their work outside the job queue (0 = no limit)
+SYNC_REQUEST_MAX_CONCURRENCY = int(os.getenv("SYNC_REQUEST_MAX_CONCURRENCY", "16"))
+BATCH_REQUEST_MAX_CONCURRENCY = int(os.getenv("BATCH_REQUEST_MAX_CONCURRENCY", "2"))
+# Stream chat completions in job mode so report sections are published as they finish
+REPORT_STREAMING = os.getenv("REPORT_STREAMING", "true").lower() == "true"
+UPLOAD_STREAM_CHUNK_BYTES = int(os.getenv("UPLOAD_STREAM_CHUNK_BYTES", str(64 * 1024)))
+
+# Report extraction engine: "sharded" queries REPORT_FIELD_GROUPS concurrently,
+# "single" asks for every field in one completion. Transcripts longer than the
+# token budget are extracted piece by piece and merged per field.
+REPORT_EXTRACTION_MODE = os.getenv("REPORT_EXTRACTION_MODE", "sharded").lower()
+REPORT_TRANSCRIPT_TOKEN_BUDGET = int(os.getenv("REPORT_TRANSCRIPT_TOKEN_BUDGET", "6000"))
+REPORT_MAX_PARALLEL_REQUESTS = int(os.getenv("REPORT_MAX_PARALLEL_REQUESTS", "8"))
+
+# Transcript compaction before extraction: "off", "light" (whitespace, fillers,
+# false starts, repeated phrases) or "relevant" (light, then only sentences
+# that touch a report section, with this many neighbours either side)
+TRANSCRIPT_COMPACTION = os.getenv("TRANSCRIPT_COMPACTION", "light").lower()
+TRANSCRIPT_COMPACTION_CONTEXT_SENTENCES = int(os.getenv("TRANSCRIPT_COMPACTION_CONTEXT_SENTENCES", "1"))
+TRANSCRIPT_COMPACTION_MAX_NGRAM = 6
+# "relevant" falls back to light compaction when it would keep less than this share of the text
+TRANSCRIPT_COMPACTION_MIN_RELEVANT_FRACTION = 0.2
+
+# Segmented transcription: "auto" chunks recordings longer than one chunk
+# (or over Whisper's upload limit), "always"/"never" force the choice
+TRANSCRIPTION_SEGMENT_MODE = os.getenv("TRANSCRIPTION_SEGMENT_MODE", "auto").lower()
+TRANSCRIPTION_CHUNK_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_SECONDS", "600"))
+TRANSCRIPTION_CHUNK_OVERLAP_SECONDS = float(os.getenv("TRANSCRIPTION_CHUNK_OVERLAP_SECONDS", "5"))
+TRANSCRIPTION_MAX_PARALLEL_CHUNKS = int(os.getenv("TRANSCRIPTION_MAX_PARALLEL_CHUNKS", "8"))
+WHISPER_MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+
+# Live transcription: recordings streamed to /api/live/ws are transcribed in
+# LIVE_SEGMENT_SECONDS pieces while the session is still being recorded
+LIVE_SEGMENT_SECONDS = float(os.getenv("LIVE_SEGMENT_SECONDS", "30"))
+LIVE_SEGMENT_OVERLAP_SECONDS = float(os.getenv("LIVE_SEGMENT_OVERLAP_SECONDS", "2"))
+LIVE_MAX_PARALLEL_SEGMENTS = int(os.getenv("LIVE_MAX_PARALLEL_SEGMENTS", "2"))
+LIVE_MAX_SESSION_SECONDS = float(os.getenv("LIVE_MAX_SESSION_SECONDS", str(4 * 3600)))
+
+# Audio transcoding: profile is one of AUDIO_PROFILES ("speech", "speech-opus",
+# "full"); uploads already in a Whisper format are only re-encoded when their
+# bitrate exceeds the profile's by AUDIO_REENCODE_MIN_RATIO
+AUDIO_TRANSCODE_PROFILE = os.getenv("AUDIO_TRANSCODE_PROFILE", "speech").lower()
+AUDIO_REENCODE_MIN_RATIO = float(os.getenv("AUDIO_REENCODE_MIN_RATIO", "2"))
+TRANSCODE_MAX_CONCURRENCY = int(os.getenv("TRANSCODE_MAX_CONCURRENCY", str(os.cpu_count() or 2)))
+TRANSCODE_TIMEOUT_SECONDS = float(os.getenv("TRANSCODE_TIMEOUT_SECONDS", "600"))
+
+# Silence trimming while transcoding: silent runs (frame level below
+# SILENCE_THRESHOLD_DB dBFS) longer than SILENCE_MIN_SECONDS are cut down to
+# SILENCE_PADDING_SECONDS on either side. Only recordings that have to be
+# re-encoded anyway and last at least SILENCE_TRIM_MIN_DURATION_SECONDS are trimmed.
+SILENCE_TRIM_ENABLED = os.getenv("SILENCE_TRIM_ENABLED", "true").lower() == "true"
+SILENCE_TRIM_MIN_DURATION_SECONDS = float(os.getenv("SILENCE_TRIM_MIN_DURATION_SECONDS", "60"))
+SILENCE_THRESHOLD_DB = float(os.getenv("SILENCE_THRESHOLD_DB", "-45"))
+SILENCE_MIN_SECONDS = float(os.getenv("SILENCE_MIN_SECONDS", "1.5"))
+SILENCE_PADDING_SECONDS = float(os.getenv("SILENCE_PADDING_SECONDS", "0.4"))
+
+# Per-request profiling: requests carrying an X-Profile header (equal to
+# PROFILING_TOKEN, if one is set) are run under cProfile
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_DIR = UPLOAD_DIR / "profiles"
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
 
 # Check OpenAI API key
 if OPENAI_API_KEY and OPENAI_API_KEY.strip():
@@ -53,6 +198,912 @@ else:
     print("❌ OpenAI API key not found in environment variables")
     api_available = False
 
+# ---------------------------------------------------------------------------
+# Metrics and timing
+#
+# Pipeline stages, upstream calls and HTTP requests are recorded in a small
+# in-process registry exposed in Prometheus text format at /metrics. The
+# stage durations of the current request are also collected through a
+# context variable, which follows the request into any tasks it starts, and
+# returned in a Server-Timing header. Background jobs keep theirs in the
+# job's `timings` field. With PROFILING_ENABLED, sending an X-Profile header
+# runs that request under cProfile.
+# ---------------------------------------------------------------------------
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+class Metric:
+    """One Prometheus metric family (counter, gauge or histogram) with labelled series"""
+    
+    def __init__(self, name: str, kind: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.kind = kind
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series: Dict[tuple, Any] = {}
+        # Upstream calls record from worker threads as well as the event loop
+        self._lock = threading.Lock()
+    
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+    
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._series[tuple(sorted(labels.items()))] = value
+    
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+    
+    @staticmethod
+    def _labels(pairs: Iterable[tuple]) -> str:
+        escaped = []
+        for key, value in pairs:
+            value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            escaped.append(f'{key}="{value}"')
+        return "{" + ",".join(escaped) + "}" if escaped else ""
+    
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = copy.deepcopy(self._series)
+        for key, value in sorted(series.items()):
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{self._labels(key)} {value:g}")
+                continue
+            for bound, count in zip(self.buckets, value["buckets"]):
+                lines.append(f"{self.name}_bucket{self._labels(key + (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{self.name}_bucket{self._labels(key + (('le', '+Inf'),))} {value['count']}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {value['sum']:.6f}")
+            lines.append(f"{self.name}_count{self._labels(key)} {value['count']}")
+        return lines
+
+class MetricsRegistry:
+    """Named metrics in registration order"""
+    
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+    
+    def counter(self, name: str, help_text: str) -> Metric:
+        return self._metrics.setdefault(name, Metric(name, "counter", help_text))
+    
+    def gauge(self, name: str, help_text: str) -> Metric:
+        return self._metrics.setdefault(name, Metric(name, "gauge", help_text))
+    
+    def histogram(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS) -> Metric:
+        return self._metrics.setdefault(name, Metric(name, "histogram", help_text, buckets))
+    
+    def render(self) -> str:
+        return "\n".join(line for metric in self._metrics.values() for line in metric.render()) + "\n"
+
+metrics = MetricsRegistry()
+
+HTTP_REQUESTS = metrics.counter("http_requests_total", "HTTP requests by method, route and status")
+HTTP_REQUEST_SECONDS = metrics.histogram("http_request_duration_seconds", "HTTP request latency (until the response body is sent)")
+HTTP_IN_FLIGHT = metrics.gauge("http_requests_in_flight", "HTTP requests being handled")
+STAGE_SECONDS = metrics.histogram("pipeline_stage_duration_seconds", "Duration of each audio pipeline stage")
+STAGE_IN_FLIGHT = metrics.gauge("pipeline_stage_in_flight", "Pipeline stages currently running")
+STAGE_BYTES_IN = metrics.counter("pipeline_stage_bytes_in_total", "Bytes consumed by each pipeline stage")
+STAGE_BYTES_OUT = metrics.counter("pipeline_stage_bytes_out_total", "Bytes produced by each pipeline stage")
+UPSTREAM_ATTEMPTS = metrics.counter("upstream_attempts_total", "Upstream API attempts by endpoint and status (or connection_error/timeout)")
+UPSTREAM_RETRIES = metrics.counter("upstream_retries_total", "Upstream API retries by endpoint and reason")
+UPSTREAM_SECONDS = metrics.histogram("upstream_request_duration_seconds", "Upstream API call latency, including retries")
+UPSTREAM_IN_FLIGHT = metrics.gauge("upstream_requests_in_flight", "Upstream API calls in progress")
+
+class RequestTimings:
+    """Stage durations for one request or job (summed when a stage runs more than once)"""
+    
+    def __init__(self):
+        self.stages: Dict[str, list] = {}
+        self.retries = 0
+        self.values: Dict[str, float] = {}   # other per-request figures (token counts, silence removed)
+    
+    def add(self, stage: str, seconds: float):
+        totals = self.stages.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """Milliseconds per stage, plus the upstream retry count and any recorded values"""
+        result: Dict[str, Any] = {stage: round(seconds * 1000, 1) for stage, (seconds, _) in self.stages.items()}
+        result["upstream_retries"] = self.retries
+        result.update(self.values)
+        return result
+    
+    def header(self, total_seconds: float) -> str:
+        """Server-Timing header value"""
+        entries = [
+            f'{stage};dur={seconds * 1000:.1f}' + (f';desc="{count} calls"' if count > 1 else "")
+            for stage, (seconds, count) in self.stages.items()
+        ]
+        if self.retries:
+            entries.append(f'retries;desc="{self.retries} upstream retries"')
+        entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+_request_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar("request_timings", default=None)
+
+class StageTimer:
+    """
+    Context manager timing one pipeline stage. Set `bytes_out` before the
+    block ends; duration, bytes and outcome go to the stage metrics, the
+    current request's timings and (unless `log=False`) the log.
+    """
+    
+    def __init__(self, stage: str, bytes_in: int = 0, log: bool = True):
+        self.stage = stage
+        self.bytes_in = bytes_in
+        self.bytes_out = 0
+        self.log = log
+    
+    def __enter__(self) -> "StageTimer":
+        STAGE_IN_FLIGHT.inc(stage=self.stage)
+        self.started = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        outcome = "ok" if exc_type is None else "error"
+        STAGE_IN_FLIGHT.inc(-1, stage=self.stage)
+        STAGE_SECONDS.observe(elapsed, stage=self.stage, outcome=outcome)
+        STAGE_BYTES_IN.inc(self.bytes_in, stage=self.stage)
+        STAGE_BYTES_OUT.inc(self.bytes_out, stage=self.stage)
+        
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.add(self.stage, elapsed)
+        if self.log:
+            logger.info(
+                f"Stage {self.stage} {'finished' if outcome == 'ok' else 'failed'} in {elapsed * 1000:.0f} ms "
+                f"({self.bytes_in} bytes in, {self.bytes_out} bytes out)"
+            )
+        return False
+
+_profiler_active = False
+
+def _start_profiler(scope: Dict[str, Any]) -> Optional[cProfile.Profile]:
+    """Start cProfile if the request asked for it and no other profile is running"""
+    global _profiler_active
+    if not PROFILING_ENABLED or _profiler_active:
+        return None
+    requested = dict(scope.get("headers", [])).get(b"x-profile")
+    if requested is None or (PROFILING_TOKEN and requested.decode("latin-1") != PROFILING_TOKEN):
+        return None
+    
+    # cProfile hooks the whole event loop thread, so concurrent requests show up
+    # in the profile too; only one request is profiled at a time
+    _profiler_active = True
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def _save_profile(profiler: cProfile.Profile, profile_id: str):
+    """Write the profile and keep only the newest PROFILE_KEEP files (runs in a thread)"""
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(PROFILE_DIR / f"{profile_id}.prof")
+    profiles = sorted(PROFILE_DIR.glob("*.prof"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for old_profile in profiles[PROFILE_KEEP:]:
+        old_profile.unlink(missing_ok=True)
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request latency/in-flight metrics, adding the
+    Server-Timing header, and profiling requests that ask for it
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        global _profiler_active
+        method = scope["method"]
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = 500
+        profiler = _start_profiler(scope)
+        profile_id = uuid.uuid4().hex if profiler else None
+        HTTP_IN_FLIGHT.inc(method=method)
+        
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.header(time.perf_counter() - started).encode("latin-1")))
+                if profile_id:
+                    headers.append((b"x-profile-id", profile_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_IN_FLIGHT.inc(-1, method=method)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status))
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=method, route=route)
+            _request_timings.reset(token)
+            
+            if profiler:
+                profiler.disable()
+                _profiler_active = False
+                await asyncio.to_thread(_save_profile, profiler, profile_id)
+                logger.info(f"Profiled {method} {scope['path']} ({elapsed * 1000:.0f} ms) as {profile_id}")
+
+# ---------------------------------------------------------------------------
+# Upstream admission control
+#
+# Every upstream call waits for a slot in its lane ("transcription" or
+# "chat"). A lane has its own concurrency limit and per-minute request and
+# token budgets. Waiting calls are served in priority order: interactive
+# requests before batch work, oldest first. Rate-limit headers on each
+# response keep the budgets in line with what the API reports. A 429 pauses
+# the lane until the API's reset time and halves its concurrency, which then
+# grows back as calls succeed. New work is refused with 429 and Retry-After
+# while too many calls are already waiting, instead of queueing without bound.
+# ---------------------------------------------------------------------------
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BATCH: "batch"}
+
+# Priority of the upstream calls made on behalf of the current request or job
+_request_priority: contextvars.ContextVar[int] = contextvars.ContextVar("request_priority", default=PRIORITY_INTERACTIVE)
+
+ADMISSION_WAIT_SECONDS = metrics.histogram("upstream_admission_wait_seconds", "Time upstream calls waited for a lane slot")
+ADMISSION_WAITING = metrics.gauge("upstream_admission_waiting", "Upstream calls waiting for a lane slot")
+ADMISSION_CONCURRENCY = metrics.gauge("upstream_admission_concurrency", "Current (adaptive) concurrency limit per lane")
+ADMISSION_THROTTLED = metrics.counter("upstream_throttled_total", "Upstream 429 responses that paused a lane")
+ADMISSION_REJECTED = metrics.counter("admission_rejected_total", "Requests refused with 429 because the server was saturated")
+
+def _parse_reset_seconds(value: Optional[str]) -> Optional[float]:
+    """Seconds in a rate-limit reset header ("20ms", "6m0s", "1h2m3.5s" or a plain number)"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|s|m|h)", value)
+    return sum(float(amount) * units[unit] for amount, unit in parts) if parts else None
+
+def _header_int(headers: Dict[str, str], name: str) -> Optional[int]:
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+class RateBudget:
+    """
+    Token bucket holding up to `per_minute` units, refilled continuously.
+    A budget of 0 is unlimited until the upstream reports a limit.
+    """
+    
+    def __init__(self, per_minute: float):
+        self.configured = per_minute
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        if self.per_minute > 0:
+            self.level = min(self.per_minute, self.level + (now - self.updated) * self.per_minute / 60)
+        self.updated = now
+    
+    def wait_time(self, cost: float, now: float) -> float:
+        """Seconds until `cost` units are available"""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill(now)
+        cost = min(cost, self.per_minute)
+        return max(0.0, (cost - self.level) * 60 / self.per_minute)
+    
+    def take(self, cost: float, now: float):
+        if self.per_minute > 0:
+            self._refill(now)
+            self.level -= min(cost, self.per_minute)
+    
+    def sync(self, limit: Optional[int], remaining: Optional[int], now: float):
+        """Adopt the upstream's view: never plan for more than it says is left"""
+        self._refill(now)
+        if limit:
+            if self.per_minute <= 0:
+                # First limit learned: start from a full bucket, trimmed to `remaining` below
+                self.level = float(limit)
+            self.per_minute = min(self.configured, limit) if self.configured > 0 else limit
+        if remaining is not None and self.per_minute > 0:
+            self.level = min(self.level, remaining)
+
+class UpstreamLane:
+    """Concurrency limit, per-minute budgets and priority queue for one kind of upstream call"""
+    
+    def __init__(self, name: str, max_concurrency: int, requests_per_minute: int = 0, tokens_per_minute: int = 0):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = self.max_concurrency
+        self.requests = RateBudget(requests_per_minute)
+        self.tokens = RateBudget(tokens_per_minute)
+        self.active = 0
+        self.paused_until = 0.0
+        self.average_seconds = 5.0   # smoothed slot hold time, for Retry-After estimates
+        self._waiters: list[list] = []
+        self._sequence = 0
+        self._successes = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        ADMISSION_CONCURRENCY.set(self.concurrency, lane=name)
+    
+    @property
+    def waiting(self) -> int:
+        return sum(1 for entry in self._waiters if not entry[3].done())
+    
+    async def acquire(self, cost: int = 0) -> float:
+        """Wait for a slot (in priority order) and return when it was granted"""
+        priority = _request_priority.get()
+        future = asyncio.get_running_loop().create_future()
+        self._sequence += 1
+        heapq.heappush(self._waiters, [priority, self._sequence, cost, future])
+        started = time.perf_counter()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just before the cancellation arrived: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._dispatch()
+            raise
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - started, lane=self.name, priority=PRIORITY_NAMES.get(priority, str(priority)))
+        return time.perf_counter()
+    
+    def release(self, granted_at: Optional[float] = None):
+        self.active -= 1
+        if granted_at is not None:
+            self.average_seconds += 0.2 * (time.perf_counter() - granted_at - self.average_seconds)
+        self._dispatch()
+    
+    def _dispatch(self):
+        """Grant slots to the head of the queue while concurrency and budgets allow"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        while self._waiters:
+            _, _, cost, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self.active >= self.concurrency:
+                break
+            now = time.monotonic()
+            delay = max(self.paused_until - now, self.requests.wait_time(1, now), self.tokens.wait_time(cost, now))
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                break
+            heapq.heappop(self._waiters)
+            self.requests.take(1, now)
+            self.tokens.take(cost, now)
+            self.active += 1
+            future.set_result(None)
+        
+        ADMISSION_WAITING.set(self.waiting, lane=self.name)
+    
+    def observe(self, status: int, headers: Dict[str, str]):
+        """Adapt to an upstream response: sync budgets from its headers, back off on 429"""
+        now = time.monotonic()
+        self.requests.sync(
+            _header_int(headers, "x-ratelimit-limit-requests"), _header_int(headers, "x-ratelimit-remaining-requests"), now
+        )
+        self.tokens.sync(
+            _header_int(headers, "x-ratelimit-limit-tokens"), _header_int(headers, "x-ratelimit-remaining-tokens"), now
+        )
+        
+        if status == 429:
+            wait = (
+                _parse_reset_seconds(headers.get("retry-after"))
+                or max(
+                    _parse_reset_seconds(headers.get("x-ratelimit-reset-requests")) or 0,
+                    _parse_reset_seconds(headers.get("x-ratelimit-reset-tokens")) or 0,
+                )
+                or 1.0
+            )
+            self.paused_until = max(self.paused_until, now + wait)
+            self.concurrency = max(1, self.concurrency // 2)
+            self._successes = 0
+            ADMISSION_THROTTLED.inc(lane=self.name)
+            logger.warning(f"Upstream {self.name} rate limited; pausing {wait:.1f}s, concurrency now {self.concurrency}")
+        elif 200 <= status < 300:
+            if _header_int(headers, "x-ratelimit-remaining-requests") == 0:
+                self.paused_until = max(self.paused_until, now + (_parse_reset_seconds(headers.get("x-ratelimit-reset-requests")) or 1.0))
+            # Additive increase: one more slot after a full window of successes
+            self._successes += 1
+            if self.concurrency < self.max_concurrency and self._successes >= self.concurrency:
+                self.concurrency += 1
+                self._successes = 0
+        
+        ADMISSION_CONCURRENCY.set(self.concurrency, lane=self.name)
+        self._dispatch()
+    
+    def retry_after(self) -> int:
+        """Rough seconds until a newly queued call would get a slot"""
+        backlog = (self.waiting + self.active) / self.concurrency
+        seconds = max(self.paused_until - time.monotonic(), backlog * self.average_seconds)
+        return min(300, max(1, math.ceil(seconds)))
+
+class UpstreamScheduler:
+    """The lanes upstream calls are admitted through, keyed by API path"""
+    
+    def __init__(self, lanes: Dict[str, UpstreamLane], queue_limit: int):
+        self.lanes = lanes
+        self.queue_limit = queue_limit
+    
+    def lane(self, path: str) -> Optional[UpstreamLane]:
+        return self.lanes.get(path)
+    
+    @property
+    def waiting(self) -> int:
+        return sum(lane.waiting for lane in self.lanes.values())
+    
+    def saturated(self) -> bool:
+        return self.waiting >= self.queue_limit
+    
+    def retry_after(self) -> int:
+        return max(lane.retry_after() for lane in self.lanes.values())
+    
+    def busy_error(self, detail: str = "Server is busy. Please try again shortly.") -> HTTPException:
+        return HTTPException(status_code=429, detail=detail, headers={"Retry-After": str(self.retry_after())})
+
+def chat_token_cost(payload: Dict[str, Any]) -> int:
+    """Tokens a chat completion counts against the budget: prompt estimate plus completion allowance"""
+    prompt = "".join(message["content"] for message in payload["messages"])
+    return estimate_tokens(prompt) + payload.get("max_tokens", CHAT_COMPLETION_TOKEN_ESTIMATE)
+
+upstream_scheduler = UpstreamScheduler(
+    {
+        OPENAI_TRANSCRIPTION_PATH: UpstreamLane(
+            "transcription", TRANSCRIPTION_MAX_CONCURRENCY, requests_per_minute=TRANSCRIPTION_REQUESTS_PER_MINUTE
+        ),
+        OPENAI_CHAT_PATH: UpstreamLane(
+            "chat", CHAT_MAX_CONCURRENCY, requests_per_minute=CHAT_REQUESTS_PER_MINUTE, tokens_per_minute=CHAT_TOKENS_PER_MINUTE
+        ),
+    },
+    queue_limit=ADMISSION_QUEUE_LIMIT,
+)
+
+def upstream_rate_limited(path: str) -> HTTPException:
+    """429 for a call that stayed rate limited through all its retries"""
+    lane = upstream_scheduler.lane(path)
+    retry_after = lane.retry_after() if lane else 1
+    return HTTPException(
+        status_code=429,
+        detail="OpenAI rate limit reached. Please try again shortly.",
+        headers={"Retry-After": str(retry_after)},
+    )
+
+class AdmissionMiddleware:
+    """
+    Refuse requests that would start new upstream work with 429 while the
+    server is saturated, before their upload body is read. Routes that queue
+    a job are also refused while the job queue is full; synchronous and batch
+    routes are instead held to their own in-flight limits.
+    """
+    
+    JOB_ROUTE = re.compile(r"/api/post-report/audio/jobs|/api/uploads/[^/]+/finalize")
+    
+    def __init__(self, app):
+        self.app = app
+        self.limits = {"sync": SYNC_REQUEST_MAX_CONCURRENCY, "batch": BATCH_REQUEST_MAX_CONCURRENCY}
+        self.in_flight = {kind: 0 for kind in self.limits}
+    
+    async def __call__(self, scope, receive, send):
+        kind = self._route_kind(scope) if scope["type"] == "http" else None
+        if kind is None:
+            await self.app(scope, receive, send)
+            return
+        
+        if upstream_scheduler.saturated():
+            reason = "upstream"
+        elif kind == "jobs" and job_queue.full():
+            reason = "jobs"
+        elif self.limits.get(kind) and self.in_flight[kind] >= self.limits[kind]:
+            reason = kind
+        else:
+            reason = None
+        if reason:
+            ADMISSION_REJECTED.inc(reason=reason)
+            error = upstream_scheduler.busy_error()
+            response = JSONResponse(status_code=error.status_code, content={"detail": error.detail}, headers=error.headers)
+            await response(scope, receive, send)
+            return
+        
+        if kind not in self.in_flight:
+            await self.app(scope, receive, send)
+            return
+        self.in_flight[kind] += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight[kind] -= 1
+    
+    def _route_kind(self, scope) -> Optional[str]:
+        """"jobs", "batch", "sync" or "upload" for POSTs that lead to upstream work, else None"""
+        path = scope["path"]
+        if scope["method"] != "POST":
+            return None
+        if self.JOB_ROUTE.fullmatch(path):
+            return "jobs"
+        if path == "/api/post-report/audio/batch":
+            return "batch"
+        if path.startswith("/api/post-report/"):
+            return "sync"
+        if path == "/api/uploads":
+            return "upload"
+        return None
+
+app.add_middleware(AdmissionMiddleware)
+
+# Registered after admission control so it wraps it: requests refused with
+# 429 still show up in the request and latency metrics
+app.add_middleware(MetricsMiddleware)
+
+# CORS middleware to allow frontend requests. Registered last so it wraps the
+# other middleware and its headers are also on their responses (e.g. 429s).
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],  # In production, specify exact origins
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Retry-After"],
+)
+
+# ---------------------------------------------------------------------------
+# Upstream HTTP client
+#
+# One shared client talks to the OpenAI-compatible API. Requests go through
+# http.client on a small dedicated thread pool, so the event loop keeps
+# serving other requests while an upload is being transcribed, and each
+# connection is kept alive and reused across calls. 429/5xx responses and
+# dropped connections are retried with jittered exponential backoff.
+# ---------------------------------------------------------------------------
+
+class UpstreamError(Exception):
+    """Non-2xx response from the upstream API (after any retries)"""
+    
+    def __init__(self, status: int, body: str):
+        self.status = status
+        self.body = body
+        super().__init__(f"OpenAI API error: {status} - {body}")
+
+# A request body is either bytes or a factory returning a fresh iterator of
+# byte chunks (called once per attempt, so streamed bodies survive retries)
+RequestBody = Union[bytes, Callable[[], Iterable[bytes]], None]
+
+class UpstreamResponse(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    
+    def json(self) -> Any:
+        return json.loads(self.body.decode('utf-8'))
+
+class UpstreamClient:
+    """
+    Keep-alive connection pool for a single upstream base URL.
+    
+    At most `pool_size` requests are in flight at once; idle connections are
+    parked and reused. Cancelling the awaiting coroutine (or hitting the
+    per-call timeout) closes the underlying socket so the worker thread is
+    released promptly.
+    """
+    
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = 8,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        headers: Optional[Dict[str, str]] = None,
+        scheduler: Optional[UpstreamScheduler] = None,
+    ):
+        parsed = urllib.parse.urlsplit(base_url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"Invalid upstream base URL: {base_url}")
+        
+        self.scheme = parsed.scheme
+        self.host = parsed.hostname
+        self.port = parsed.port
+        self.base_path = parsed.path.rstrip("/")
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.headers = headers or {}
+        self.scheduler = scheduler
+        
+        self._ssl_context = ssl.create_default_context() if self.scheme == "https" else None
+        self._idle: list[http.client.HTTPConnection] = []
+        self._slots = asyncio.Semaphore(pool_size)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="upstream")
+    
+    def _connect(self, timeout: float) -> http.client.HTTPConnection:
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout, context=self._ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+    
+    @staticmethod
+    def _roundtrip(conn: http.client.HTTPConnection, method: str, url: str, body, headers: Dict[str, str]):
+        """Blocking request/response on `conn` (runs in the executor)"""
+        conn.request(method, url, body=body, headers=headers)
+        response = conn.getresponse()
+        data = response.read()
+        response_headers = {key.lower(): value for key, value in response.getheaders()}
+        return response.status, response_headers, data, not response.will_close
+    
+    async def _send(self, method: str, path: str, body: RequestBody, headers: Dict[str, str], timeout: float) -> UpstreamResponse:
+        if callable(body):
+            # Iterated by http.client in the worker thread, so file reads stay off the loop
+            body = body()
+        
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else self._connect(timeout)
+            conn.timeout = timeout
+            if conn.sock is not None:
+                conn.sock.settimeout(timeout)
+            
+            loop = asyncio.get_running_loop()
+            try:
+                status, response_headers, data, reusable = await loop.run_in_executor(
+                    self._executor, self._roundtrip, conn, method, self.base_path + path, body, headers
+                )
+            except BaseException:
+                # Covers cancellation too: closing the socket unblocks the worker thread
+                conn.close()
+                raise
+            
+            if reusable and len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+            else:
+                conn.close()
+            
+            return UpstreamResponse(status, response_headers, data)
+    
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), self.backoff_max))
+            except ValueError:
+                pass
+        return delay
+    
+    @staticmethod
+    def _record_attempt(path: str, status: str, retrying: bool):
+        UPSTREAM_ATTEMPTS.inc(endpoint=path, status=status)
+        if retrying:
+            UPSTREAM_RETRIES.inc(endpoint=path, reason=status)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.retries += 1
+    
+    @contextmanager
+    def _timed_call(self, path: str):
+        """Latency and in-flight metrics for one logical call, across all its attempts"""
+        UPSTREAM_IN_FLIGHT.inc(endpoint=path)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        except (GeneratorExit, asyncio.CancelledError):
+            outcome = "cancelled"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            UPSTREAM_IN_FLIGHT.inc(-1, endpoint=path)
+            UPSTREAM_SECONDS.observe(elapsed, endpoint=path, outcome=outcome)
+            timings = _request_timings.get()
+            if timings is not None:
+                timings.add("upstream", elapsed)
+    
+    async def request(
+        self,
+        method: str,
+        path: str,
+        body: RequestBody = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 60.0,
+        cost: int = 0,
+    ) -> UpstreamResponse:
+        """
+        Send a request relative to the base URL and return the 2xx response.
+        Streamed (callable) bodies must come with a Content-Length header.
+        Each attempt first waits for a slot in the scheduler lane for `path`;
+        `cost` is the attempt's estimated tokens against the lane's budget.
+        Raises UpstreamError for non-retryable or exhausted error responses and
+        TimeoutError when a single attempt exceeds `timeout` seconds.
+        """
+        request_headers = {**self.headers, **(headers or {})}
+        lane = self.scheduler.lane(path) if self.scheduler else None
+        with self._timed_call(path):
+            attempt = 0
+            
+            while True:
+                granted_at = await lane.acquire(cost) if lane else None
+                try:
+                    response = await asyncio.wait_for(
+                        self._send(method, path, body, request_headers, timeout), timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    self._record_attempt(path, "timeout", retrying=False)
+                    raise TimeoutError(f"OpenAI API request timed out after {timeout:.0f}s")
+                except (http.client.HTTPException, OSError) as e:
+                    self._record_attempt(path, "connection_error", retrying=attempt < self.max_retries)
+                    if attempt >= self.max_retries:
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning(f"Upstream {method} {path} connection error ({e}); retrying in {delay:.1f}s")
+                else:
+                    if lane:
+                        lane.observe(response.status, response.headers)
+                    retrying = response.status in self.RETRY_STATUSES and attempt < self.max_retries
+                    self._record_attempt(path, str(response.status), retrying=retrying)
+                    if 200 <= response.status < 300:
+                        return response
+                    if response.status not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                        raise UpstreamError(response.status, response.body.decode('utf-8', errors='replace'))
+                    delay = self._backoff(attempt, response.headers.get("retry-after"))
+                    logger.warning(f"Upstream {method} {path} returned {response.status}; retrying in {delay:.1f}s")
+                finally:
+                    if lane:
+                        lane.release(granted_at)
+                
+                attempt += 1
+                await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _start_stream(conn: http.client.HTTPConnection, method: str, url: str, body, headers: Dict[str, str]):
+        """Send the request and return the response once its headers arrive (runs in the executor)"""
+        conn.request(method, url, body=body, headers=headers)
+        return conn.getresponse()
+    
+    async def stream_lines(
+        self,
+        method: str,
+        path: str,
+        body: RequestBody = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = 60.0,
+        cost: int = 0,
+    ) -> AsyncIterator[str]:
+        """
+        Send a request and yield the response body line by line as it arrives
+        (e.g. a server-sent event stream). Error responses are retried like
+        request(); `timeout` bounds each wait for data, not the whole stream.
+        The lane slot is held until the stream ends.
+        """
+        request_headers = {**self.headers, **(headers or {})}
+        lane = self.scheduler.lane(path) if self.scheduler else None
+        loop = asyncio.get_running_loop()
+        with self._timed_call(path):
+            attempt = 0
+            
+            while True:
+                payload = body() if callable(body) else body
+                granted_at = await lane.acquire(cost) if lane else None
+                try:
+                    await self._slots.acquire()
+                except BaseException:
+                    if lane:
+                        lane.release(granted_at)
+                    raise
+                conn = self._idle.pop() if self._idle else self._connect(timeout)
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+                reusable = False
+                
+                try:
+                    try:
+                        response = await asyncio.wait_for(
+                            loop.run_in_executor(
+                                self._executor, self._start_stream, conn, method, self.base_path + path, payload, request_headers
+                            ),
+                            timeout=timeout,
+                        )
+                    except asyncio.TimeoutError:
+                        self._record_attempt(path, "timeout", retrying=False)
+                        raise TimeoutError(f"OpenAI API request timed out after {timeout:.0f}s")
+                    except (http.client.HTTPException, OSError) as e:
+                        self._record_attempt(path, "connection_error", retrying=attempt < self.max_retries)
+                        if attempt >= self.max_retries:
+                            raise
+                        delay = self._backoff(attempt)
+                        logger.warning(f"Upstream {method} {path} connection error ({e}); retrying in {delay:.1f}s")
+                    else:
+                        if lane:
+                            lane.observe(response.status, {key.lower(): value for key, value in response.getheaders()})
+                        retrying = response.status in self.RETRY_STATUSES and attempt < self.max_retries
+                        self._record_attempt(path, str(response.status), retrying=retrying)
+                        if not 200 <= response.status < 300:
+                            error_body = await loop.run_in_executor(self._executor, response.read)
+                            reusable = not response.will_close
+                            if response.status not in self.RETRY_STATUSES or attempt >= self.max_retries:
+                                raise UpstreamError(response.status, error_body.decode('utf-8', errors='replace'))
+                            delay = self._backoff(attempt, response.getheader("retry-after"))
+                            logger.warning(f"Upstream {method} {path} returned {response.status}; retrying in {delay:.1f}s")
+                        else:
+                            pending = b""
+                            while True:
+                                try:
+                                    data = await asyncio.wait_for(
+                                        loop.run_in_executor(self._executor, response.read1, 65536), timeout=timeout
+                                    )
+                                except asyncio.TimeoutError:
+                                    raise TimeoutError(f"OpenAI API stream stalled for {timeout:.0f}s")
+                                if not data:
+                                    break
+                                *lines, pending = (pending + data).split(b"\n")
+                                for line in lines:
+                                    yield line.rstrip(b"\r").decode('utf-8')
+                            if pending:
+                                yield pending.decode('utf-8')
+                            reusable = not response.will_close
+                            return
+                finally:
+                    # An abandoned or failed stream leaves the socket mid-response, so it is closed
+                    if reusable and len(self._idle) < self.pool_size:
+                        self._idle.append(conn)
+                    else:
+                        conn.close()
+                    self._slots.release()
+                    if lane:
+                        lane.release(granted_at)
+                
+                attempt += 1
+                await asyncio.sleep(delay)
+    
+    def close(self):
+        """Close idle connections and stop the worker threads"""
+        while self._idle:
+            self._idle.pop().close()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+upstream = UpstreamClient(
+    OPENAI_BASE_URL,
+    pool_size=UPSTREAM_POOL_SIZE,
+    max_retries=UPSTREAM_MAX_RETRIES,
+    backoff_base=UPSTREAM_BACKOFF_BASE_SECONDS,
+    backoff_max=UPSTREAM_BACKOFF_MAX_SECONDS,
+    headers={"Authorization": f"Bearer {OPENAI_API_KEY}"} if api_available else None,
+    scheduler=upstream_scheduler,
+)
+
+@app.on_event("shutdown")
+async def close_upstream():
+    upstream.close()
+
 # Field mapping for the post report form
 REPORT_FIELDS = {
     "postost_wins": "WINS/CELEBRATIONS",
@@ -69,6 +1120,31 @@ REPORT_FIELDS = {
     "next_steps": "NEXT STEPS"
 }
 
+def parse_report_field_groups(spec: str) -> list[list[str]]:
+    """
+    Parse REPORT_FIELD_GROUPS ("a,b,c;d,e,f"). Unknown and repeated names are
+    ignored; fields not listed anywhere share one extra group at the end.
+    """
+    groups = []
+    listed = set()
+    for group_spec in spec.split(";"):
+        group = []
+        for name in (name.strip() for name in group_spec.split(",")):
+            if name in REPORT_FIELDS and name not in listed:
+                listed.add(name)
+                group.append(name)
+        if group:
+            groups.append(group)
+    leftover = [key for key in REPORT_FIELDS if key not in listed]
+    if leftover:
+        groups.append(leftover)
+    return groups
+
+# Fields asked for together in one completion when REPORT_EXTRACTION_MODE is "sharded"
+# (default: four groups of three, in form order)
+_default_field_groups = ";".join(",".join(list(REPORT_FIELDS)[i:i + 3]) for i in range(0, len(REPORT_FIELDS), 3))
+REPORT_FIELD_GROUPS = parse_report_field_groups(os.getenv("REPORT_FIELD_GROUPS", _default_field_groups))
+
 def format_report_text(report_data: Dict[str, str]) -> Dict[str, str]:
     """Format report text with proper line breaks between numbered items"""
     formatted_data = {}
@@ -113,123 +1189,2187 @@ def format_report_text(report_data: Dict[str, str]) -> Dict[str, str]:
     
     return formatted_data
 
+# ---------------------------------------------------------------------------
+# Result cache
+#
+# Re-uploads of the same recording skip Whisper and GPT entirely. Transcripts
+# are keyed by the SHA-256 of the uploaded bytes; reports by the transcript
+# hash plus chat model and prompt version. Each cache is an in-memory LRU in
+# front of JSON files under UPLOAD_DIR/cache, evicted oldest-first once the
+# directory exceeds its byte budget.
+# ---------------------------------------------------------------------------
+
+class ResultCache:
+    """Two-level (memory LRU + on-disk) JSON cache with hit/miss counters"""
+    
+    def __init__(self, name: str, directory: Path, memory_entries: int, disk_max_bytes: int, enabled: bool = True):
+        self.name = name
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.disk_max_bytes = disk_max_bytes
+        self.enabled = enabled
+        
+        self._memory: OrderedDict[str, Any] = OrderedDict()
+        # key -> file size, oldest first; loaded lazily from the directory
+        self._disk_index: Optional[OrderedDict[str, int]] = None
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+    
+    def _load_index(self):
+        """Rebuild the disk LRU index from file mtimes (blocking; runs in a thread)"""
+        entries = []
+        if self.directory.exists():
+            for path in self.directory.glob("*/*.json"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path.stem, stat.st_size))
+        entries.sort()
+        self._disk_index = OrderedDict((key, size) for _, key, size in entries)
+        self._disk_bytes = sum(size for _, _, size in entries)
+    
+    def _remember(self, key: str, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+    
+    def _locked(self, func: Callable, *args):
+        """Disk reads/writes run on worker threads; serialize access to the index"""
+        with self._disk_lock:
+            return func(*args)
+    
+    def _read_disk(self, key: str) -> Optional[Any]:
+        if self._disk_index is None:
+            self._load_index()
+        if key not in self._disk_index:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            return None
+        self._disk_index.move_to_end(key)
+        return value
+    
+    def _write_disk(self, key: str, value: Any):
+        if self._disk_index is None:
+            self._load_index()
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(value).encode("utf-8")
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        
+        self._disk_bytes += len(data) - self._disk_index.pop(key, 0)
+        self._disk_index[key] = len(data)
+        
+        while self._disk_bytes > self.disk_max_bytes and len(self._disk_index) > 1:
+            old_key, old_size = self._disk_index.popitem(last=False)
+            try:
+                os.unlink(self._path(old_key))
+            except OSError:
+                pass
+            self._disk_bytes -= old_size
+            self.stats["evictions"] += 1
+    
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.stats["memory_hits"] += 1
+            return copy.deepcopy(self._memory[key])
+        
+        value = await asyncio.to_thread(self._locked, self._read_disk, key)
+        if value is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["disk_hits"] += 1
+        self._remember(key, value)
+        return copy.deepcopy(value)
+    
+    async def put(self, key: str, value: Any):
+        if not self.enabled:
+            return
+        self._remember(key, copy.deepcopy(value))
+        self.stats["writes"] += 1
+        try:
+            await asyncio.to_thread(self._locked, self._write_disk, key, value)
+        except OSError as e:
+            logger.warning(f"Could not write {self.name} cache entry: {str(e)}")
+    
+    def snapshot(self) -> Dict[str, Any]:
+        lookups = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hits = lookups - self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else None,
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._disk_index) if self._disk_index is not None else None,
+            "disk_bytes": self._disk_bytes if self._disk_index is not None else None,
+        }
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+async def gather_or_cancel(*aws) -> list[Any]:
+    """asyncio.gather, but the first failure cancels the remaining tasks instead of leaving them running"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+transcript_cache = ResultCache(
+    "transcript", CACHE_DIR / "transcripts", CACHE_MEMORY_ENTRIES, CACHE_DISK_MAX_BYTES // 2, enabled=CACHE_ENABLED
+)
+report_cache = ResultCache(
+    "report", CACHE_DIR / "reports", CACHE_MEMORY_ENTRIES, CACHE_DISK_MAX_BYTES // 2, enabled=CACHE_ENABLED
+)
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Hit/miss counters and sizes for the transcript and report caches"""
+    return {
+        "enabled": CACHE_ENABLED,
+        "transcripts": transcript_cache.snapshot(),
+        "reports": report_cache.snapshot(),
+    }
+
+JOBS_BY_STATUS = metrics.gauge("jobs", "Jobs currently held, by status")
+JOB_QUEUE_DEPTH = metrics.gauge("job_queue_depth", "Jobs waiting for a worker")
+CACHE_LOOKUPS = metrics.counter("cache_lookups_total", "Cache lookups since startup, by cache and result")
+CACHE_ENTRIES = metrics.gauge("cache_entries", "Entries held, by cache and tier")
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text exposition of request, stage, upstream, job and cache metrics"""
+    statuses = {"queued": 0, "running": 0, "completed": 0, "failed": 0}
+    for job in jobs.values():
+        statuses[job["status"]] = statuses.get(job["status"], 0) + 1
+    for status, count in statuses.items():
+        JOBS_BY_STATUS.set(count, status=status)
+    JOB_QUEUE_DEPTH.set(job_queue.qsize())
+    
+    for cache in (transcript_cache, report_cache):
+        snapshot = cache.snapshot()
+        for result in ("memory_hits", "disk_hits", "misses"):
+            CACHE_LOOKUPS.set(snapshot[result], cache=cache.name, result=result)
+        CACHE_ENTRIES.set(snapshot["memory_entries"], cache=cache.name, tier="memory")
+        if snapshot["disk_entries"] is not None:
+            CACHE_ENTRIES.set(snapshot["disk_entries"], cache=cache.name, tier="disk")
+    
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "text"):
+    """A saved request profile: top functions by cumulative time, or the raw .prof file with ?format=prof"""
+    profile_path = PROFILE_DIR / f"{profile_id}.prof"
+    if not PROFILING_ENABLED or not re.fullmatch(r"[0-9a-f]{32}", profile_id) or not profile_path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+    
+    if format == "prof":
+        return FileResponse(profile_path, media_type="application/octet-stream", filename=profile_path.name)
+    
+    report = io.StringIO()
+    pstats.Stats(str(profile_path), stream=report).sort_stats("cumulative").print_stats(50)
+    return PlainTextResponse(report.getvalue())
+
 @app.get("/")
 async def root():
     return {"message": "AI Post Report API is running"}
 
-@app.post("/api/post-report/audio")
-async def process_audio_upload(file: UploadFile = File(...)):
+async def save_upload_to_temp(file: UploadFile) -> tuple[str, int, str]:
     """
-    Process uploaded audio file:
-    1. Validate file
-    2. Transcribe with Whisper
-    3. Extract report sections with GPT
-    4. Return structured data
+    Validate an uploaded audio file and stream it to a temp file,
+    hashing the bytes on the way through.
+    Returns (temp_file_path, file_size, sha256_hex).
     """
-    try:
-        # Validate file
-        if not file.content_type or not file.content_type.startswith('audio/'):
-            raise HTTPException(status_code=400, detail="File must be an audio file")
+    if not file.content_type or not file.content_type.startswith('audio/'):
+        raise HTTPException(status_code=400, detail="File must be an audio file")
+    
+    file_size = 0
+    digest = hashlib.sha256()
+    
+    with StageTimer("upload") as stage, tempfile.NamedTemporaryFile(
+        delete=False, suffix=Path(file.filename).suffix, buffering=UPLOAD_WRITE_BUFFER_BYTES
+    ) as temp_file:
+        temp_file_path = temp_file.name
         
-        # Check file size
-        file_size = 0
-        temp_file_path = None
+        # Read and save file while checking size
+        while chunk := await file.read(UPLOAD_WRITE_BUFFER_BYTES):
+            file_size += len(chunk)
+            if file_size > MAX_FILE_SIZE_BYTES:
+                temp_file.close()
+                os.unlink(temp_file_path)
+                raise HTTPException(status_code=413, detail=f"File too large. Max size: {MAX_FILE_SIZE_MB}MB")
+            digest.update(chunk)
+            temp_file.write(chunk)
+        stage.bytes_in = stage.bytes_out = file_size
+    
+    return temp_file_path, file_size, digest.hexdigest()
+
+async def run_audio_pipeline(
+    temp_file_path: str,
+    filename: str,
+    progress: Optional[Callable[[str, int], None]] = None,
+    audio_hash: Optional[str] = None,
+    on_section: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Run convert -> transcribe -> extract on an audio file already on disk.
+    `filename` is the client's original name (used for logging).
+    `progress(stage, percent)` is called as each stage starts.
+    `audio_hash` (SHA-256 of the upload) enables the transcript cache.
+    `on_section(field, text)`, if given, is called as each report section
+    completes (streamed from GPT when REPORT_STREAMING is on).
+    Returns {"transcript", "segments", "report_data"}. The caller owns temp_file_path.
+    """
+    def report(stage: str, percent: int):
+        if progress:
+            progress(stage, percent)
+    
+    converted_file_path = None
+    
+    try:
+        cache_key = sha256_text(f"{TRANSCRIPTION_MODEL}:{audio_hash}") if audio_hash and api_available else None
+        transcription = await transcript_cache.get(cache_key) if cache_key else None
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as temp_file:
-            temp_file_path = temp_file.name
+        if transcription is not None:
+            logger.info(f"Transcript cache hit for {filename}; skipping conversion and transcription")
+        else:
+            # Step 1: Probe the upload and transcode only if it isn't upload-ready
+            report("converting", 10)
+            with StageTimer("convert", bytes_in=os.path.getsize(temp_file_path)) as stage:
+                audio_file_path, probe, time_map = await prepare_audio_for_upload(temp_file_path)
+                stage.bytes_out = os.path.getsize(audio_file_path)
+            if audio_file_path != temp_file_path:
+                converted_file_path = audio_file_path
             
-            # Read and save file while checking size
-            while chunk := await file.read(8192):
-                file_size += len(chunk)
-                if file_size > MAX_FILE_SIZE_BYTES:
-                    temp_file.close()
-                    os.unlink(temp_file_path)
-                    raise HTTPException(status_code=413, detail=f"File too large. Max size: {MAX_FILE_SIZE_MB}MB")
-                temp_file.write(chunk)
-        
-        logger.info(f"Processing audio file: {file.filename} ({file_size} bytes)")
+            # Step 2: Transcribe audio with Whisper
+            report("transcribing", 30)
+            with StageTimer("transcribe", bytes_in=os.path.getsize(audio_file_path)) as stage:
+                transcription = await transcribe_audio_detailed(
+                    audio_file_path, duration=probe.duration if probe else None, probed=True
+                )
+                stage.bytes_out = len(transcription["text"].encode("utf-8"))
+            if time_map:
+                # Timestamps from the trimmed audio point back into the original recording
+                transcription["segments"] = time_map.map_segments(transcription["segments"])
+            if cache_key:
+                await transcript_cache.put(cache_key, transcription)
         
-        # Step 1: Convert audio to MP3 if needed (for OpenAI compatibility)
-        audio_file_path = temp_file_path
-        converted_file_path = None
-        
-        # Check if file needs conversion based on extension
-        file_extension = Path(file.filename).suffix.lower()
-        needs_conversion = file_extension not in ['.mp3', '.wav', '.flac', '.webm']
-        
-        if needs_conversion or file_extension in ['.m4a', '.aac', '.ogg']:
-            logger.info(f"Converting {file_extension} to MP3 for OpenAI compatibility")
-            converted_file_path = convert_audio_to_mp3(temp_file_path)
-            audio_file_path = converted_file_path
-        
-        # Step 2: Transcribe audio with Whisper
-        transcript = await transcribe_audio(audio_file_path)
-        logger.info(f"Transcription completed: {len(transcript)} characters")
+        transcript = transcription["text"]
+        logger.info(f"Transcription completed: {len(transcript)} characters ({transcription['chunks']} chunks)")
         
         # Step 3: Extract report sections with GPT
-        report_data = await extract_report_sections(transcript)
+        report("extracting", 70)
+        with StageTimer("extract", bytes_in=len(transcript.encode("utf-8"))) as stage:
+            report_data = await extract_report_sections(transcript, on_section=on_section if REPORT_STREAMING else None)
+            stage.bytes_out = sum(len(str(text).encode("utf-8")) for text in report_data.values())
         logger.info("Report sections extracted successfully")
         
-        # Clean up temp files
-        os.unlink(temp_file_path)
+        return {"transcript": transcript, "segments": transcription["segments"], "report_data": report_data}
+    
+    finally:
         if converted_file_path and os.path.exists(converted_file_path):
             os.unlink(converted_file_path)
+
+@app.post("/api/post-report/audio")
+async def process_audio_upload(file: UploadFile = File(...), clinic: Optional[str] = Form(None)):
+    """
+    Process uploaded audio file:
+    1. Validate file
+    2. Transcribe with Whisper
+    3. Extract report sections with GPT
+    4. Return structured data (and archive it in the report store)
+    """
+    temp_file_path = None
+    
+    try:
+        temp_file_path, file_size, audio_hash = await save_upload_to_temp(file)
+        logger.info(f"Processing audio file: {file.filename} ({file_size} bytes)")
+        
+        result = await run_audio_pipeline(temp_file_path, file.filename, audio_hash=audio_hash)
+        report_id = report_store.add(
+            "upload", file.filename, result["transcript"], result["report_data"], result["segments"], clinic, audio_hash
+        )
         
         return JSONResponse(content={
             "success": True,
-            "transcript": transcript,
-            "report_data": report_data,
+            "report_id": report_id,
+            "transcript": result["transcript"],
+            "segments": result["segments"],
+            "report_data": result["report_data"],
             "message": "Audio processed successfully"
         })
         
     except HTTPException:
-        # Clean up temp files if they exist
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
-        if 'converted_file_path' in locals() and converted_file_path and os.path.exists(converted_file_path):
-            os.unlink(converted_file_path)
         raise
     except Exception as e:
-        # Clean up temp files if they exist
-        if temp_file_path and os.path.exists(temp_file_path):
-            os.unlink(temp_file_path)
-        if 'converted_file_path' in locals() and converted_file_path and os.path.exists(converted_file_path):
-            os.unlink(converted_file_path)
         logger.error(f"Error processing audio: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing audio: {str(e)}")
+    finally:
+        # Clean up temp file if it exists
+        if temp_file_path and os.path.exists(temp_file_path):
+            os.unlink(temp_file_path)
+
+# ---------------------------------------------------------------------------
+# Report store
+#
+# Every completed report is archived in a SQLite database (WAL mode) with
+# its transcript, one column per REPORT_FIELDS section and its metadata
+# (source, filename, clinic, audio hash). An FTS5 index over the transcript
+# and sections serves GET /api/reports, newest first with keyset pagination,
+# so a page costs the same at report 100,000 as at report 10. Requests only
+# put the record on a queue; one writer task commits whatever has queued up
+# (up to REPORT_STORE_BATCH_SIZE) in a single transaction on a thread.
+# ---------------------------------------------------------------------------
 
-def convert_audio_to_mp3(input_path: str) -> str:
+REPORT_STORE_SOURCES = ("upload", "job", "batch", "live")
+# Searches within a clinic with at most this many reports check each of them
+# against the index rather than scanning the index for the clinic's reports
+REPORT_STORE_SMALL_CLINIC = 500
+
+REPORT_STORE_WRITES = metrics.counter("report_store_writes_total", "Reports written to the report store, by outcome")
+REPORT_STORE_BATCH_SECONDS = metrics.histogram("report_store_batch_duration_seconds", "Time to commit one batch of reports")
+REPORT_STORE_QUERY_SECONDS = metrics.histogram("report_store_query_duration_seconds", "Report store query latency, by kind")
+REPORT_STORE_PENDING = metrics.gauge("report_store_pending", "Reports queued for the writer")
+
+def _fts_query(text: str) -> str:
     """
-    Convert audio file to MP3 format for OpenAI compatibility.
-    Returns path to converted MP3 file.
+    Turn a search box string into an FTS5 query: every word (or "quoted
+    phrase") must appear; a trailing * matches a prefix. FTS5 operators in
+    the input are treated as plain words, so no input is a syntax error.
     """
-    try:
-        # Load the audio file
-        audio = AudioSegment.from_file(input_path)
-        
-        # Create temp MP3 file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_mp3:
-            mp3_path = temp_mp3.name
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\S+)', text):
+        term = phrase or word
+        prefix = bool(word) and term.endswith("*")
+        term = term.rstrip("*") if prefix else term
+        if re.search(r"\w", term):
+            terms.append('"' + term.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+class ReportStore:
+    """SQLite archive of completed reports with a write-behind queue and full-text search"""
+    
+    # Longest a DELETE waits for queued writes to land
+    DELETE_WAIT_SECONDS = 5.0
+    
+    def __init__(self, path: Path, enabled: bool, batch_size: int, flush_seconds: float, queue_size: int):
+        self.path = path
+        self.enabled = enabled
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        # Readers get a connection per thread; WAL lets them run alongside the writer
+        self._readers = threading.local()
+    
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            connection = sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+    
+    def _create_schema(self, connection: sqlite3.Connection):
+        """Create the tables, adding columns and re-indexing when REPORT_FIELDS has changed"""
+        connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                report_id TEXT NOT NULL UNIQUE,
+                created_at REAL NOT NULL,
+                source TEXT NOT NULL,
+                filename TEXT,
+                clinic TEXT,
+                audio_hash TEXT,
+                transcript TEXT NOT NULL,
+                segments TEXT
+            )
+            """
+        )
+        columns = {row["name"] for row in connection.execute("PRAGMA table_info(reports)")}
+        for field in REPORT_FIELDS:
+            if field not in columns:
+                connection.execute(f"ALTER TABLE reports ADD COLUMN {field} TEXT")
+        connection.execute("CREATE INDEX IF NOT EXISTS reports_created ON reports (created_at)")
+        connection.execute("CREATE INDEX IF NOT EXISTS reports_clinic ON reports (clinic COLLATE NOCASE, id)")
+        connection.execute("CREATE INDEX IF NOT EXISTS reports_audio_hash ON reports (audio_hash)")
+        
+        # External-content index: the text lives once, in `reports`
+        indexed = ["transcript", *REPORT_FIELDS]
+        existing = connection.execute("SELECT sql FROM sqlite_master WHERE name = 'reports_fts'").fetchone()
+        definition = (
+            f"CREATE VIRTUAL TABLE reports_fts USING fts5({', '.join(indexed)}, "
+            "content='reports', content_rowid='id', tokenize='porter unicode61')"
+        )
+        if existing and existing["sql"] != definition:
+            logger.info("Report fields changed; rebuilding the report search index")
+            connection.execute("DROP TABLE reports_fts")
+            existing = None
+        if not existing:
+            connection.execute(definition)
+            connection.execute("INSERT INTO reports_fts(reports_fts) VALUES ('rebuild')")
+        connection.commit()
+    
+    def _reader(self) -> sqlite3.Connection:
+        connection = getattr(self._readers, "connection", None)
+        if connection is None:
+            connection = self._readers.connection = self._connect(read_only=True)
+        return connection
+    
+    def add(
+        self,
+        source: str,
+        filename: Optional[str],
+        transcript: str,
+        report_data: Dict[str, Any],
+        segments: Optional[list] = None,
+        clinic: Optional[str] = None,
+        audio_hash: Optional[str] = None,
+    ) -> Optional[str]:
+        """
+        Queue a completed report for the writer and return its report_id
+        (None when the store is off or the queue is full). Never blocks.
+        Demo-mode output is not archived.
+        """
+        if not self.enabled or self._writer_task is None or not api_available:
+            return None
+        record = {
+            "report_id": uuid.uuid4().hex,
+            "created_at": time.time(),
+            "source": source,
+            "filename": filename,
+            "clinic": (clinic or "").strip() or None,
+            "audio_hash": audio_hash,
+            "transcript": transcript,
+            "segments": json.dumps(segments) if segments is not None else None,
+            **{field: report_data.get(field) for field in REPORT_FIELDS},
+        }
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            REPORT_STORE_WRITES.inc(outcome="dropped")
+            logger.error(f"Report store queue is full; report for {filename} was not archived")
+            return None
+        REPORT_STORE_PENDING.set(self._queue.qsize())
+        return record["report_id"]
+    
+    def _write_batch(self, records: list[Dict[str, Any]]):
+        columns = ["report_id", "created_at", "source", "filename", "clinic", "audio_hash", "transcript", "segments", *REPORT_FIELDS]
+        indexed = ["transcript", *REPORT_FIELDS]
+        with self._write_lock, self._writer:
+            insert = f"INSERT INTO reports ({', '.join(columns)}) VALUES ({', '.join(':' + name for name in columns)})"
+            # Index exactly the rows written, in the same transaction (a store
+            # created before AUTOINCREMENT may hand out a deleted report's id again)
+            ids = [self._writer.execute(insert, record).lastrowid for record in records]
+            self._writer.executemany(
+                f"INSERT INTO reports_fts (rowid, {', '.join(indexed)}) VALUES (?, {', '.join('?' for _ in indexed)})",
+                [(row_id, *(record[column] for column in indexed)) for row_id, record in zip(ids, records)],
+            )
+    
+    async def _run_writer(self):
+        """
+        Commit queued reports in batches: whatever arrived while the last
+        batch was written. A None on the queue writes what is left and stops.
+        """
+        stopping = False
+        while not stopping:
+            records = []
+            item = await self._queue.get()
+            if item is not None and self.flush_seconds > 0:
+                # Give a burst a moment to gather into one transaction
+                await asyncio.sleep(self.flush_seconds)
+            while True:
+                if item is None:
+                    stopping = True
+                else:
+                    records.append(item)
+                if stopping or len(records) >= self.batch_size or self._queue.empty():
+                    break
+                item = self._queue.get_nowait()
+            REPORT_STORE_PENDING.set(self._queue.qsize())
+            
+            if records:
+                started = time.perf_counter()
+                try:
+                    await asyncio.to_thread(self._write_batch, records)
+                    REPORT_STORE_WRITES.inc(len(records), outcome="ok")
+                except sqlite3.Error as e:
+                    REPORT_STORE_WRITES.inc(len(records), outcome="error")
+                    logger.error(f"Report store write of {len(records)} reports failed: {str(e)}")
+                REPORT_STORE_BATCH_SECONDS.observe(time.perf_counter() - started)
+            for _ in range(len(records) + stopping):
+                self._queue.task_done()
+    
+    async def start(self):
+        if not self.enabled:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._writer = await asyncio.to_thread(self._connect)
+            await asyncio.to_thread(self._create_schema, self._writer)
+            report_count = self._writer.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+        except sqlite3.Error as e:
+            logger.error(f"Report store unavailable ({self.path}): {str(e)}")
+            self.enabled = False
+            return
+        self._writer_task = asyncio.create_task(self._run_writer())
+        logger.info(f"Report store at {self.path} ({report_count} reports)")
+    
+    async def stop(self):
+        """Write out everything still queued, then close"""
+        task, self._writer_task = self._writer_task, None
+        if task is None:
+            return
+        await self._queue.put(None)
+        await task
+        self._writer.close()
+    
+    def _search(
+        self,
+        q: Optional[str],
+        field: Optional[str],
+        clinic: Optional[str],
+        source: Optional[str],
+        since: Optional[float],
+        until: Optional[float],
+        limit: int,
+        before_id: Optional[int],
+    ) -> list[Dict[str, Any]]:
+        conditions, params = [], []
+        if before_id is not None:
+            conditions.append("r.id < ?")
+            params.append(before_id)
+        if clinic:
+            conditions.append("r.clinic = ? COLLATE NOCASE")
+            params.append(clinic.strip())
+        if source:
+            conditions.append("r.source = ?")
+            params.append(source)
+        if since is not None:
+            conditions.append("r.created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("r.created_at < ?")
+            params.append(until)
+        
+        reader = self._reader()
+        summary = "r.id, r.report_id, r.created_at, r.source, r.filename, r.clinic, r.audio_hash"
+        if not q:
+            where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+            sql = f"SELECT {summary} FROM reports r {where} ORDER BY r.id DESC LIMIT ?"
+            return [dict(row) for row in reader.execute(sql, (*params, limit))]
         
-        # Export as MP3
-        audio.export(mp3_path, format="mp3")
-        logger.info(f"Converted audio from {input_path} to MP3: {mp3_path}")
+        match = _fts_query(q)
+        if field:
+            match = f"{field} : ({match})"
+        snippet = "snippet(reports_fts, -1, '[', ']', '…', 16)"
+        small_clinic = clinic and reader.execute(
+            "SELECT count(*) FROM (SELECT 1 FROM reports WHERE clinic = ? COLLATE NOCASE LIMIT ?)",
+            (clinic.strip(), REPORT_STORE_SMALL_CLINIC + 1),
+        ).fetchone()[0] <= REPORT_STORE_SMALL_CLINIC
+        if not small_clinic:
+            # rowid order lets FTS5 stop after `limit` matches instead of ranking them all
+            sql = (
+                f"SELECT {summary}, {snippet} AS snippet "
+                "FROM reports_fts JOIN reports r ON r.id = reports_fts.rowid "
+                f"WHERE reports_fts MATCH ? {''.join(' AND ' + condition for condition in conditions)} "
+                "ORDER BY reports_fts.rowid DESC LIMIT ?"
+            )
+            return [dict(row) for row in reader.execute(sql, (match, *params, limit))]
         
-        return mp3_path
+        # Walking every match of a common word to find a small clinic's few reports is
+        # slow; check that clinic's reports against the index one by one instead
+        sql = (
+            f"SELECT {summary} FROM reports r WHERE {' AND '.join(conditions)} AND EXISTS "
+            "(SELECT 1 FROM reports_fts WHERE reports_fts MATCH ? AND rowid = r.id) "
+            "ORDER BY r.id DESC LIMIT ?"
+        )
+        rows = [dict(row) for row in reader.execute(sql, (*params, match, limit))]
+        for row in rows:
+            row["snippet"] = reader.execute(
+                f"SELECT {snippet} FROM reports_fts WHERE reports_fts MATCH ? AND rowid = ?", (match, row["id"])
+            ).fetchone()[0]
+        return rows
+    
+    async def search(
+        self,
+        q: Optional[str] = None,
+        field: Optional[str] = None,
+        clinic: Optional[str] = None,
+        source: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        One page of report summaries, newest first. Pass the returned
+        `next_cursor` back as `cursor` for the following page.
+        """
+        if q is not None and not _fts_query(q):
+            q = None
+        before_id = int(cursor) if cursor else None
+        started = time.perf_counter()
+        # One extra row tells whether another page exists
+        rows = await asyncio.to_thread(self._search, q, field, clinic, source, since, until, limit + 1, before_id)
+        REPORT_STORE_QUERY_SECONDS.observe(time.perf_counter() - started, kind="search" if q else "list")
         
-    except CouldntDecodeError as e:
-        logger.error(f"Could not decode audio file {input_path}: {str(e)}")
-        raise HTTPException(status_code=400, detail=f"Unsupported audio format or corrupted file: {str(e)}")
-    except Exception as e:
-        logger.error(f"Error converting audio {input_path}: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error converting audio: {str(e)}")
+        page = rows[:limit]
+        return {
+            "reports": [{key: value for key, value in row.items() if key != "id"} for row in page],
+            "next_cursor": str(page[-1]["id"]) if len(rows) > limit else None,
+        }
+    
+    def _get(self, report_id: str) -> Optional[sqlite3.Row]:
+        return self._reader().execute("SELECT * FROM reports WHERE report_id = ?", (report_id,)).fetchone()
+    
+    async def get(self, report_id: str) -> Optional[Dict[str, Any]]:
+        """A stored report in the same shape as the pipeline's result, or None"""
+        started = time.perf_counter()
+        row = await asyncio.to_thread(self._get, report_id)
+        REPORT_STORE_QUERY_SECONDS.observe(time.perf_counter() - started, kind="get")
+        if row is None:
+            return None
+        return {
+            "report_id": row["report_id"],
+            "created_at": row["created_at"],
+            "source": row["source"],
+            "filename": row["filename"],
+            "clinic": row["clinic"],
+            "audio_hash": row["audio_hash"],
+            "transcript": row["transcript"],
+            "segments": json.loads(row["segments"]) if row["segments"] else None,
+            "report_data": {field: row[field] for field in REPORT_FIELDS if row[field] is not None},
+        }
+    
+    def _delete(self, report_id: str) -> bool:
+        indexed = ["transcript", *REPORT_FIELDS]
+        with self._write_lock, self._writer:
+            row = self._writer.execute(
+                f"SELECT id, {', '.join(indexed)} FROM reports WHERE report_id = ?", (report_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            # External-content FTS5 tables are told the old values to remove
+            self._writer.execute(
+                f"INSERT INTO reports_fts (reports_fts, rowid, {', '.join(indexed)}) "
+                f"VALUES ('delete', ?, {', '.join('?' for _ in indexed)})",
+                (row["id"], *(row[column] for column in indexed)),
+            )
+            self._writer.execute("DELETE FROM reports WHERE id = ?", (row["id"],))
+        return True
+    
+    async def delete(self, report_id: str) -> bool:
+        # Let queued writes land first so a just-created report can be deleted
+        # too, but never wait on a writer that has stopped or fallen far behind
+        task = self._writer_task
+        if task is not None and not task.done() and not self._queue.empty():
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=self.DELETE_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(f"Report store writer still busy after {self.DELETE_WAIT_SECONDS:.0f}s; deleting {report_id} without waiting")
+        return await asyncio.to_thread(self._delete, report_id)
 
-async def transcribe_audio(file_path: str) -> str:
-    """Transcribe audio file using OpenAI Whisper API via direct HTTP request"""
+report_store = ReportStore(
+    REPORT_STORE_PATH,
+    REPORT_STORE_ENABLED,
+    REPORT_STORE_BATCH_SIZE,
+    REPORT_STORE_FLUSH_SECONDS,
+    REPORT_STORE_QUEUE_SIZE,
+)
+
+@app.on_event("startup")
+async def start_report_store():
+    await report_store.start()
+
+@app.on_event("shutdown")
+async def stop_report_store():
+    await report_store.stop()
+
+def _require_report_store():
+    if not report_store.enabled:
+        raise HTTPException(status_code=404, detail="Report store is disabled")
+
+@app.get("/api/reports")
+async def list_reports(
+    q: Optional[str] = None,
+    field: Optional[str] = None,
+    clinic: Optional[str] = None,
+    source: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+):
+    """
+    Stored reports, newest first. `q` searches transcripts and report
+    sections (all words must match; "quoted phrases" and prefix* work),
+    optionally only the `field` section. `clinic` (case-insensitive),
+    `source` and `since`/`until` (Unix seconds) filter. Returns `reports`
+    (summaries, with a highlighted `snippet` when searching) and
+    `next_cursor` to pass as `cursor` for the next page.
+    """
+    _require_report_store()
+    if field and field not in REPORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Unknown field: {field}")
+    if source and source not in REPORT_STORE_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Unknown source: {source}")
+    if cursor and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    limit = min(max(limit, 1), REPORT_STORE_PAGE_SIZE_MAX)
+    
+    return await report_store.search(q, field, clinic, source, since, until, limit, cursor)
+
+@app.get("/api/reports/{report_id}")
+async def get_report(report_id: str):
+    """A stored report with its transcript, segments, report_data and metadata"""
+    _require_report_store()
+    stored = await report_store.get(report_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return stored
+
+@app.delete("/api/reports/{report_id}")
+async def delete_report(report_id: str):
+    """Remove a report from the store and its search index"""
+    _require_report_store()
+    if not await report_store.delete(report_id):
+        raise HTTPException(status_code=404, detail="Report not found")
+    return {"success": True}
+
+# ---------------------------------------------------------------------------
+# Background jobs
+#
+# Job mode returns as soon as the upload is on disk. A fixed pool of worker
+# tasks drains `job_queue` and runs the same pipeline as the synchronous
+# endpoint, publishing stage/percent updates that clients can poll or follow
+# over SSE. Finished jobs are kept for JOB_RESULT_TTL_SECONDS so a client that
+# reconnects can still collect its result.
+# ---------------------------------------------------------------------------
+
+jobs: Dict[str, Dict[str, Any]] = {}
+job_queue: asyncio.Queue = asyncio.Queue(maxsize=JOB_QUEUE_SIZE)
+_job_changed: Dict[str, asyncio.Event] = {}
+_job_workers: list[asyncio.Task] = []
+
+JOB_FINAL_STATUSES = ("completed", "failed")
+
+def _job_snapshot(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job (drops internal bookkeeping fields)"""
+    return {key: value for key, value in job.items() if not key.startswith("_")}
+
+def _update_job(job_id: str, **fields):
+    """Update a job and wake any SSE subscribers waiting on it"""
+    job = jobs.get(job_id)
+    if job is None:
+        return
+    job.update(fields)
+    job["updated_at"] = time.time()
+    
+    changed = _job_changed.get(job_id)
+    _job_changed[job_id] = asyncio.Event()
+    if changed:
+        changed.set()
+
+def _prune_jobs():
+    """Drop finished jobs older than JOB_RESULT_TTL_SECONDS"""
+    cutoff = time.time() - JOB_RESULT_TTL_SECONDS
+    expired = [
+        job_id for job_id, job in jobs.items()
+        if job["status"] in JOB_FINAL_STATUSES and job["updated_at"] < cutoff
+    ]
+    for job_id in expired:
+        jobs.pop(job_id, None)
+        _job_changed.pop(job_id, None)
+
+async def job_worker(worker_id: int):
+    """Pull queued jobs and run the audio pipeline for each"""
+    while True:
+        job_id = await job_queue.get()
+        job = jobs.get(job_id)
+        try:
+            if job is None:
+                continue
+            
+            logger.info(f"Worker {worker_id} processing job {job_id}: {job['filename']}")
+            _update_job(job_id, status="running", started_at=time.time())
+            STAGE_SECONDS.observe(job["started_at"] - job["created_at"], stage="queue", outcome="ok")
+            timings = RequestTimings()
+            _request_timings.set(timings)
+            
+            # Publish each report section as it streams in so clients can fill the form progressively
+            sections: Dict[str, str] = {}
+            
+            def on_section(key: str, text: str):
+                sections[key] = text
+                _update_job(
+                    job_id,
+                    report_data=dict(sections),
+                    percent=70 + (25 * len(sections)) // len(REPORT_FIELDS),
+                )
+            
+            result = await run_audio_pipeline(
+                job["_temp_file_path"],
+                job["filename"],
+                progress=lambda stage, percent: _update_job(job_id, stage=stage, percent=percent),
+                audio_hash=job["_audio_hash"],
+                on_section=on_section,
+            )
+            report_id = report_store.add(
+                "job", job["filename"], result["transcript"], result["report_data"], result["segments"], job["clinic"], job["_audio_hash"]
+            )
+            
+            _update_job(
+                job_id,
+                status="completed",
+                stage="complete",
+                percent=100,
+                report_id=report_id,
+                transcript=result["transcript"],
+                segments=result["segments"],
+                report_data=result["report_data"],
+                timings=timings.as_dict(),
+            )
+            logger.info(f"Job {job_id} completed")
+            
+        except HTTPException as e:
+            logger.error(f"Job {job_id} failed: {e.detail}")
+            _update_job(job_id, status="failed", error=e.detail)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {str(e)}")
+            _update_job(job_id, status="failed", error=f"Error processing audio: {str(e)}")
+        finally:
+            if job is not None:
+                temp_file_path = job.pop("_temp_file_path", None)
+                if temp_file_path and os.path.exists(temp_file_path):
+                    os.unlink(temp_file_path)
+            job_queue.task_done()
+
+@app.on_event("startup")
+async def start_job_workers():
+    for worker_id in range(JOB_WORKERS):
+        _job_workers.append(asyncio.create_task(job_worker(worker_id)))
+    logger.info(f"Started {JOB_WORKERS} job workers (queue size {JOB_QUEUE_SIZE})")
+
+@app.on_event("shutdown")
+async def stop_job_workers():
+    for task in _job_workers:
+        task.cancel()
+    await asyncio.gather(*_job_workers, return_exceptions=True)
+    _job_workers.clear()
+
+@app.post("/api/post-report/audio/jobs", status_code=202)
+async def create_audio_job(file: UploadFile = File(...), clinic: Optional[str] = Form(None)):
+    """
+    Accept an audio upload and queue it for background processing.
+    Returns a job id immediately; poll /api/jobs/{id} or follow
+    /api/jobs/{id}/events for progress and the final report_data.
+    """
+    _prune_jobs()
+    
+    temp_file_path, file_size, audio_hash = await save_upload_to_temp(file)
+    logger.info(f"Queueing audio file: {file.filename} ({file_size} bytes)")
+    return enqueue_audio_job(temp_file_path, file.filename, file_size, audio_hash, clinic)
+
+def enqueue_audio_job(temp_file_path: str, filename: str, file_size: int, audio_hash: str, clinic: Optional[str] = None) -> JSONResponse:
+    """
+    Queue an audio file already on disk as a job (the job takes ownership of
+    the file) and return the 202 response pointing at its status and events.
+    """
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    jobs[job_id] = {
+        "job_id": job_id,
+        "filename": filename,
+        "file_size": file_size,
+        "clinic": clinic,
+        "status": "queued",
+        "stage": "queued",
+        "percent": 0,
+        "report_id": None,
+        "transcript": None,
+        "segments": None,
+        "report_data": None,
+        "error": None,
+        "created_at": now,
+        "started_at": None,
+        "updated_at": now,
+        "_temp_file_path": temp_file_path,
+        "_audio_hash": audio_hash,
+    }
+    _job_changed[job_id] = asyncio.Event()
+    
+    try:
+        job_queue.put_nowait(job_id)
+    except asyncio.QueueFull:
+        jobs.pop(job_id, None)
+        _job_changed.pop(job_id, None)
+        os.unlink(temp_file_path)
+        ADMISSION_REJECTED.inc(reason="jobs")
+        raise upstream_scheduler.busy_error()
+    
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": f"/api/jobs/{job_id}",
+        "events_url": f"/api/jobs/{job_id}/events",
+    })
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return the current state of a job, including report_data once completed"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_snapshot(job)
+
+@app.get("/api/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """
+    Server-Sent Events stream of job progress. The current state is sent
+    first, so reconnecting clients always catch up; the stream closes after
+    the job completes or fails.
+    """
+    if job_id not in jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    async def event_stream():
+        while True:
+            job = jobs.get(job_id)
+            if job is None:
+                return
+            changed = _job_changed.get(job_id) or asyncio.Event()
+            yield f"event: progress\ndata: {json.dumps(_job_snapshot(job))}\n\n"
+            if job["status"] in JOB_FINAL_STATUSES:
+                return
+            while True:
+                try:
+                    await asyncio.wait_for(changed.wait(), timeout=JOB_EVENTS_HEARTBEAT_SECONDS)
+                    break
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---------------------------------------------------------------------------
+# Resumable uploads
+#
+# Large files and in-progress recordings are sent as a series of chunks to an
+# upload session instead of one multipart request. Each PATCH appends at an
+# explicit offset, so after a dropped connection the client asks for the
+# received offset and continues from there. Finalizing checks the size and
+# SHA-256 (hashed incrementally as chunks arrive) and queues a normal job.
+# ---------------------------------------------------------------------------
+
+upload_sessions: Dict[str, Dict[str, Any]] = {}
+
+class CreateUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    total_size: Optional[int] = None
+    clinic: Optional[str] = None
+
+class FinalizeUploadRequest(BaseModel):
+    sha256: str
+
+def _upload_session_snapshot(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of an upload session"""
+    return {key: value for key, value in session.items() if not key.startswith("_")}
+
+def _get_upload_session(upload_id: str) -> Dict[str, Any]:
+    session = upload_sessions.get(upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    return session
+
+def _discard_upload_session(upload_id: str):
+    session = upload_sessions.pop(upload_id, None)
+    if session and os.path.exists(session["_path"]):
+        os.unlink(session["_path"])
+
+def _prune_upload_sessions():
+    """Drop sessions that haven't received data for UPLOAD_SESSION_TTL_SECONDS"""
+    cutoff = time.time() - UPLOAD_SESSION_TTL_SECONDS
+    for upload_id in [upload_id for upload_id, session in upload_sessions.items() if session["updated_at"] < cutoff]:
+        _discard_upload_session(upload_id)
+
+@app.post("/api/uploads", status_code=201)
+async def create_upload_session(upload: CreateUploadRequest):
+    """
+    Start a resumable upload. `total_size` may be omitted when the size isn't
+    known yet (e.g. a recording in progress).
+    """
+    _prune_upload_sessions()
+    
+    if not upload.content_type.startswith('audio/'):
+        raise HTTPException(status_code=400, detail="File must be an audio file")
+    if upload.total_size is not None and upload.total_size > MAX_FILE_SIZE_BYTES:
+        raise HTTPException(status_code=413, detail=f"File too large. Max size: {MAX_FILE_SIZE_MB}MB")
+    
+    UPLOAD_SESSION_DIR.mkdir(parents=True, exist_ok=True)
+    upload_id = uuid.uuid4().hex
+    suffix = Path(upload.filename).suffix.lower() or mimetypes.guess_extension(upload.content_type.split(";")[0]) or ""
+    path = UPLOAD_SESSION_DIR / f"{upload_id}{suffix}"
+    path.touch()
+    
+    now = time.time()
+    upload_sessions[upload_id] = {
+        "upload_id": upload_id,
+        "filename": upload.filename,
+        "content_type": upload.content_type,
+        "total_size": upload.total_size,
+        "clinic": upload.clinic,
+        "offset": 0,
+        "created_at": now,
+        "updated_at": now,
+        "_path": str(path),
+        "_digest": hashlib.sha256(),
+        "_lock": asyncio.Lock(),
+    }
+    logger.info(f"Created upload session {upload_id} for {upload.filename}")
+    
+    return JSONResponse(status_code=201, content={
+        **_upload_session_snapshot(upload_sessions[upload_id]),
+        "upload_url": f"/api/uploads/{upload_id}",
+        "max_file_size": MAX_FILE_SIZE_BYTES,
+    })
+
+@app.get("/api/uploads/{upload_id}")
+async def get_upload_session(upload_id: str):
+    """Bytes received so far (also in the Upload-Offset header); resume from there"""
+    session = _get_upload_session(upload_id)
+    return JSONResponse(
+        content=_upload_session_snapshot(session),
+        headers={"Upload-Offset": str(session["offset"]), "Cache-Control": "no-store"},
+    )
+
+@app.patch("/api/uploads/{upload_id}")
+async def append_upload_chunk(upload_id: str, request: Request):
+    """
+    Append the raw request body at the `Upload-Offset` header, which must
+    equal the bytes received so far (409 with the current offset otherwise).
+    If the connection drops mid-chunk, the bytes that did arrive are kept.
+    """
+    session = _get_upload_session(upload_id)
+    try:
+        offset = int(request.headers["upload-offset"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Upload-Offset header is required")
+    
+    async with session["_lock"]:
+        # Finalize or DELETE may have taken the session while we waited
+        if upload_sessions.get(upload_id) is not session:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if offset != session["offset"]:
+            return JSONResponse(
+                status_code=409,
+                content={"detail": "Offset mismatch", "offset": session["offset"]},
+                headers={"Upload-Offset": str(session["offset"])},
+            )
+        
+        received = 0
+        too_large = False
+        pending = bytearray()
+        data_file = await asyncio.to_thread(open, session["_path"], "ab")
+        
+        def write_pending(data: bytes):
+            data_file.write(data)
+            session["_digest"].update(data)
+        
+        def close_data_file():
+            data_file.flush()
+            os.fsync(data_file.fileno())
+            data_file.close()
+        
+        with StageTimer("upload_chunk", log=False) as stage:
+            try:
+                async for chunk in request.stream():
+                    if session["offset"] + received + len(pending) + len(chunk) > MAX_FILE_SIZE_BYTES:
+                        too_large = True
+                        break
+                    pending += chunk
+                    if len(pending) >= UPLOAD_WRITE_BUFFER_BYTES:
+                        await asyncio.to_thread(write_pending, bytes(pending))
+                        received += len(pending)
+                        pending.clear()
+            except ClientDisconnect:
+                logger.warning(f"Upload {upload_id} disconnected after {received + len(pending)} bytes of a chunk; keeping them")
+            finally:
+                try:
+                    if pending:
+                        await asyncio.to_thread(write_pending, bytes(pending))
+                        received += len(pending)
+                    await asyncio.to_thread(close_data_file)
+                finally:
+                    session["offset"] += received
+                    session["updated_at"] = time.time()
+                    stage.bytes_in = stage.bytes_out = received
+        
+        if too_large:
+            raise HTTPException(status_code=413, detail=f"File too large. Max size: {MAX_FILE_SIZE_MB}MB")
+    
+    return JSONResponse(
+        content={"upload_id": upload_id, "offset": session["offset"]},
+        headers={"Upload-Offset": str(session["offset"])},
+    )
+
+@app.post("/api/uploads/{upload_id}/finalize", status_code=202)
+async def finalize_upload_session(upload_id: str, body: FinalizeUploadRequest):
+    """
+    Verify the upload's size and SHA-256, then queue it like
+    POST /api/post-report/audio/jobs. A checksum mismatch discards the session.
+    """
+    session = _get_upload_session(upload_id)
+    
+    async with session["_lock"]:
+        if upload_id not in upload_sessions:
+            raise HTTPException(status_code=404, detail="Upload session not found")
+        if session["offset"] == 0:
+            raise HTTPException(status_code=400, detail="Upload is empty")
+        if session["total_size"] is not None and session["offset"] != session["total_size"]:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload incomplete: {session['offset']} of {session['total_size']} bytes received",
+            )
+        
+        audio_hash = session["_digest"].hexdigest()
+        if body.sha256.lower() != audio_hash:
+            _discard_upload_session(upload_id)
+            logger.error(f"Upload {upload_id} checksum mismatch; discarded")
+            raise HTTPException(status_code=422, detail="Checksum mismatch; the upload was corrupted. Please upload again.")
+        
+        # Keep the session while the job queue is full so finalize can simply be retried
+        if job_queue.full():
+            ADMISSION_REJECTED.inc(reason="jobs")
+            raise upstream_scheduler.busy_error()
+        
+        # The job takes over the data file
+        upload_sessions.pop(upload_id, None)
+    
+    logger.info(f"Upload {upload_id} complete: {session['filename']} ({session['offset']} bytes)")
+    return enqueue_audio_job(session["_path"], session["filename"], session["offset"], audio_hash, session["clinic"])
+
+@app.delete("/api/uploads/{upload_id}")
+async def abort_upload_session(upload_id: str):
+    """Abandon an upload and delete what was received"""
+    _get_upload_session(upload_id)
+    _discard_upload_session(upload_id)
+    return {"success": True}
+
+# ---------------------------------------------------------------------------
+# Batch processing
+#
+# The batch endpoint takes many recordings in one request, either as
+# separate files or as a zip archive, and runs the same pipeline over them
+# with at most BATCH_MAX_CONCURRENCY in flight. Each result is written as one
+# NDJSON line as soon as it finishes, so clients can process results while
+# the rest are still running. A failure only fails its own record.
+# ---------------------------------------------------------------------------
+
+ZIP_CONTENT_TYPES = {"application/zip", "application/x-zip-compressed", "application/x-zip"}
+
+class BatchItem(NamedTuple):
+    """One recording in a batch; `error` is set when it was rejected before processing"""
+    filename: str
+    temp_file_path: Optional[str]
+    audio_hash: Optional[str]
+    error: Optional[str] = None
+
+def _is_zip_upload(file: UploadFile) -> bool:
+    return file.content_type in ZIP_CONTENT_TYPES or Path(file.filename or "").suffix.lower() == ".zip"
+
+def _is_audio_name(name: str) -> bool:
+    guessed_type = mimetypes.guess_type(name)[0] or ""
+    return guessed_type.startswith("audio/") or Path(name).suffix.lower() in WHISPER_EXTENSIONS | {".m4a", ".aac", ".ogg", ".opus"}
+
+def extract_zip_audio(archive, max_files: int) -> list[BatchItem]:
+    """
+    Stream each audio entry of a zip archive to its own temp file (hashing it
+    on the way) and return them in archive order. Non-audio entries are
+    skipped; oversized entries come back as rejected items. Runs in a thread.
+    """
+    items: list[BatchItem] = []
     try:
+        with zipfile.ZipFile(archive) as zip_file:
+            for info in zip_file.infolist():
+                name = info.filename
+                basename = Path(name).name
+                if info.is_dir() or name.startswith("__MACOSX/") or basename.startswith(".") or not _is_audio_name(name):
+                    continue
+                if len(items) >= max_files:
+                    raise HTTPException(status_code=400, detail=f"Too many files. Max per batch: {BATCH_MAX_FILES}")
+                if info.file_size > MAX_FILE_SIZE_BYTES:
+                    items.append(BatchItem(name, None, None, f"File too large. Max size: {MAX_FILE_SIZE_MB}MB"))
+                    continue
+                
+                digest = hashlib.sha256()
+                size = 0
+                with zip_file.open(info) as entry, tempfile.NamedTemporaryFile(delete=False, suffix=Path(name).suffix) as temp_file:
+                    # The declared size can't be trusted, so the limit is enforced while extracting
+                    while chunk := entry.read(UPLOAD_STREAM_CHUNK_BYTES):
+                        size += len(chunk)
+                        if size > MAX_FILE_SIZE_BYTES:
+                            break
+                        digest.update(chunk)
+                        temp_file.write(chunk)
+                if size > MAX_FILE_SIZE_BYTES:
+                    os.unlink(temp_file.name)
+                    items.append(BatchItem(name, None, None, f"File too large. Max size: {MAX_FILE_SIZE_MB}MB"))
+                else:
+                    items.append(BatchItem(name, temp_file.name, digest.hexdigest()))
+    except BaseException as e:
+        _remove_batch_files(items)
+        if isinstance(e, zipfile.BadZipFile):
+            raise HTTPException(status_code=400, detail=f"Invalid zip archive: {str(e)}")
+        raise
+    return items
+
+async def collect_batch_items(files: list[UploadFile]) -> list[BatchItem]:
+    """Save every uploaded recording (expanding zip archives) to temp files"""
+    items: list[BatchItem] = []
+    try:
+        for file in files:
+            remaining = BATCH_MAX_FILES - len(items)
+            if remaining <= 0:
+                raise HTTPException(status_code=400, detail=f"Too many files. Max per batch: {BATCH_MAX_FILES}")
+            if _is_zip_upload(file):
+                items.extend(await asyncio.to_thread(extract_zip_audio, file.file, remaining))
+                continue
+            try:
+                temp_file_path, _, audio_hash = await save_upload_to_temp(file)
+                items.append(BatchItem(file.filename, temp_file_path, audio_hash))
+            except HTTPException as e:
+                items.append(BatchItem(file.filename, None, None, e.detail))
+    except BaseException:
+        _remove_batch_files(items)
+        raise
+    return items
+
+def _remove_batch_files(items: Iterable[BatchItem]):
+    for item in items:
+        if item.temp_file_path and os.path.exists(item.temp_file_path):
+            os.unlink(item.temp_file_path)
+
+async def process_batch_item(index: int, item: BatchItem, slots: asyncio.Semaphore, clinic: Optional[str] = None) -> Dict[str, Any]:
+    """Run one batch recording through the pipeline; always returns a result record"""
+    record: Dict[str, Any] = {"type": "result", "index": index, "filename": item.filename}
+    if item.error:
+        return {**record, "success": False, "error": item.error}
+    
+    async with slots:
+        timings = RequestTimings()
+        _request_timings.set(timings)
+        # Batch work yields the upstream to interactive requests
+        _request_priority.set(PRIORITY_BATCH)
+        try:
+            logger.info(f"Batch item {index}: processing {item.filename}")
+            result = await run_audio_pipeline(item.temp_file_path, item.filename, audio_hash=item.audio_hash)
+            report_id = report_store.add(
+                "batch", item.filename, result["transcript"], result["report_data"], result["segments"], clinic, item.audio_hash
+            )
+            return {**record, "success": True, "report_id": report_id, **result, "timings": timings.as_dict()}
+        except HTTPException as e:
+            logger.error(f"Batch item {index} ({item.filename}) failed: {e.detail}")
+            return {**record, "success": False, "error": e.detail}
+        except Exception as e:
+            logger.error(f"Batch item {index} ({item.filename}) failed: {str(e)}")
+            return {**record, "success": False, "error": f"Error processing audio: {str(e)}"}
+        finally:
+            _remove_batch_files([item])
+
+@app.post("/api/post-report/audio/batch")
+async def process_audio_batch(files: list[UploadFile] = File(...), clinic: Optional[str] = Form(None)):
+    """
+    Process several recordings (audio files and/or zip archives of them).
+    Streams application/x-ndjson: one `result` record per recording, in
+    completion order, with its upload `index`, then a final `summary` record.
+    """
+    items = await collect_batch_items(files)
+    if not items:
+        raise HTTPException(status_code=400, detail="No audio files found in the upload")
+    logger.info(f"Processing batch of {len(items)} recordings ({BATCH_MAX_CONCURRENCY} at a time)")
+    
+    async def result_stream():
+        started = time.perf_counter()
+        slots = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+        tasks = [asyncio.create_task(process_batch_item(index, item, slots, clinic)) for index, item in enumerate(items)]
+        succeeded = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                record = await next_result
+                succeeded += record["success"]
+                yield json.dumps(record) + "\n"
+            yield json.dumps({
+                "type": "summary",
+                "total": len(items),
+                "succeeded": succeeded,
+                "failed": len(items) - succeeded,
+                "seconds": round(time.perf_counter() - started, 2),
+            }) + "\n"
+        finally:
+            # Client went away: stop outstanding work and clean up its files. Nothing
+            # is awaited here because the cancelled response would interrupt it.
+            for task in tasks:
+                task.cancel()
+            _remove_batch_files(items)
+    
+    return StreamingResponse(result_stream(), media_type="application/x-ndjson")
+
+# ---------------------------------------------------------------------------
+# Live transcription
+#
+# While a session is recorded, the browser streams its MediaRecorder chunks
+# over a WebSocket. One ffmpeg process per connection decodes the stream to
+# 16 kHz mono PCM as it arrives; every LIVE_SEGMENT_SECONDS of audio is cut
+# into a segment (overlapping the previous one by LIVE_SEGMENT_OVERLAP_SECONDS)
+# and transcribed in the background, and the running transcript is sent
+# back. Stopping the recording leaves only the last partial segment and the
+# report extraction to do.
+# ---------------------------------------------------------------------------
+
+LIVE_SAMPLE_RATE = 16000
+LIVE_BYTES_PER_SECOND = LIVE_SAMPLE_RATE * 2  # s16le mono
+
+LIVE_SESSIONS = metrics.gauge("live_sessions", "Open live transcription connections")
+
+def _pcm_bytes(seconds: float) -> int:
+    """Length of `seconds` of decoded audio in bytes, on a sample boundary"""
+    return int(seconds * LIVE_SAMPLE_RATE) * 2
+
+def _write_wav(path: str, pcm: bytes):
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(LIVE_SAMPLE_RATE)
+        wav_file.writeframes(pcm)
+
+class LiveTranscriber:
+    """
+    Decode one streamed recording and transcribe it segment by segment.
+    Messages for the client are handed to `emit` (a plain callable, so it
+    can be called from callbacks); segment results are emitted in order.
+    """
+    
+    def __init__(self, emit: Callable[[Dict[str, Any]], None]):
+        self._emit = emit
+        self._decoder: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._decoder_errors: Optional[asyncio.Task] = None
+        self._pcm = bytearray()          # decoded audio from self._segment_start on
+        self._segment_start = 0.0        # recording time of self._pcm[0], in seconds
+        self._windows: list[tuple[float, float]] = []
+        self._tasks: list[asyncio.Task] = []
+        self._results: Dict[int, str] = {}
+        self._text_parts: list[str] = []
+        self._segments: list[Dict[str, Any]] = []
+        self._fan_out = asyncio.Semaphore(LIVE_MAX_PARALLEL_SEGMENTS)
+        self._hasher = hashlib.sha256()
+        self.bytes_received = 0
+        self.error: Optional[str] = None
+    
+    @property
+    def decoded_seconds(self) -> float:
+        return self._segment_start + len(self._pcm) / LIVE_BYTES_PER_SECOND
+    
+    @property
+    def audio_hash(self) -> str:
+        """SHA-256 of the recording as received, the same key an upload of it would get"""
+        return self._hasher.hexdigest()
+    
+    async def feed(self, data: bytes):
+        """Pass one recorder chunk to the decoder"""
+        if self._decoder is None:
+            await self._start_decoder()
+        self.bytes_received += len(data)
+        self._hasher.update(data)
+        try:
+            self._decoder.stdin.write(data)
+            await self._decoder.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise HTTPException(status_code=400, detail=f"Unsupported audio format or corrupted stream: {await self._decoder_error()}")
+    
+    async def _start_decoder(self):
+        args = [
+            AudioSegment.converter, "-hide_banner", "-loglevel", "error",
+            "-i", "pipe:0", "-vn", "-ac", "1", "-ar", str(LIVE_SAMPLE_RATE), "-f", "s16le", "pipe:1",
+        ]
+        try:
+            self._decoder = await asyncio.create_subprocess_exec(
+                *args,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise HTTPException(status_code=500, detail=f"Error converting audio: {AudioSegment.converter} not found")
+        self._reader = asyncio.create_task(self._read_pcm())
+        self._decoder_errors = asyncio.create_task(self._decoder.stderr.read())
+    
+    async def _decoder_error(self) -> str:
+        stderr = await self._decoder_errors if self._decoder_errors else b""
+        return (stderr.decode("utf-8", "ignore").strip().splitlines()[-1:] or ["decoder exited"])[0]
+    
+    async def _read_pcm(self):
+        while chunk := await self._decoder.stdout.read(UPLOAD_STREAM_CHUNK_BYTES):
+            self._pcm += chunk
+            self._cut_segments()
+            if self.decoded_seconds > LIVE_MAX_SESSION_SECONDS and self.error is None:
+                self._fail(f"Recording too long. Max length: {LIVE_MAX_SESSION_SECONDS / 60:.0f} minutes")
+    
+    def _cut_segments(self):
+        """Start a transcription for every complete segment in the buffer"""
+        segment_bytes = _pcm_bytes(LIVE_SEGMENT_SECONDS)
+        advance_bytes = segment_bytes - _pcm_bytes(LIVE_SEGMENT_OVERLAP_SECONDS)
+        while len(self._pcm) >= segment_bytes:
+            self._start_segment(bytes(self._pcm[:segment_bytes]))
+            del self._pcm[:advance_bytes]
+            self._segment_start += advance_bytes / LIVE_BYTES_PER_SECOND
+    
+    def _start_segment(self, pcm: bytes):
+        index = len(self._windows)
+        start = self._segment_start
+        self._windows.append((start, start + len(pcm) / LIVE_BYTES_PER_SECOND))
+        task = asyncio.create_task(self._transcribe_segment(index, pcm))
+        task.add_done_callback(self._segment_done)
+        self._tasks.append(task)
+    
+    async def _transcribe_segment(self, index: int, pcm: bytes):
+        async with self._fan_out:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_wav:
+                wav_path = temp_wav.name
+            converted_path = None
+            try:
+                await asyncio.to_thread(_write_wav, wav_path, pcm)
+                with StageTimer("transcribe", bytes_in=len(pcm), log=False) as stage:
+                    converted_path = await transcode_audio(wav_path)
+                    text = await transcribe_audio(converted_path, duration=len(pcm) / LIVE_BYTES_PER_SECOND)
+                    stage.bytes_out = len(text.encode("utf-8"))
+            finally:
+                for path in (wav_path, converted_path):
+                    if path and os.path.exists(path):
+                        os.unlink(path)
+        self._results[index] = text.strip()
+        self._publish()
+    
+    def _segment_done(self, task: asyncio.Task):
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and self.error is None:
+            detail = error.detail if isinstance(error, HTTPException) else f"Transcription failed: {str(error)}"
+            self._fail(detail)
+    
+    def _fail(self, detail: str):
+        logger.error(f"Live transcription failed: {detail}")
+        self.error = detail
+        self._emit({"type": "error", "detail": detail})
+    
+    def _publish(self):
+        """Append every segment finished in order so far and send it to the client"""
+        while len(self._text_parts) in self._results:
+            index = len(self._text_parts)
+            text = self._results.pop(index)
+            if self._text_parts and text:
+                # Words heard in both overlapping segments are kept only once
+                text = _dedupe_seam(self._text_parts[-1], text)
+            self._text_parts.append(text)
+            start, end = self._windows[index]
+            if text:
+                self._segments.append({"start": round(start, 2), "end": round(end, 2), "text": text})
+            self._emit({"type": "transcript", "segment": index, "start": round(start, 2), "end": round(end, 2), "text": text})
+    
+    async def finish(self) -> Dict[str, Any]:
+        """
+        End of recording: flush the decoder, transcribe the last partial
+        segment and wait for the rest. Returns {"text", "segments", "chunks"}.
+        """
+        if self._decoder is None:
+            raise HTTPException(status_code=400, detail="No audio received")
+        
+        self._decoder.stdin.close()
+        await self._reader
+        if await self._decoder.wait() != 0 and not self._windows and not self._pcm:
+            raise HTTPException(status_code=400, detail=f"Unsupported audio format or corrupted stream: {await self._decoder_error()}")
+        
+        # Audio inside the previous segment's overlap has already been transcribed
+        if len(self._pcm) > (_pcm_bytes(LIVE_SEGMENT_OVERLAP_SECONDS) if self._windows else 0):
+            self._start_segment(bytes(self._pcm))
+        if not self._windows:
+            raise HTTPException(status_code=400, detail="No audio received")
+        
+        try:
+            await asyncio.gather(*self._tasks)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # _segment_done has already recorded and reported the failure
+            pass
+        if self.error:
+            raise HTTPException(status_code=500, detail=self.error)
         if not api_available:
-            # Demo mode - return sample transcript
-            return """
+            return {"text": DEMO_TRANSCRIPT, "segments": [], "chunks": len(self._windows)}
+        
+        return {
+            "text": " ".join(part for part in self._text_parts if part),
+            "segments": self._segments,
+            "chunks": len(self._windows),
+        }
+    
+    async def close(self):
+        """Stop the decoder and any transcriptions still running"""
+        for task in self._tasks:
+            task.cancel()
+        if self._decoder is not None and self._decoder.returncode is None:
+            self._decoder.kill()
+            await self._decoder.wait()
+        for task in (self._reader, self._decoder_errors, *self._tasks):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(task for task in (self._reader, self._decoder_errors, *self._tasks) if task), return_exceptions=True)
+
+@app.websocket("/api/live/ws")
+async def live_transcription(websocket: WebSocket):
+    """
+    Live transcription of a recording in progress.
+    
+    Client -> server: binary frames with the recorder's output in order
+    (any container ffmpeg can read from a pipe, e.g. audio/webm), then a
+    {"type": "stop"} text message when the recording ends.
+    Server -> client: {"type": "ready"}, {"type": "transcript"} per finished
+    segment (text to append, with its start/end in seconds), then after
+    stop {"type": "status"}, {"type": "section"} as report sections arrive,
+    and {"type": "complete"} with transcript, segments and report_data.
+    {"type": "error", "detail"} ends the session. An optional `clinic` query
+    parameter is stored with the report.
+    """
+    await websocket.accept()
+    if upstream_scheduler.saturated():
+        ADMISSION_REJECTED.inc(reason="upstream")
+        await websocket.send_json({
+            "type": "error",
+            "detail": "Server is busy. Please try again shortly.",
+            "retry_after": upstream_scheduler.retry_after(),
+        })
+        await websocket.close(code=1013)
+        return
+    session_id = uuid.uuid4().hex
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    
+    # One sender task keeps messages in order and lets sync callbacks emit them
+    outbox: asyncio.Queue = asyncio.Queue()
+    
+    async def send_messages():
+        while (message := await outbox.get()) is not None:
+            await websocket.send_json(message)
+            if message["type"] == "error":
+                await websocket.close(code=1011)
+                return
+    
+    sender = asyncio.create_task(send_messages())
+    transcriber = LiveTranscriber(outbox.put_nowait)
+    LIVE_SESSIONS.inc()
+    logger.info(f"Live session {session_id} opened")
+    
+    try:
+        outbox.put_nowait({
+            "type": "ready",
+            "session_id": session_id,
+            "segment_seconds": LIVE_SEGMENT_SECONDS,
+            "overlap_seconds": LIVE_SEGMENT_OVERLAP_SECONDS,
+        })
+        
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect" or transcriber.error:
+                logger.info(f"Live session {session_id} closed before the recording was stopped")
+                return
+            if message.get("bytes"):
+                await transcriber.feed(message["bytes"])
+            elif message.get("text") and json.loads(message["text"]).get("type") == "stop":
+                break
+        
+        outbox.put_nowait({"type": "status", "stage": "transcribing"})
+        transcription = await transcriber.finish()
+        transcript = transcription["text"]
+        logger.info(
+            f"Live session {session_id}: {transcriber.decoded_seconds:.0f}s of audio in "
+            f"{transcription['chunks']} segments, {len(transcript)} characters"
+        )
+        if api_available:
+            # A later upload of the same recording then skips transcription
+            await transcript_cache.put(sha256_text(f"{TRANSCRIPTION_MODEL}:{transcriber.audio_hash}"), transcription)
+        
+        outbox.put_nowait({"type": "status", "stage": "extracting", "transcript": transcript})
+        on_section = lambda key, text: outbox.put_nowait({"type": "section", "field": key, "text": text})
+        with StageTimer("extract", bytes_in=len(transcript.encode("utf-8"))) as stage:
+            report_data = await extract_report_sections(transcript, on_section=on_section if REPORT_STREAMING else None)
+            stage.bytes_out = sum(len(str(text).encode("utf-8")) for text in report_data.values())
+        report_id = report_store.add(
+            "live", None, transcript, report_data, transcription["segments"],
+            websocket.query_params.get("clinic"), transcriber.audio_hash,
+        )
+        
+        outbox.put_nowait({
+            "type": "complete",
+            "report_id": report_id,
+            "transcript": transcript,
+            "segments": transcription["segments"],
+            "report_data": report_data,
+            "mode": "real" if api_available else "demo",
+            "timings": timings.as_dict(),
+        })
+        outbox.put_nowait(None)
+        await sender
+        await websocket.close()
+    
+    except HTTPException as e:
+        outbox.put_nowait({"type": "error", "detail": e.detail})
+        await asyncio.wait({sender}, timeout=5)
+    except WebSocketDisconnect:
+        logger.info(f"Live session {session_id} disconnected")
+    except Exception as e:
+        logger.error(f"Live session {session_id} failed: {str(e)}")
+        outbox.put_nowait({"type": "error", "detail": f"Error processing audio: {str(e)}"})
+        await asyncio.wait({sender}, timeout=5)
+    finally:
+        LIVE_SESSIONS.inc(-1)
+        sender.cancel()
+        await transcriber.close()
+
+# ---------------------------------------------------------------------------
+# Silence trimming
+#
+# Training sessions contain breaks and dead air that we would otherwise pay to
+# upload and transcribe. With SILENCE_TRIM_ENABLED, conversion to a speech
+# profile decodes the recording to 16 kHz mono PCM in an ffmpeg pipe, finds
+# silent frames (frame RMS below SILENCE_THRESHOLD_DB dBFS) one ~10 s block at a time on a thread, cuts
+# every silent run longer than SILENCE_MIN_SECONDS down to SILENCE_PADDING_SECONDS
+# on either side, and pipes the rest straight into the encoder. Memory is
+# bounded by one block plus one undecided silent run. A TimeMap records where
+# each kept stretch came from, so transcript timestamps still point into the
+# original recording.
+# ---------------------------------------------------------------------------
+
+SILENCE_SAMPLE_RATE = 16000
+SILENCE_FRAME_SAMPLES = SILENCE_SAMPLE_RATE * 30 // 1000   # 30 ms analysis frames
+SILENCE_FRAME_BYTES = SILENCE_FRAME_SAMPLES * 2            # s16le mono
+SILENCE_BLOCK_BYTES = SILENCE_FRAME_BYTES * 334            # ~10 s of audio per read
+SILENCE_ENERGY_STRIDE = 4                                  # without audioop, every 4th sample sets a frame's energy
+
+SILENCE_REMOVED_SECONDS = metrics.counter("silence_removed_seconds_total", "Seconds of silence cut from recordings before upload")
+SILENCE_INPUT_SECONDS = metrics.counter("silence_input_seconds_total", "Seconds of audio examined by silence trimming")
+
+class TimeMap:
+    """Kept stretches of a trimmed recording, for mapping its times back to the original"""
+    
+    def __init__(self):
+        self.trimmed_starts: list[float] = []
+        self.original_starts: list[float] = []
+        self.duration = 0.0            # of the trimmed audio
+        self.original_duration = 0.0
+    
+    def keep(self, original_start: float, length: float):
+        """Append a stretch of the original (in order); adjacent stretches are merged"""
+        if self.trimmed_starts and abs(self.original_starts[-1] + self.duration - self.trimmed_starts[-1] - original_start) < 1e-6:
+            self.duration += length
+            return
+        self.trimmed_starts.append(self.duration)
+        self.original_starts.append(original_start)
+        self.duration += length
+    
+    @property
+    def removed_seconds(self) -> float:
+        return max(0.0, self.original_duration - self.duration)
+    
+    def to_original(self, seconds: float) -> float:
+        """Original-recording time of a point in the trimmed audio"""
+        if not self.trimmed_starts:
+            return seconds
+        index = max(0, bisect.bisect_right(self.trimmed_starts, seconds) - 1)
+        return self.original_starts[index] + seconds - self.trimmed_starts[index]
+    
+    def map_segments(self, segments: list[Dict[str, Any]]) -> list[Dict[str, Any]]:
+        return [
+            {**segment, "start": round(self.to_original(segment["start"]), 2), "end": round(self.to_original(segment["end"]), 2)}
+            for segment in segments
+        ]
+
+class SilenceTrimmer:
+    """
+    Streaming silence remover for 16 kHz mono s16le PCM. `feed(pcm)` returns
+    the audio to keep so far and `finish()` the rest; `time_map` describes
+    the result. Silence shorter than `min_silence` is always kept.
+    """
+    
+    def __init__(self, threshold_db: float, min_silence: float, padding: float):
+        # Frame RMS (in sample units) at or below which a frame counts as silent
+        self.threshold = 32768 * 10 ** (threshold_db / 20)
+        self.padding_frames = max(0, round(padding * SILENCE_SAMPLE_RATE / SILENCE_FRAME_SAMPLES))
+        self.min_silence_frames = max(2 * self.padding_frames + 1, round(min_silence * SILENCE_SAMPLE_RATE / SILENCE_FRAME_SAMPLES))
+        self.time_map = TimeMap()
+        self._remainder = b""
+        self._frames_seen = 0
+        # The current silent run: its first frame, and frames held back until
+        # it is known whether the run is long enough to cut
+        self._silence_start: Optional[int] = None
+        self._silence = bytearray()
+        self._cutting = False
+    
+    @staticmethod
+    def _seconds(frames: int) -> float:
+        return frames * SILENCE_FRAME_SAMPLES / SILENCE_SAMPLE_RATE
+    
+    def _keep(self, output: bytearray, first_frame: int, data: bytes):
+        if data:
+            output += data
+            self.time_map.keep(self._seconds(first_frame), len(data) / (2 * SILENCE_SAMPLE_RATE))
+    
+    def _voiced_frames(self, pcm: bytes) -> list[bool]:
+        """Whether each frame of a block of whole frames is louder than the threshold"""
+        if audioop is not None:
+            return [
+                audioop.rms(pcm[start:start + SILENCE_FRAME_BYTES], 2) > self.threshold
+                for start in range(0, len(pcm), SILENCE_FRAME_BYTES)
+            ]
+        # Sum of squares over a strided view of each frame, against the threshold
+        # scaled to the same number of samples (no square roots)
+        samples = array.array("h", pcm)
+        if sys.byteorder == "big":
+            samples.byteswap()
+        view = memoryview(samples)
+        limit = self.threshold ** 2 * len(range(0, SILENCE_FRAME_SAMPLES, SILENCE_ENERGY_STRIDE))
+        return [
+            sum(map(operator.mul, frame, frame)) > limit
+            for frame in (view[start:start + SILENCE_FRAME_SAMPLES:SILENCE_ENERGY_STRIDE] for start in range(0, len(view), SILENCE_FRAME_SAMPLES))
+        ]
+    
+    def _end_silence(self, output: bytearray, end_frame: int, final: bool = False):
+        """The silent run ended at `end_frame`: keep it whole, or just its tail padding if it was cut"""
+        if self._silence_start is None:
+            return
+        if not self._cutting:
+            self._keep(output, self._silence_start, bytes(self._silence))
+        elif not final:
+            self._keep(output, end_frame - len(self._silence) // SILENCE_FRAME_BYTES, bytes(self._silence))
+        self._silence_start = None
+        self._silence = bytearray()
+        self._cutting = False
+    
+    def _add_silence(self, output: bytearray, first_frame: int, data: bytes):
+        if self._silence_start is None:
+            self._silence_start = first_frame
+        self._silence += data
+        held_frames = len(self._silence) // SILENCE_FRAME_BYTES
+        if not self._cutting and held_frames >= self.min_silence_frames:
+            # Long enough to cut: keep the head padding now, hold back only the tail
+            self._cutting = True
+            head_bytes = self.padding_frames * SILENCE_FRAME_BYTES
+            self._keep(output, self._silence_start, bytes(self._silence[:head_bytes]))
+            del self._silence[:head_bytes]
+        if self._cutting:
+            tail_bytes = self.padding_frames * SILENCE_FRAME_BYTES
+            excess = len(self._silence) - tail_bytes
+            if excess > 0:
+                del self._silence[:excess]
+    
+    def feed(self, pcm: bytes) -> bytes:
+        pcm = self._remainder + pcm
+        whole = len(pcm) - len(pcm) % SILENCE_FRAME_BYTES
+        pcm, self._remainder = pcm[:whole], pcm[whole:]
+        output = bytearray()
+        if not pcm:
+            return bytes(output)
+        
+        voiced = self._voiced_frames(pcm)
+        # Walk runs of voiced/silent frames rather than single frames
+        start = 0
+        for is_voiced, run in itertools.groupby(voiced):
+            end = start + sum(1 for _ in run)
+            first_frame = self._frames_seen + start
+            data = pcm[start * SILENCE_FRAME_BYTES:end * SILENCE_FRAME_BYTES]
+            if is_voiced:
+                self._end_silence(output, first_frame)
+                self._keep(output, first_frame, data)
+            else:
+                self._add_silence(output, first_frame, data)
+            start = end
+        self._frames_seen += len(voiced)
+        self.time_map.original_duration = self._seconds(self._frames_seen)
+        return bytes(output)
+    
+    def finish(self) -> bytes:
+        """Flush at the end of the recording (a trailing partial frame is dropped)"""
+        output = bytearray()
+        # Trailing silence keeps only its head padding
+        self._end_silence(output, self._frames_seen, final=True)
+        return bytes(output)
+
+async def trim_silence(input_path: str, profile_name: str = AUDIO_TRANSCODE_PROFILE) -> tuple[str, TimeMap]:
+    """
+    Decode, trim silence and re-encode with `profile_name` in one streaming
+    pass of two ffmpeg processes. Returns the new temp file and its TimeMap.
+    """
+    profile = AUDIO_PROFILES[profile_name]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=profile["suffix"]) as temp_output:
+        output_path = temp_output.name
+    
+    trimmer = SilenceTrimmer(SILENCE_THRESHOLD_DB, SILENCE_MIN_SECONDS, SILENCE_PADDING_SECONDS)
+    ffmpeg = [AudioSegment.converter, "-nostdin", "-hide_banner", "-loglevel", "error"]
+    pcm_format = ["-f", "s16le", "-ac", "1", "-ar", str(SILENCE_SAMPLE_RATE)]
+    decoder = encoder = None
+    
+    async def pump():
+        try:
+            while chunk := await decoder.stdout.read(SILENCE_BLOCK_BYTES):
+                # Frame analysis is CPU work; keep it off the event loop
+                kept = await asyncio.to_thread(trimmer.feed, chunk)
+                if kept:
+                    encoder.stdin.write(kept)
+                    await encoder.stdin.drain()
+            encoder.stdin.write(trimmer.finish())
+            await encoder.stdin.drain()
+            encoder.stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            # The encoder gave up; its exit code and stderr tell why
+            decoder.kill()
+        return await asyncio.gather(decoder.stderr.read(), encoder.stderr.read(), decoder.wait(), encoder.wait())
+    
+    try:
+        async with _transcode_slots:
+            decoder = await asyncio.create_subprocess_exec(
+                *ffmpeg, "-i", input_path, "-vn", *pcm_format, "pipe:1",
+                stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+            encoder = await asyncio.create_subprocess_exec(
+                *ffmpeg, "-y", *pcm_format, "-i", "pipe:0", *profile["args"], output_path,
+                stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            )
+            decoder_stderr, encoder_stderr, decoder_code, encoder_code = await asyncio.wait_for(pump(), timeout=TRANSCODE_TIMEOUT_SECONDS)
+    except FileNotFoundError:
+        os.unlink(output_path)
+        raise HTTPException(status_code=500, detail=f"Error converting audio: {AudioSegment.converter} not found")
+    except asyncio.TimeoutError:
+        os.unlink(output_path)
+        raise HTTPException(status_code=500, detail=f"Error converting audio: timed out after {TRANSCODE_TIMEOUT_SECONDS:.0f}s")
+    except BaseException:
+        os.unlink(output_path)
+        raise
+    finally:
+        for process in (decoder, encoder):
+            if process is not None and process.returncode is None:
+                process.kill()
+                await process.wait()
+    
+    if decoder_code != 0 or encoder_code != 0 or trimmer.time_map.original_duration == 0:
+        os.unlink(output_path)
+        stderr = decoder_stderr if decoder_code != 0 else encoder_stderr
+        error = stderr.decode("utf-8", "ignore").strip().splitlines()[-1:] or ["no audio decoded"]
+        logger.error(f"Could not convert audio file {input_path}: {error[0]}")
+        raise HTTPException(status_code=400, detail=f"Unsupported audio format or corrupted file: {error[0]}")
+    
+    time_map = trimmer.time_map
+    SILENCE_INPUT_SECONDS.inc(time_map.original_duration)
+    SILENCE_REMOVED_SECONDS.inc(time_map.removed_seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.values["silence_removed_seconds"] = round(time_map.removed_seconds, 1)
+    logger.info(
+        f"Trimmed {time_map.removed_seconds:.1f}s of silence from {time_map.original_duration:.1f}s of audio "
+        f"({100 * time_map.removed_seconds / time_map.original_duration:.0f}%)"
+    )
+    return output_path, time_map
+
+# ---------------------------------------------------------------------------
+# Audio probing and transcoding
+#
+# Conversion runs as an ffmpeg subprocess (the same binary pydub uses), so
+# decoding never happens in this process or on the event loop and memory use
+# doesn't grow with file length. A probe decides whether a file can go to
+# Whisper as-is; otherwise it is re-encoded with AUDIO_TRANSCODE_PROFILE.
+# ---------------------------------------------------------------------------
+
+# Output profiles: the speech profiles keep what Whisper needs (mono, 16 kHz)
+# at a fraction of the bytes of a full-bitrate stereo MP3, and are the ones
+# silence trimming can feed (it hands the encoder 16 kHz mono PCM)
+AUDIO_PROFILES: Dict[str, Dict[str, Any]] = {
+    "speech": {
+        "suffix": ".mp3",
+        "bit_rate": 32000,
+        "speech": True,
+        "args": ["-ac", "1", "-ar", "16000", "-codec:a", "libmp3lame", "-b:a", "32k"],
+    },
+    "speech-opus": {
+        "suffix": ".ogg",
+        "bit_rate": 24000,
+        "speech": True,
+        "args": ["-ac", "1", "-ar", "16000", "-codec:a", "libopus", "-b:a", "24k", "-application", "voip"],
+    },
+    "full": {
+        "suffix": ".mp3",
+        "bit_rate": 128000,
+        "args": ["-codec:a", "libmp3lame", "-b:a", "128k"],
+    },
+}
+
+# Containers the Whisper API accepts directly (ffprobe format names), and the
+# file extensions it accepts them under; a file passes through only when both
+# match (e.g. an Ogg ".opus" upload is still transcoded)
+WHISPER_FORMATS = {"mp3", "wav", "flac", "ogg", "matroska,webm", "mov,mp4,m4a,3gp,3g2,mj2"}
+WHISPER_UPLOAD_EXTENSIONS = {".mp3", ".mpga", ".mpeg", ".wav", ".flac", ".ogg", ".webm", ".m4a", ".mp4"}
+# Extensions trusted without a probe (e.g. no ffprobe installed)
+WHISPER_EXTENSIONS = {".mp3", ".wav", ".flac", ".webm"}
+
+_transcode_slots = asyncio.Semaphore(TRANSCODE_MAX_CONCURRENCY)
+
+class AudioProbe(NamedTuple):
+    format_name: str
+    codec_name: str
+    duration: Optional[float]
+    bit_rate: Optional[int]
+    channels: Optional[int]
+    sample_rate: Optional[int]
+
+async def _run_media_tool(args: list[str], timeout: float) -> tuple[int, bytes, bytes]:
+    """Run ffmpeg/ffprobe without blocking the loop; the process is killed on timeout or cancellation"""
+    process = await asyncio.create_subprocess_exec(
+        *args,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except BaseException:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+    return process.returncode, stdout, stderr
+
+async def probe_audio(file_path: str) -> Optional[AudioProbe]:
+    """Container/codec/duration of an audio file via ffprobe, or None if it can't be read"""
+    try:
+        returncode, stdout, _ = await _run_media_tool(
+            [get_prober_name(), "-v", "error", "-of", "json", "-show_format", "-show_streams", file_path],
+            timeout=30,
+        )
+        if returncode != 0:
+            return None
+        info = json.loads(stdout.decode("utf-8", "ignore") or "{}")
+    except Exception as e:
+        logger.warning(f"Could not probe audio {file_path}: {str(e)}")
+        return None
+    
+    audio_streams = [stream for stream in info.get("streams", []) if stream.get("codec_type") == "audio"]
+    if not audio_streams:
+        return None
+    stream = audio_streams[0]
+    container = info.get("format", {})
+    
+    def number(value, cast):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return None
+    
+    return AudioProbe(
+        format_name=container.get("format_name", ""),
+        codec_name=stream.get("codec_name", ""),
+        duration=number(container.get("duration") or stream.get("duration"), float),
+        bit_rate=number(container.get("bit_rate") or stream.get("bit_rate"), int),
+        channels=number(stream.get("channels"), int),
+        sample_rate=number(stream.get("sample_rate"), int),
+    )
+
+def needs_transcoding(
+    probe: Optional[AudioProbe], file_size: int, extension: str, profile_name: str = AUDIO_TRANSCODE_PROFILE
+) -> bool:
+    """
+    True if the file must (unsupported/unknown format or extension, too
+    large) or should (bitrate well above the target profile) be re-encoded
+    before upload.
+    """
+    if probe is None or probe.format_name not in WHISPER_FORMATS or extension.lower() not in WHISPER_UPLOAD_EXTENSIONS:
+        return True
+    if file_size > WHISPER_MAX_UPLOAD_BYTES:
+        return True
+    target_bit_rate = AUDIO_PROFILES[profile_name]["bit_rate"]
+    return bool(probe.bit_rate and probe.bit_rate > target_bit_rate * AUDIO_REENCODE_MIN_RATIO)
+
+async def transcode_audio(
+    input_path: str,
+    profile_name: str = AUDIO_TRANSCODE_PROFILE,
+    start: Optional[float] = None,
+    duration: Optional[float] = None,
+) -> str:
+    """
+    Re-encode audio (optionally just the [start, start + duration) window)
+    with an ffmpeg subprocess. Returns the path of the new temp file.
+    """
+    profile = AUDIO_PROFILES[profile_name]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=profile["suffix"]) as temp_output:
+        output_path = temp_output.name
+    
+    args = [AudioSegment.converter, "-nostdin", "-hide_banner", "-loglevel", "error", "-y"]
+    if start is not None:
+        args += ["-ss", f"{start:.3f}"]
+    args += ["-i", input_path]
+    if duration is not None:
+        args += ["-t", f"{duration:.3f}"]
+    args += ["-vn", "-map_metadata", "-1", *profile["args"], output_path]
+    
+    try:
+        async with _transcode_slots:
+            returncode, _, stderr = await _run_media_tool(args, timeout=TRANSCODE_TIMEOUT_SECONDS)
+    except FileNotFoundError:
+        os.unlink(output_path)
+        raise HTTPException(status_code=500, detail=f"Error converting audio: {AudioSegment.converter} not found")
+    except asyncio.TimeoutError:
+        os.unlink(output_path)
+        raise HTTPException(status_code=500, detail=f"Error converting audio: timed out after {TRANSCODE_TIMEOUT_SECONDS:.0f}s")
+    except BaseException:
+        os.unlink(output_path)
+        raise
+    
+    if returncode != 0:
+        os.unlink(output_path)
+        error = stderr.decode("utf-8", "ignore").strip().splitlines()[-1:] or ["unknown error"]
+        logger.error(f"Could not convert audio file {input_path}: {error[0]}")
+        raise HTTPException(status_code=400, detail=f"Unsupported audio format or corrupted file: {error[0]}")
+    
+    return output_path
+
+def should_trim_silence(probe: Optional[AudioProbe], profile_name: str = AUDIO_TRANSCODE_PROFILE) -> bool:
+    """
+    Trim while transcoding to a (16 kHz mono) speech profile, unless the
+    recording is known to be too short for trimming to pay off
+    """
+    if not SILENCE_TRIM_ENABLED or not AUDIO_PROFILES[profile_name].get("speech"):
+        return False
+    return probe is None or probe.duration is None or probe.duration >= SILENCE_TRIM_MIN_DURATION_SECONDS
+
+async def prepare_audio_for_upload(file_path: str) -> tuple[str, Optional[AudioProbe], Optional[TimeMap]]:
+    """
+    Probe an upload and transcode it only when needed, trimming silence on
+    the way when should_trim_silence() allows. Returns (path_to_send, probe,
+    time_map); the path differs from file_path when a new temp file was
+    created, which the caller must delete. time_map is set when silence was
+    trimmed.
+    """
+    file_size = os.path.getsize(file_path)
+    probe = await probe_audio(file_path)
+    
+    if probe is None and Path(file_path).suffix.lower() in WHISPER_EXTENSIONS and file_size <= WHISPER_MAX_UPLOAD_BYTES:
+        # Without a probe (e.g. no ffprobe installed) trust the extension, as before
+        logger.warning(f"Could not probe {file_path}; sending as-is based on its extension")
+        return file_path, None, None
+    
+    if not needs_transcoding(probe, file_size, Path(file_path).suffix):
+        logger.info(f"Audio is already upload-ready ({probe.format_name}/{probe.codec_name}, {file_size} bytes); skipping conversion")
+        return file_path, probe, None
+    
+    if should_trim_silence(probe):
+        try:
+            trimmed_path, time_map = await trim_silence(file_path)
+        except HTTPException as e:
+            # A plain transcode reports the error properly if the file really is unreadable
+            logger.warning(f"Silence trimming failed for {file_path} ({e.detail}); converting untrimmed")
+        else:
+            logger.info(f"Converted audio with '{AUDIO_TRANSCODE_PROFILE}' profile: {file_size} -> {os.path.getsize(trimmed_path)} bytes")
+            trimmed_probe = AudioProbe(
+                format_name="", codec_name="", duration=time_map.duration,
+                bit_rate=AUDIO_PROFILES[AUDIO_TRANSCODE_PROFILE]["bit_rate"], channels=1, sample_rate=SILENCE_SAMPLE_RATE,
+            )
+            return trimmed_path, trimmed_probe, time_map
+    
+    converted_path = await transcode_audio(file_path)
+    converted_size = os.path.getsize(converted_path)
+    logger.info(f"Converted audio with '{AUDIO_TRANSCODE_PROFILE}' profile: {file_size} -> {converted_size} bytes")
+    
+    # Duration is unchanged by re-encoding; keep it for the segmentation decision
+    converted_probe = AudioProbe(
+        format_name="", codec_name="", duration=probe.duration if probe else None,
+        bit_rate=AUDIO_PROFILES[AUDIO_TRANSCODE_PROFILE]["bit_rate"], channels=None, sample_rate=None,
+    )
+    return converted_path, converted_probe, None
+
+class MultipartBody(NamedTuple):
+    content_type: str
+    content_length: int
+    chunks: Callable[[], Iterator[bytes]]
+
+def build_multipart_body(
+    fields: Dict[str, str],
+    file_field: str,
+    file_path: str,
+    filename: str,
+    file_content_type: str,
+    boundary: str = "----WebKitFormBoundary7MA4YWxkTrZu0gW",
+    chunk_size: int = UPLOAD_STREAM_CHUNK_BYTES,
+) -> MultipartBody:
+    """
+    Describe a multipart/form-data body whose file part is streamed from disk.
+    Content-Length is computed up front from the file size, and `chunks()`
+    yields the body at most `chunk_size` bytes of file data at a time, so
+    memory per request stays fixed regardless of file size.
+    """
+    head = []
+    for name, value in fields.items():
+        head.append(f"--{boundary}".encode())
+        head.append(f'Content-Disposition: form-data; name="{name}"'.encode())
+        head.append(b"")
+        head.append(value.encode())
+    
+    head.append(f"--{boundary}".encode())
+    head.append(f'Content-Disposition: form-data; name="{file_field}"; filename="{filename}"'.encode())
+    head.append(f"Content-Type: {file_content_type}".encode())
+    head.append(b"")
+    
+    prefix = b"\r\n".join(head) + b"\r\n"
+    suffix = f"\r\n--{boundary}--".encode()
+    content_length = len(prefix) + os.path.getsize(file_path) + len(suffix)
+    
+    def chunks() -> Iterator[bytes]:
+        yield prefix
+        with open(file_path, "rb") as audio_file:
+            while chunk := audio_file.read(chunk_size):
+                yield chunk
+        yield suffix
+    
+    return MultipartBody(f"multipart/form-data; boundary={boundary}", content_length, chunks)
+
+DEMO_TRANSCRIPT = """
             This is a demo transcription. In a real deployment with an OpenAI API key, 
             this would contain the actual transcription of your uploaded audio file.
             
@@ -239,81 +3379,386 @@ async def transcribe_audio(file_path: str) -> str:
             - Identified equipment needs
             - Planned next steps for the practice
             """
+
+async def _transcribe_file(file_path: str, response_format: str = "text") -> str:
+    """Send one audio file to the Whisper API and return the raw response text"""
+    # Stream the multipart body from disk instead of reading the file into memory
+    extension = Path(file_path).suffix.lower() or ".wav"
+    multipart = build_multipart_body(
+        fields={"model": TRANSCRIPTION_MODEL, "response_format": response_format},
+        file_field="file",
+        file_path=file_path,
+        filename=f"audio{extension}",
+        file_content_type=mimetypes.guess_type(f"audio{extension}")[0] or "application/octet-stream",
+    )
+    
+    response = await upstream.request(
+        "POST",
+        OPENAI_TRANSCRIPTION_PATH,
+        body=multipart.chunks,
+        headers={
+            "Content-Type": multipart.content_type,
+            "Content-Length": str(multipart.content_length),
+        },
+        timeout=TRANSCRIPTION_TIMEOUT_SECONDS,
+    )
+    return response.body.decode('utf-8')
+
+def should_segment_transcription(file_path: str, duration: Optional[float]) -> bool:
+    """Decide whether a file goes to Whisper in one request or in chunks"""
+    if duration is None or TRANSCRIPTION_SEGMENT_MODE == "never":
+        # Chunk windows are cut by time, so the duration has to be known
+        return False
+    if TRANSCRIPTION_SEGMENT_MODE == "always":
+        return True
+    if os.path.getsize(file_path) > WHISPER_MAX_UPLOAD_BYTES:
+        return True
+    return duration > TRANSCRIPTION_CHUNK_SECONDS + TRANSCRIPTION_CHUNK_OVERLAP_SECONDS
+
+def plan_audio_chunks(duration: float, chunk_seconds: float, overlap_seconds: float) -> list[tuple[float, float]]:
+    """Overlapping [start, end) windows (in seconds) covering the whole recording"""
+    step = max(1.0, chunk_seconds - overlap_seconds)
+    windows = []
+    start = 0.0
+    while True:
+        end = min(start + chunk_seconds, duration)
+        windows.append((start, end))
+        if end >= duration:
+            return windows
+        start += step
+
+def _normalize_word(word: str) -> str:
+    return re.sub(r"[^\w']", "", word.lower())
+
+def _dedupe_seam(previous_text: str, next_text: str, max_words: int = 30, min_words: int = 2) -> str:
+    """
+    Drop the words at the start of `next_text` that repeat the end of
+    `previous_text` (the same speech heard in two overlapping chunks).
+    """
+    previous_words = [_normalize_word(w) for w in previous_text.split()[-max_words:]]
+    next_raw = next_text.split()
+    next_words = [_normalize_word(w) for w in next_raw[:max_words]]
+    
+    for size in range(min(len(previous_words), len(next_words)), min_words - 1, -1):
+        if previous_words[-size:] == next_words[:size]:
+            return " ".join(next_raw[size:])
+    return next_text
+
+def stitch_chunk_transcripts(chunk_results: list[tuple[float, float, Dict[str, Any]]], overlap_seconds: float) -> Dict[str, Any]:
+    """
+    Merge per-chunk verbose transcripts into one transcript.
+    
+    Each overlap is split at its midpoint: a segment belongs to the chunk
+    whose half of the overlap contains the segment's centre, and timestamps
+    are shifted to the original recording. Any words still duplicated at a
+    seam are removed by matching the end of one chunk to the start of the next.
+    """
+    text_parts: list[str] = []
+    segments: list[Dict[str, Any]] = []
+    last = len(chunk_results) - 1
+    
+    for index, (chunk_start, chunk_end, result) in enumerate(chunk_results):
+        lower = chunk_start + overlap_seconds / 2 if index > 0 else float("-inf")
+        upper = chunk_end - overlap_seconds / 2 if index < last else float("inf")
         
-        # Use direct HTTP request to OpenAI API with urllib
-        import urllib.request
-        import urllib.parse
+        chunk_segments = result.get("segments") or []
+        if chunk_segments:
+            kept = []
+            for segment in chunk_segments:
+                start = chunk_start + float(segment.get("start", 0))
+                end = chunk_start + float(segment.get("end", 0))
+                if lower <= (start + end) / 2 < upper:
+                    kept.append({"start": round(start, 2), "end": round(end, 2), "text": segment.get("text", "").strip()})
+            chunk_text = " ".join(segment["text"] for segment in kept if segment["text"])
+        else:
+            kept = []
+            chunk_text = (result.get("text") or "").strip()
         
-        with open(file_path, "rb") as audio_file:
-            # Create multipart form data manually
-            boundary = "----WebKitFormBoundary7MA4YWxkTrZu0gW"
-            
-            # Build multipart body
-            body = []
-            body.append(f"--{boundary}".encode())
-            body.append(b'Content-Disposition: form-data; name="model"')
-            body.append(b"")
-            body.append(b"whisper-1")
-            
-            body.append(f"--{boundary}".encode())
-            body.append(b'Content-Disposition: form-data; name="response_format"')
-            body.append(b"")
-            body.append(b"text")
-            
-            body.append(f"--{boundary}".encode())
-            body.append(b'Content-Disposition: form-data; name="file"; filename="audio.wav"')
-            body.append(b'Content-Type: audio/wav')
-            body.append(b"")
-            body.append(audio_file.read())
-            
-            body.append(f"--{boundary}--".encode())
-            
-            data = b"\r\n".join(body)
-            
-            # Create request
-            req = urllib.request.Request(
-                OPENAI_TRANSCRIPTION_URL,
-                data=data,
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": f"multipart/form-data; boundary={boundary}"
-                }
-            )
-            
+        if text_parts and chunk_text:
+            deduped = _dedupe_seam(text_parts[-1], chunk_text)
+            if kept and deduped != chunk_text:
+                # Keep segment text in step with the de-duplicated transcript
+                dropped = len(chunk_text.split()) - len(deduped.split())
+                first_words = kept[0]["text"].split()
+                kept[0]["text"] = " ".join(first_words[min(dropped, len(first_words)):])
+            chunk_text = deduped
+        
+        if chunk_text:
+            text_parts.append(chunk_text)
+        segments.extend(segment for segment in kept if segment["text"])
+    
+    return {"text": " ".join(text_parts), "segments": segments}
+
+async def transcribe_audio_segmented(file_path: str, duration: float) -> Dict[str, Any]:
+    """
+    Transcribe a long recording as overlapping chunks sent to Whisper
+    concurrently (at most TRANSCRIPTION_MAX_PARALLEL_CHUNKS at once), so
+    latency tracks the slowest chunk rather than the total duration. Each
+    window is cut by ffmpeg with a seek, so the full recording is never decoded here.
+    """
+    windows = plan_audio_chunks(duration, TRANSCRIPTION_CHUNK_SECONDS, TRANSCRIPTION_CHUNK_OVERLAP_SECONDS)
+    logger.info(f"Transcribing {len(windows)} chunks ({TRANSCRIPTION_CHUNK_SECONDS:.0f}s, {TRANSCRIPTION_CHUNK_OVERLAP_SECONDS:.0f}s overlap)")
+    
+    fan_out = asyncio.Semaphore(TRANSCRIPTION_MAX_PARALLEL_CHUNKS)
+    
+    async def transcribe_chunk(start: float, end: float) -> Dict[str, Any]:
+        async with fan_out:
+            chunk_path = await transcode_audio(file_path, start=start, duration=end - start)
             try:
-                with urllib.request.urlopen(req, timeout=60) as response:
-                    if response.status == 200:
-                        return response.read().decode('utf-8')
-                    else:
-                        raise Exception(f"OpenAI API error: {response.status}")
-            except urllib.error.HTTPError as e:
-                error_msg = e.read().decode('utf-8') if e.fp else str(e)
-                raise Exception(f"OpenAI API error: {e.code} - {error_msg}")
-                
+                return json.loads(await _transcribe_file(chunk_path, response_format="verbose_json"))
+            finally:
+                os.unlink(chunk_path)
+    
+    results = await gather_or_cancel(*(transcribe_chunk(start, end) for start, end in windows))
+    
+    stitched = stitch_chunk_transcripts(
+        [(start, end, result) for (start, end), result in zip(windows, results)],
+        TRANSCRIPTION_CHUNK_OVERLAP_SECONDS,
+    )
+    stitched["chunks"] = len(windows)
+    return stitched
+
+async def transcribe_audio_detailed(file_path: str, duration: Optional[float] = None, probed: bool = False) -> Dict[str, Any]:
+    """
+    Transcribe audio file, returning {"text", "segments", "chunks"}.
+    Long recordings go through segmented mode (see TRANSCRIPTION_SEGMENT_MODE);
+    segments carry timestamps into the original recording when available.
+    `duration` (seconds) is probed when not supplied, unless `probed` says
+    the caller already tried (a failed probe isn't worth repeating).
+    """
+    try:
+        if not api_available:
+            # Demo mode - return sample transcript
+            return {"text": DEMO_TRANSCRIPT, "segments": [], "chunks": 1}
+        
+        if duration is None and not probed:
+            probe = await probe_audio(file_path)
+            duration = probe.duration if probe else None
+        if should_segment_transcription(file_path, duration):
+            return await transcribe_audio_segmented(file_path, duration)
+        
+        text = await _transcribe_file(file_path)
+        return {"text": text, "segments": [], "chunks": 1}
+        
+    except HTTPException:
+        raise
+    except UpstreamError as e:
+        logger.error(f"Transcription failed: {str(e)}")
+        if e.status == 429:
+            raise upstream_rate_limited(OPENAI_TRANSCRIPTION_PATH)
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
     except Exception as e:
         logger.error(f"Transcription failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
-async def extract_report_sections(transcript: str) -> Dict[str, str]:
-    """Extract report sections from transcript using GPT"""
-    try:
-        prompt = f"""
-You are an expert at organizing training post-OST reports. Please analyze the following transcript from a training session and extract information for each of the report sections below. If a section is not mentioned in the transcript, return an empty string for that field.
+async def transcribe_audio(file_path: str, duration: Optional[float] = None) -> str:
+    """Transcribe audio file using OpenAI Whisper API via direct HTTP request"""
+    return (await transcribe_audio_detailed(file_path, duration=duration))["text"]
 
-IMPORTANT INSTRUCTIONS:
-- Use direct quotes from the transcription whenever possible
-- Be as detailed as possible - include all relevant information mentioned
-- List each point using markdown numbered format: [1], [2], [3], etc.
-- Preserve exact numbers, names, and specific details from the transcript
-- Include context and background information when mentioned
-- Do not summarize - provide comprehensive, detailed extraction
+REPORT_SYSTEM_PROMPT = "You are a professional assistant that extracts structured information from training session transcripts. Always return valid JSON."
 
-Transcript:
-{transcript}
+DEMO_REPORT_DATA = {
+    "postost_wins": "[1] Successfully implemented new patient scheduling system [2] Increased patient satisfaction scores by 15% [3] Team completed advanced training certification",
+    "client_goals": "[1] Target: Increase monthly revenue to $50,000 [2] Goal: See 200 patients per month [3] Metric: Achieve 95% appointment adherence rate",
+    "postost_holdbacks": "[1] Limited operatory space constraining patient flow [2] Staffing shortage affecting appointment capacity [3] Insurance processing delays impacting cash flow",
+    "human_capital": "[1] Current team: 2 hygienists, 1 assistant [2] Need to hire: 1 additional dental assistant [3] Training required: New software system for front desk",
+    "marketing": "[1] Social media campaign running on Facebook and Instagram [2] Referral program showing 20% increase in new patients [3] Google Ads campaign needs optimization",
+    "space_and_equipment": "[1] 4 operatories currently operational [2] Need new digital X-ray equipment [3] Waiting room renovation planned for next quarter",
+    "clinical_duplication": "[1] Provider seeing 25-30 patients per day [2] Hygienist capacity at 8-10 patients per day [3] Same-day emergency slots available",
+    "financial": "[1] Monthly overhead: $35,000 [2] Collections rate: 92% [3] Insurance reimbursement average: 85%",
+    "upcoming_milestones": "[1] Quarterly review meeting on March 15th [2] New equipment installation scheduled for April [3] Staff training workshop planned for May",
+    "homework_doctor": "[1] Review treatment plans for comprehensive cases [2] Follow up with specialist referrals [3] Complete continuing education requirements",
+    "homework_trainer": "[1] Schedule follow-up coaching session [2] Provide additional resources for team training [3] Monitor implementation of new protocols",
+    "next_steps": "[1] Implement new scheduling protocols [2] Begin recruitment for additional staff [3] Finalize equipment purchase decisions"
+}
 
-Please organize the information into these sections and return ONLY a valid JSON object with these exact keys:
+# ---------------------------------------------------------------------------
+# Transcript compaction
+#
+# The transcript is the bulk of every extraction prompt, and spoken language
+# is padded: fillers, stutters, false starts and phrases said twice. Before
+# extraction, "light" compaction normalizes whitespace and removes those;
+# "relevant" also drops small talk, keeping only sentences that touch a report
+# section (plus their neighbours). Digits, quotes and capitalized names are
+# never removed, since the prompt asks for exact numbers and direct quotes.
+# The client still receives the full transcript; only the prompt is compacted.
+# ---------------------------------------------------------------------------
 
-{{
+COMPACTION_TOKENS = metrics.counter("transcript_compaction_tokens_total", "Estimated transcript tokens before and after compaction")
+
+# Fillers that carry no content, set off by commas or as a sentence of their own
+# (hyphens count as part of the word, so "mm-hmm" and "uh-huh" are left whole)
+_FILLERS = r"(?<![\w-])(?:u+m+|u+h+|e+r+m*|h+m+|m+h?m+)(?![\w-])"
+_FILLER_PATTERN = re.compile(rf"(?:,\s*)?{_FILLERS},?(?=\s|$|[.!?])", re.IGNORECASE)
+_FILLER_SENTENCE_PATTERN = re.compile(rf"(?:^|(?<=[.!?]\s)){_FILLERS}[.!?](?:\s+|$)", re.IGNORECASE)
+_HEDGE_PATTERN = re.compile(r",\s*(?:you know|i mean|like|sort of|kind of),", re.IGNORECASE)
+# A cut-off word restarted in full: "we were go- going" (letters only, so
+# a range like "5- 50" is left alone)
+_FALSE_START_PATTERN = re.compile(r"\b([^\W\d_]+)-\s+(?=\1[^\W\d_]*\b)", re.IGNORECASE)
+# Words that are correctly said twice in a row ("I know that that works")
+_LEGITIMATE_REPEATS = {"that", "had", "is", "do"}
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Words that signal content for some report section (see REPORT_FIELD_PROMPTS).
+# Each term matches whole words; a trailing * matches any word it starts.
+COMPACTION_RELEVANCE_TERMS = (
+    "win", "wins", "celebrat*", "success*", "achiev*", "improv*", "proud",
+    "goal*", "target*", "stat", "stats", "statistic*", "number*", "metric*", "baseline*", "incentive*", "bonus*",
+    "tracking", "tracked",
+    "problem*", "issue*", "challeng*", "struggl*", "concern*", "barrier*", "obstacle*", "frustrat*", "difficult*",
+    "staff*", "team*", "hire", "hired", "hires", "hiring", "recruit*", "employ*", "assistant*", "hygien*",
+    "front desk", "manager*", "turnover", "quit",
+    "marketing", "advertis*", "campaign*", "leads", "referral*", "review*", "social media", "website*",
+    "mailer*", "mailing*", "email*", "promot*",
+    "operator*", "operatory", "operatories", "equipment", "chair*", "lease*", "remodel*", "expansion*", "expand*",
+    "clinic*", "provider*", "doctor*", "schedul*", "workflow*", "procedure*", "treatment*", "patient*", "appointment*",
+    "financ*", "budget*", "revenue*", "collection*", "production", "cost*", "price*", "pricing", "fee", "fees",
+    "payment*", "payroll", "insur*", "loan*", "profit*", "dollar*",
+    "milestone*", "renew*", "deadline*", "quarter*", "annual*", "training*", "trainer*", "seminar*",
+    "homework", "task*", "action item*", "follow-up*", "follow up", "commit*", "implement*", "next step*", "plan", "plans", "planning",
+)
+
+def _relevance_term_pattern(term: str) -> str:
+    words = r"\s+".join(re.escape(word) for word in term.rstrip("*").split())
+    return words if term.endswith("*") else words + r"\b"
+
+_RELEVANCE_PATTERN = re.compile(
+    r"\b(?:" + "|".join(_relevance_term_pattern(term) for term in COMPACTION_RELEVANCE_TERMS) + ")", re.IGNORECASE
+)
+# A capitalized word after the first one is probably a name ("I" and "I'm" aside)
+_NAME_PATTERN = re.compile(r"\s(?!I\b|I')[A-Z]")
+
+class CompactedTranscript(NamedTuple):
+    text: str
+    tokens_before: int
+    tokens_after: int
+
+# Quoted speech is masked out of compaction and restored word for word
+_QUOTED_PATTERN = re.compile(r'"[^"]*"|“[^”]*”')
+_QUOTE_PLACEHOLDER = re.compile(r"\x00(\d+)\x00")
+
+def _is_protected_word(word: str, sentence_start: bool) -> bool:
+    """
+    Numbers, quotes (or their placeholders) and capitalized names are never
+    dropped. A capital that just starts a sentence doesn't make a name.
+    """
+    if any(ch.isdigit() or ch in "\"“”\x00" for ch in word):
+        return True
+    return not sentence_start and word[:1].isupper() and not re.match(r"I(?:'|\W*$)", word)
+
+def _drop_repeated_ngrams(words: list[str], max_n: int) -> list[str]:
+    """
+    Collapse a phrase said twice (or more) in a row to one copy: "we need
+    to we need to hire" -> "we need to hire". Longer phrases are tried first.
+    Words compare case-insensitively; repeats that contain a number, a quote
+    or a name are kept.
+    """
+    normalized = [_normalize_word(word) for word in words]
+    protected = [
+        _is_protected_word(word, index == 0 or words[index - 1][-1:] in ".!?")
+        for index, word in enumerate(words)
+    ]
+    kept: list[str] = []
+    kept_normalized: list[str] = []
+    kept_protected: list[bool] = []
+    for word, norm, is_protected in zip(words, normalized, protected):
+        kept.append(word)
+        kept_normalized.append(norm)
+        kept_protected.append(is_protected)
+        for n in range(min(max_n, len(kept) // 2), 0, -1):
+            if kept_normalized[-1] != kept_normalized[-1 - n]:
+                continue
+            tail, previous = kept_normalized[-n:], kept_normalized[-2 * n:-n]
+            if tail != previous or not all(tail) or any(kept_protected[-2 * n:]):
+                continue
+            if n == 1 and tail[0] in _LEGITIMATE_REPEATS:
+                continue
+            # Keep the later copy: it carries the punctuation that ends the phrase
+            del kept[-2 * n:-n]
+            del kept_normalized[-2 * n:-n]
+            del kept_protected[-2 * n:-n]
+            break
+    return kept
+
+def _light_compact(text: str, max_n: int) -> str:
+    text = " ".join(text.split())
+    quotes: list[str] = []
+    
+    def mask_quote(match: re.Match) -> str:
+        quotes.append(match.group())
+        return f"\x00{len(quotes) - 1}\x00"
+    
+    text = _QUOTED_PATTERN.sub(mask_quote, text)
+    text = _FALSE_START_PATTERN.sub("", text)
+    text = _HEDGE_PATTERN.sub("", text)
+    text = _FILLER_SENTENCE_PATTERN.sub("", text)
+    # "Anyway, uh, production" keeps one of the commas around the filler
+    text = _FILLER_PATTERN.sub(lambda match: "," if match.group().startswith(",") and match.group().endswith(",") else "", text)
+    text = " ".join(_drop_repeated_ngrams(text.split(), max_n))
+    # Tidy what the removals left behind: ", ," and space before punctuation
+    text = re.sub(r"\s+([,.!?])", r"\1", text)
+    text = re.sub(r",(?:\s*,)+", ",", text)
+    text = re.sub(r"(^|[.!?]\s+),\s*", r"\1", text)
+    # Sentences that lost their first word(s) still start with a capital
+    text = re.sub(r"(^|[.!?]\s+)([a-z])", lambda match: match.group(1) + match.group(2).upper(), text)
+    text = _QUOTE_PLACEHOLDER.sub(lambda match: quotes[int(match.group(1))], text)
+    return text.strip()
+
+def _is_relevant_sentence(sentence: str) -> bool:
+    if any(ch.isdigit() or ch in "\"“”$%" for ch in sentence):
+        return True
+    return bool(_NAME_PATTERN.search(sentence) or _RELEVANCE_PATTERN.search(sentence))
+
+def _relevant_passages(text: str, context: int) -> str:
+    """Keep the sentences that touch a report section, each with `context` neighbours either side"""
+    sentences = _SENTENCE_END.split(text)
+    keep = [False] * len(sentences)
+    for index, sentence in enumerate(sentences):
+        if _is_relevant_sentence(sentence):
+            for neighbour in range(max(0, index - context), min(len(sentences), index + context + 1)):
+                keep[neighbour] = True
+    passages, current = [], []
+    for sentence, kept in zip(sentences, keep):
+        if kept:
+            current.append(sentence)
+        elif current:
+            passages.append(" ".join(current))
+            current = []
+    if current:
+        passages.append(" ".join(current))
+    # "..." marks where small talk was cut, so quotes aren't read as continuous
+    return " ... ".join(passages)
+
+def compact_transcript(transcript: str, mode: Optional[str] = None) -> CompactedTranscript:
+    """Compact a transcript for the extraction prompt (TRANSCRIPT_COMPACTION unless `mode` is given)"""
+    mode = mode or TRANSCRIPT_COMPACTION
+    tokens_before = estimate_tokens(transcript)
+    if mode == "off" or not transcript.strip():
+        return CompactedTranscript(transcript, tokens_before, tokens_before)
+    
+    with StageTimer("compact", bytes_in=len(transcript.encode("utf-8")), log=False) as stage:
+        text = _light_compact(transcript, TRANSCRIPT_COMPACTION_MAX_NGRAM)
+        if mode == "relevant":
+            relevant = _relevant_passages(text, TRANSCRIPT_COMPACTION_CONTEXT_SENTENCES)
+            # Too little matched to trust the selection; send the light compaction instead
+            if len(relevant) >= len(text) * TRANSCRIPT_COMPACTION_MIN_RELEVANT_FRACTION:
+                text = relevant
+            else:
+                logger.info(f"Relevant passages kept only {len(relevant)} of {len(text)} characters; using light compaction")
+        stage.bytes_out = len(text.encode("utf-8"))
+    
+    tokens_after = estimate_tokens(text)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.values.update(transcript_tokens=tokens_before, compacted_transcript_tokens=tokens_after)
+    COMPACTION_TOKENS.inc(tokens_before, stage="before", mode=mode)
+    COMPACTION_TOKENS.inc(tokens_after, stage="after", mode=mode)
+    saved = 100 * (tokens_before - tokens_after) / tokens_before if tokens_before else 0
+    logger.info(f"Transcript compaction ({mode}): {tokens_before} -> {tokens_after} tokens ({saved:.0f}% smaller)")
+    return CompactedTranscript(text, tokens_before, tokens_after)
+
+# Prompt descriptions for each REPORT_FIELDS key
+REPORT_FIELD_PROMPTS = {
     "postost_wins": "WINS/CELEBRATIONS - Notable successes, achievements, improvements, positive outcomes - use [1], [2], [3] format",
     "client_goals": "STAT/GOAL REVIEW - Baseline numbers, goals, targets, metrics, incentives in place - use [1], [2], [3] format",
     "postost_holdbacks": "BIGGEST BARRIERS OR ISSUES CLIENT IS STRUGGLING WITH - Problems, challenges, obstacles, concerns - use [1], [2], [3] format",
@@ -326,79 +3771,413 @@ Please organize the information into these sections and return ONLY a valid JSON
     "homework_doctor": "HOMEWORK FOR DOCTOR - Action items, tasks, commitments for the doctor - use [1], [2], [3] format",
     "homework_trainer": "HOMEWORK FOR TRAINER - Follow-up actions, tasks for the trainer - use [1], [2], [3] format",
     "next_steps": "NEXT STEPS - Future actions, planned activities, implementation steps - use [1], [2], [3] format"
+}
+
+def build_report_prompt(transcript: str, fields: Optional[list[str]] = None, part: Optional[tuple[int, int]] = None) -> str:
+    """
+    User prompt asking GPT for `fields` (default: all REPORT_FIELDS) as one
+    JSON object. `part=(index, count)` marks the transcript as one piece of
+    a longer session.
+    """
+    fields = fields or list(REPORT_FIELDS)
+    json_keys = ",\n".join(f'    "{key}": "{REPORT_FIELD_PROMPTS[key]}"' for key in fields)
+    transcript_label = f"Transcript (part {part[0]} of {part[1]} of a longer session):" if part else "Transcript:"
+    
+    return f"""
+You are an expert at organizing training post-OST reports. Please analyze the following transcript from a training session and extract information for each of the report sections below. If a section is not mentioned in the transcript, return an empty string for that field.
+
+IMPORTANT INSTRUCTIONS:
+- Use direct quotes from the transcription whenever possible
+- Be as detailed as possible - include all relevant information mentioned
+- List each point using markdown numbered format: [1], [2], [3], etc.
+- Preserve exact numbers, names, and specific details from the transcript
+- Include context and background information when mentioned
+- Do not summarize - provide comprehensive, detailed extraction
+
+{transcript_label}
+{transcript}
+
+Please organize the information into these sections and return ONLY a valid JSON object with these exact keys:
+
+{{
+{json_keys}
 }}
 
 For each field, extract ALL relevant information from the transcript using [1], [2], [3] numbered points. Use direct quotes where applicable and be as comprehensive as possible. If no information is available for a field, use an empty string.
 """
 
-        # Parse the JSON response
-        import json
+def build_report_request(transcript: str, fields: Optional[list[str]] = None, part: Optional[tuple[int, int]] = None) -> Dict[str, Any]:
+    """Chat completion payload for report extraction"""
+    return {
+        "model": CHAT_MODEL,
+        "messages": [
+            {"role": "system", "content": REPORT_SYSTEM_PROMPT},
+            {"role": "user", "content": build_report_prompt(transcript, fields, part)}
+        ],
+        "temperature": 0.3
+    }
+
+def report_cache_key(transcript: str) -> Optional[str]:
+    """
+    Same transcript + model + prompt version + extraction settings -> same
+    report (demo mode is never cached)
+    """
+    if not api_available:
+        return None
+    groups = ";".join(",".join(group) for group in REPORT_FIELD_GROUPS)
+    settings = f"{REPORT_EXTRACTION_MODE}:{groups}:{REPORT_TRANSCRIPT_TOKEN_BUDGET}"
+    return sha256_text(f"{CHAT_MODEL}:{REPORT_PROMPT_VERSION}:{settings}:{sha256_text(transcript)}")
+
+def finalize_report(report_data: Dict[str, Any]) -> Dict[str, str]:
+    """Fill in missing REPORT_FIELDS and format numbered items"""
+    # Validate that all expected keys are present
+    for key in REPORT_FIELDS.keys():
+        if key not in report_data:
+            report_data[key] = ""
+    
+    # Format the text with proper line breaks and HTML tags
+    with StageTimer("format", bytes_in=sum(len(str(text)) for text in report_data.values()), log=False) as stage:
+        formatted = format_report_text(report_data)
+        stage.bytes_out = sum(len(str(text)) for text in formatted.values())
+    return formatted
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+def split_transcript(transcript: str, max_tokens: int) -> list[str]:
+    """
+    Split a transcript into pieces of at most ~max_tokens, cutting at the
+    last sentence end (or whitespace) in each window.
+    """
+    if estimate_tokens(transcript) <= max_tokens:
+        return [transcript]
+    
+    max_chars = max_tokens * 4
+    parts = []
+    remaining = transcript.strip()
+    while len(remaining) > max_chars:
+        window = remaining[:max_chars]
+        cut = max(window.rfind(". "), window.rfind("? "), window.rfind("! "), window.rfind("\n"))
+        if cut < max_chars // 2:
+            cut = window.rfind(" ")
+        if cut <= 0:
+            cut = max_chars - 1
+        parts.append(remaining[:cut + 1].strip())
+        remaining = remaining[cut + 1:].strip()
+    if remaining:
+        parts.append(remaining)
+    return parts
+
+def merge_numbered_items(texts: list[Any]) -> str:
+    """
+    Reduce step for chunked extraction: concatenate the [n]-numbered items
+    extracted from each transcript piece, drop duplicates, and renumber.
+    """
+    items: list[str] = []
+    seen = set()
+    for text in texts:
+        if not text:
+            continue
+        pieces = [piece.strip() for piece in re.split(r'\[\d+\]', str(text))]
+        for item in pieces:
+            normalized = re.sub(r'\W+', ' ', item.lower()).strip()
+            if not normalized or normalized in seen:
+                continue
+            seen.add(normalized)
+            items.append(item)
+    return " ".join(f"[{number}] {item}" for number, item in enumerate(items, 1))
+
+class IncrementalJSONObjectParser:
+    """
+    Incremental parser for a flat JSON object arriving in pieces (e.g. a
+    streamed chat completion). `feed()` returns the (key, value) members
+    whose values closed within the new text. Anything before the opening
+    brace, such as a ```json fence, is ignored.
+    """
+    
+    def __init__(self):
+        self.state = "start"
+        self.key: Optional[str] = None
+        self.buffer: list[str] = []
+        self.escape = False
+        self.depth = 0
+        self.in_nested_string = False
+    
+    def _close_value(self, raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw.strip()
+    
+    def feed(self, text: str) -> list[tuple[str, Any]]:
+        completed = []
+        for ch in text:
+            state = self.state
+            
+            if state in ("key_string", "value_string"):
+                self.buffer.append(ch)
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    raw = "".join(self.buffer)
+                    if state == "key_string":
+                        self.key = self._close_value(raw)
+                        self.state = "colon"
+                    else:
+                        completed.append((self.key, self._close_value(raw)))
+                        self.state = "after_value"
+            
+            elif state == "value_other":
+                # Numbers, literals and nested arrays/objects: scan to the closing , or }
+                if self.in_nested_string:
+                    self.buffer.append(ch)
+                    if self.escape:
+                        self.escape = False
+                    elif ch == "\\":
+                        self.escape = True
+                    elif ch == '"':
+                        self.in_nested_string = False
+                elif self.depth == 0 and ch in ",}":
+                    completed.append((self.key, self._close_value("".join(self.buffer))))
+                    self.state = "key" if ch == "," else "end"
+                else:
+                    self.buffer.append(ch)
+                    if ch == '"':
+                        self.in_nested_string = True
+                    elif ch in "[{":
+                        self.depth += 1
+                    elif ch in "]}":
+                        self.depth -= 1
+            
+            elif state == "start":
+                if ch == "{":
+                    self.state = "key"
+            elif state == "key":
+                if ch == '"':
+                    self.state = "key_string"
+                    self.buffer = ['"']
+                elif ch == "}":
+                    self.state = "end"
+            elif state == "colon":
+                if ch == ":":
+                    self.state = "value"
+            elif state == "value":
+                if ch.isspace():
+                    continue
+                self.buffer = [ch]
+                if ch == '"':
+                    self.state = "value_string"
+                else:
+                    self.state = "value_other"
+                    self.depth = 1 if ch in "[{" else 0
+            elif state == "after_value":
+                if ch == ",":
+                    self.state = "key"
+                elif ch == "}":
+                    self.state = "end"
+        
+        return completed
+
+async def stream_chat_content(payload: Dict[str, Any]) -> AsyncIterator[str]:
+    """Yield the assistant's content deltas from a streamed chat completion"""
+    async for line in upstream.stream_lines(
+        "POST",
+        OPENAI_CHAT_PATH,
+        body=json.dumps({**payload, "stream": True}).encode('utf-8'),
+        headers={"Content-Type": "application/json", "Accept": "text/event-stream"},
+        timeout=CHAT_TIMEOUT_SECONDS,
+        cost=chat_token_cost(payload),
+    ):
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            # Keep reading until the server ends the body so the connection can be reused
+            continue
+        for choice in json.loads(data).get("choices", []):
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
+async def _extract_field_group(
+    transcript: str,
+    fields: list[str],
+    part: Optional[tuple[int, int]] = None,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+) -> Dict[str, Any]:
+    """
+    One chat completion for a group of fields. With `on_field` the completion
+    is streamed and each field is reported as soon as its value closes.
+    """
+    payload = build_report_request(transcript, fields, part)
+    
+    if on_field is None:
+        response = await upstream.request(
+            "POST",
+            OPENAI_CHAT_PATH,
+            body=json.dumps(payload).encode('utf-8'),
+            headers={"Content-Type": "application/json"},
+            timeout=CHAT_TIMEOUT_SECONDS,
+            cost=chat_token_cost(payload),
+        )
+        response_data = response.json()
+        return json.loads(response_data["choices"][0]["message"]["content"])
+    
+    result: Dict[str, Any] = {}
+    parser = IncrementalJSONObjectParser()
+    async for content in stream_chat_content(payload):
+        for key, value in parser.feed(content):
+            if key in fields and key not in result:
+                result[key] = value
+                on_field(key, value)
+    if not result:
+        raise json.JSONDecodeError("No report sections found in streamed response", "", 0)
+    return result
+
+async def extract_report_data(
+    transcript: str,
+    on_section: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, str]:
+    """
+    Extraction engine. REPORT_FIELD_GROUPS are queried concurrently (one
+    group in "single" mode), so wall-clock time follows the slowest group.
+    Transcripts over REPORT_TRANSCRIPT_TOKEN_BUDGET are mapped piece by piece
+    for every group and each field's numbered items are merged (reduce).
+    Returns formatted sections; `on_section` is called as each one is final.
+    """
+    groups = REPORT_FIELD_GROUPS if REPORT_EXTRACTION_MODE == "sharded" else [list(REPORT_FIELDS)]
+    parts = split_transcript(transcript, REPORT_TRANSCRIPT_TOKEN_BUDGET)
+    fan_out = asyncio.Semaphore(REPORT_MAX_PARALLEL_REQUESTS)
+    report_data: Dict[str, str] = {}
+    
+    logger.info(f"Extracting {len(REPORT_FIELDS)} sections in {len(groups)} groups over {len(parts)} transcript parts")
+    
+    def finish_section(key: str, value: Any):
+        with StageTimer("format", bytes_in=len(str(value)), log=False) as stage:
+            report_data[key] = format_report_text({key: value})[key]
+            stage.bytes_out = len(str(report_data[key]))
+        if on_section:
+            on_section(key, report_data[key])
+    
+    async def run_group(fields: list[str]):
+        if len(parts) == 1:
+            async with fan_out:
+                result = await _extract_field_group(parts[0], fields, on_field=finish_section if on_section else None)
+            if not on_section:
+                for key in fields:
+                    if key in result:
+                        finish_section(key, result[key])
+            return
+        
+        async def run_part(index: int, part_text: str) -> Dict[str, Any]:
+            async with fan_out:
+                return await _extract_field_group(part_text, fields, part=(index, len(parts)))
+        
+        results = await gather_or_cancel(*(run_part(index, text) for index, text in enumerate(parts, 1)))
+        for key in fields:
+            finish_section(key, merge_numbered_items([result.get(key, "") for result in results]))
+    
+    await gather_or_cancel(*(run_group(fields) for fields in groups))
+    
+    for key in REPORT_FIELDS:
+        if key not in report_data:
+            finish_section(key, "")
+    return {key: report_data[key] for key in REPORT_FIELDS}
+
+async def extract_report_sections(
+    transcript: str,
+    on_section: Optional[Callable[[str, str], None]] = None,
+) -> Dict[str, str]:
+    """
+    Extract report sections from transcript using GPT.
+    `on_section(field, text)`, if given, is called as each formatted section
+    becomes available (chat completions are streamed in that case).
+    """
+    try:
+        # The prompt gets the compacted transcript, so that is also what the cache is keyed by
+        transcript = (await asyncio.to_thread(compact_transcript, transcript)).text
+        cache_key = report_cache_key(transcript)
+        if cache_key:
+            cached_report = await report_cache.get(cache_key)
+            if cached_report is not None:
+                logger.info("Report cache hit; skipping GPT extraction")
+                if on_section:
+                    for key in REPORT_FIELDS:
+                        on_section(key, cached_report.get(key, ""))
+                return cached_report
         
         if not api_available:
             # Demo mode - return sample data
-            report_data = {
-                "postost_wins": "[1] Successfully implemented new patient scheduling system [2] Increased patient satisfaction scores by 15% [3] Team completed advanced training certification",
-                "client_goals": "[1] Target: Increase monthly revenue to $50,000 [2] Goal: See 200 patients per month [3] Metric: Achieve 95% appointment adherence rate",
-                "postost_holdbacks": "[1] Limited operatory space constraining patient flow [2] Staffing shortage affecting appointment capacity [3] Insurance processing delays impacting cash flow",
-                "human_capital": "[1] Current team: 2 hygienists, 1 assistant [2] Need to hire: 1 additional dental assistant [3] Training required: New software system for front desk",
-                "marketing": "[1] Social media campaign running on Facebook and Instagram [2] Referral program showing 20% increase in new patients [3] Google Ads campaign needs optimization",
-                "space_and_equipment": "[1] 4 operatories currently operational [2] Need new digital X-ray equipment [3] Waiting room renovation planned for next quarter",
-                "clinical_duplication": "[1] Provider seeing 25-30 patients per day [2] Hygienist capacity at 8-10 patients per day [3] Same-day emergency slots available",
-                "financial": "[1] Monthly overhead: $35,000 [2] Collections rate: 92% [3] Insurance reimbursement average: 85%",
-                "upcoming_milestones": "[1] Quarterly review meeting on March 15th [2] New equipment installation scheduled for April [3] Staff training workshop planned for May",
-                "homework_doctor": "[1] Review treatment plans for comprehensive cases [2] Follow up with specialist referrals [3] Complete continuing education requirements",
-                "homework_trainer": "[1] Schedule follow-up coaching session [2] Provide additional resources for team training [3] Monitor implementation of new protocols",
-                "next_steps": "[1] Implement new scheduling protocols [2] Begin recruitment for additional staff [3] Finalize equipment purchase decisions"
-            }
+            report_data = finalize_report(dict(DEMO_REPORT_DATA))
+            if on_section:
+                for key in REPORT_FIELDS:
+                    on_section(key, report_data[key])
         else:
-            # Real OpenAI processing with direct HTTP request using urllib
-            data = {
-                "model": "gpt-4",
-                "messages": [
-                    {"role": "system", "content": "You are a professional assistant that extracts structured information from training session transcripts. Always return valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.3
-            }
-            
-            # Create request with urllib
-            req = urllib.request.Request(
-                OPENAI_CHAT_URL,
-                data=json.dumps(data).encode('utf-8'),
-                headers={
-                    "Authorization": f"Bearer {OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                }
-            )
-            
-            try:
-                with urllib.request.urlopen(req, timeout=60) as response:
-                    if response.status == 200:
-                        response_data = json.loads(response.read().decode('utf-8'))
-                        report_data = json.loads(response_data["choices"][0]["message"]["content"])
-                    else:
-                        raise Exception(f"OpenAI API error: {response.status}")
-            except urllib.error.HTTPError as e:
-                error_msg = e.read().decode('utf-8') if e.fp else str(e)
-                raise Exception(f"OpenAI API error: {e.code} - {error_msg}")
+            # Real OpenAI processing through the shared upstream client
+            report_data = await extract_report_data(transcript, on_section)
         
-        # Validate that all expected keys are present
-        for key in REPORT_FIELDS.keys():
-            if key not in report_data:
-                report_data[key] = ""
-        
-        # Format the text with proper line breaks and HTML tags
-        report_data = format_report_text(report_data)
+        if cache_key:
+            await report_cache.put(cache_key, report_data)
         
         return report_data
         
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse GPT response as JSON: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to parse AI response")
+    except UpstreamError as e:
+        logger.error(f"GPT extraction failed: {str(e)}")
+        if e.status == 429:
+            raise upstream_rate_limited(OPENAI_CHAT_PATH)
+        raise HTTPException(status_code=500, detail=f"AI processing failed: {str(e)}")
     except Exception as e:
         logger.error(f"GPT extraction failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"AI processing failed: {str(e)}")
 
+async def stream_report_sections(transcript: str) -> AsyncIterator[tuple[str, str]]:
+    """Yield (field, formatted_text) pairs from extract_report_sections as they complete"""
+    sections: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(
+        extract_report_sections(transcript, on_section=lambda key, text: sections.put_nowait((key, text)))
+    )
+    task.add_done_callback(lambda _: sections.put_nowait(None))
+    
+    try:
+        while (item := await sections.get()) is not None:
+            yield item
+        await task
+    finally:
+        if not task.done():
+            task.cancel()
+
+class ExtractRequest(BaseModel):
+    transcript: str
+
+@app.post("/api/post-report/extract/stream")
+async def stream_extract_report(request: ExtractRequest):
+    """
+    Extract report sections from a transcript, streaming each finished
+    section as a Server-Sent Event (`event: section`, data {"field", "text"}),
+    then `event: done` with the full report_data (or `event: error`).
+    """
+    async def event_stream():
+        report_data = {}
+        try:
+            async for key, text in stream_report_sections(request.transcript):
+                report_data[key] = text
+                yield f"event: section\ndata: {json.dumps({'field': key, 'text': text})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'success': True, 'report_data': report_data})}\n\n"
+        except HTTPException as e:
+            yield f"event: error\ndata: {json.dumps({'success': False, 'detail': e.detail})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -6,16 +6,244 @@
 
 console.log('AI Post Report JavaScript loaded successfully!');
 
+/**
+ * Resumable chunked upload to the backend's /api/uploads endpoints.
+ * Data can keep arriving after the upload starts (e.g. a recording in
+ * progress): append() queues it and chunks are sent in order in the
+ * background. After a network error or offset mismatch the uploader asks the
+ * server how many bytes it has and resumes from there, so a dropped
+ * connection only costs the chunk in flight.
+ */
+class ResumableUpload {
+    constructor(apiBaseUrl, { filename, contentType, totalSize = null, chunkSize = 1024 * 1024 }) {
+        this.apiBaseUrl = apiBaseUrl;
+        this.filename = filename;
+        this.contentType = contentType;
+        this.totalSize = totalSize;
+        this.chunkSize = chunkSize;
+        this.blob = new Blob([], { type: contentType });
+        this.offset = 0;            // bytes the server has confirmed
+        this.uploadUrl = null;
+        this.sending = null;        // promise of the running send loop
+        this.error = null;
+        this.aborted = false;
+        this.abortController = new AbortController();
+        this.onProgress = null;     // (sentBytes, knownBytes) => void
+        this.onBusy = null;         // (retryAfterSeconds) => void while finalize waits on a busy server
+        this.maxRetries = 8;
+    }
+    
+    async start() {
+        const response = await fetch(`${this.apiBaseUrl}/api/uploads`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ filename: this.filename, content_type: this.contentType, total_size: this.totalSize }),
+            signal: this.abortController.signal
+        });
+        const session = await this.readJson(response);
+        this.uploadUrl = `${this.apiBaseUrl}${session.upload_url}`;
+        this.sendPending();
+    }
+    
+    append(data) {
+        if (!data || !data.size) return;
+        this.blob = new Blob([this.blob, data], { type: this.contentType });
+        this.sendPending();
+    }
+    
+    sendPending() {
+        if (this.sending || !this.uploadUrl || this.aborted || this.error) return;
+        this.sending = this.sendLoop()
+            .catch(error => { this.error = error; })
+            .finally(() => {
+                this.sending = null;
+                // More data may have been appended while the last chunk was in flight
+                if (this.offset < this.blob.size) this.sendPending();
+            });
+    }
+    
+    async sendLoop() {
+        let failures = 0;
+        while (this.offset < this.blob.size && !this.aborted) {
+            const end = Math.min(this.offset + this.chunkSize, this.blob.size);
+            try {
+                const response = await fetch(this.uploadUrl, {
+                    method: 'PATCH',
+                    headers: { 'Upload-Offset': String(this.offset), 'Content-Type': 'application/offset+octet-stream' },
+                    body: this.blob.slice(this.offset, end),
+                    signal: this.abortController.signal
+                });
+                if (response.status === 409) {
+                    // The server has a different offset (e.g. a previous chunk partly arrived)
+                    this.offset = (await response.json()).offset;
+                } else {
+                    this.offset = (await this.readJson(response)).offset;
+                }
+                failures = 0;
+                if (this.onProgress) this.onProgress(this.offset, this.blob.size);
+            } catch (error) {
+                if (this.aborted || error.name === 'AbortError' || error.status === 413 || error.status === 404) throw error;
+                failures += 1;
+                if (failures > this.maxRetries) throw error;
+                
+                const delay = Math.min(30000, 1000 * 2 ** (failures - 1));
+                console.warn(`Chunk upload failed (${error.message}); resuming in ${delay / 1000}s`);
+                await new Promise(resolve => setTimeout(resolve, delay));
+                await this.syncOffset().catch(() => {});
+            }
+        }
+    }
+    
+    async syncOffset() {
+        const response = await fetch(this.uploadUrl, { cache: 'no-store', signal: this.abortController.signal });
+        this.offset = (await this.readJson(response)).offset;
+    }
+    
+    async finish() {
+        // Wait until everything appended so far has been confirmed by the server;
+        // a background failure gets one more round of retries before giving up
+        while (this.offset < this.blob.size) {
+            if (this.aborted) throw new Error('AbortError: Upload was cancelled');
+            this.error = null;
+            this.sendPending();
+            if (!this.sending) throw new Error('Upload was not started');
+            await this.sending;
+            if (this.error) throw this.error;
+        }
+        
+        const digest = await crypto.subtle.digest('SHA-256', await this.blob.arrayBuffer());
+        const sha256 = Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+        for (let attempt = 0; ; attempt++) {
+            const response = await fetch(`${this.uploadUrl}/finalize`, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ sha256 }),
+                signal: this.abortController.signal
+            });
+            try {
+                return await this.readJson(response);
+            } catch (error) {
+                // A busy server keeps the upload; queue it again once it says there is room
+                if (error.status !== 429 || attempt >= this.maxRetries) throw error;
+                if (this.onBusy) this.onBusy(error.retryAfter);
+                await new Promise(resolve => setTimeout(resolve, error.retryAfter * 1000));
+            }
+        }
+    }
+    
+    abort() {
+        this.aborted = true;
+        this.abortController.abort();
+        if (this.uploadUrl) {
+            fetch(this.uploadUrl, { method: 'DELETE' }).catch(() => {});
+        }
+    }
+    
+    async readJson(response) {
+        if (!response.ok) {
+            const errorData = await response.json().catch(() => ({}));
+            const error = new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
+            error.status = response.status;
+            error.retryAfter = Number(response.headers.get('Retry-After')) || 5;
+            throw error;
+        }
+        return response.json();
+    }
+}
+
+/**
+ * Live transcription over the backend's /api/live/ws WebSocket. Recorder
+ * chunks are sent as they are produced and the server transcribes the
+ * session in segments while it is still being recorded, sending the running
+ * transcript back. Stopping then only waits for the last segment and the
+ * report extraction instead of a transcription of the whole recording.
+ */
+class LiveTranscription {
+    constructor(apiBaseUrl) {
+        this.url = `${apiBaseUrl.replace(/^http/, 'ws')}/api/live/ws`;
+        this.socket = null;
+        this.transcript = '';
+        this.error = null;
+        this.result = null;         // promise of the server's 'complete' message
+        this.onTranscript = null;   // (runningTranscript) => void
+        this.onMessage = null;      // (message) => void for 'status' and 'section' updates
+    }
+    
+    start() {
+        return new Promise((resolveReady, rejectReady) => {
+            const socket = new WebSocket(this.url);
+            this.socket = socket;
+            
+            this.result = new Promise((resolve, reject) => {
+                socket.onmessage = (event) => {
+                    const message = JSON.parse(event.data);
+                    switch (message.type) {
+                        case 'ready':
+                            resolveReady();
+                            break;
+                        case 'transcript':
+                            if (message.text) {
+                                this.transcript = this.transcript ? `${this.transcript} ${message.text}` : message.text;
+                            }
+                            if (this.onTranscript) this.onTranscript(this.transcript);
+                            break;
+                        case 'complete':
+                            resolve(message);
+                            break;
+                        case 'error':
+                            this.error = new Error(message.detail);
+                            reject(this.error);
+                            break;
+                        default:
+                            if (this.onMessage) this.onMessage(message);
+                    }
+                };
+                socket.onclose = () => {
+                    // No-ops if the session already completed
+                    this.error = this.error || new Error('Live transcription connection closed');
+                    rejectReady(this.error);
+                    reject(this.error);
+                };
+            });
+            // Nobody awaits the result if the recording falls back to a normal upload
+            this.result.catch(() => {});
+        });
+    }
+    
+    get isOpen() {
+        return Boolean(this.socket && this.socket.readyState === WebSocket.OPEN && !this.error);
+    }
+    
+    send(data) {
+        if (this.isOpen && data && data.size) {
+            this.socket.send(data);
+        }
+    }
+    
+    finish() {
+        this.socket.send(JSON.stringify({ type: 'stop' }));
+        return this.result;
+    }
+    
+    close() {
+        if (this.socket) {
+            this.socket.close();
+        }
+    }
+}
+
 class AIPostReport {
     constructor() {
         // Auto-detect API URL based on hosting environment
         this.apiBaseUrl = this.getApiBaseUrl();
         this.fileInput = document.getElementById('ai-audio-file');
         this.uploadBtn = document.getElementById('ai-audio-upload-btn');
+        this.recordBtn = document.getElementById('ai-audio-record-btn');
         this.statusEl = document.getElementById('ai-status');
         this.errorEl = document.getElementById('ai-error');
         this.progressBar = document.getElementById('ai-progress-bar');
         this.progressPercentage = document.getElementById('ai-progress-percentage');
+        this.liveTranscriptEl = document.getElementById('ai-live-transcript');
         
         // Progress steps with new IDs
         this.progressSteps = {
@@ -28,6 +256,14 @@ class AIPostReport {
         this.isProcessing = false;
         this.abortController = null;
         this.processingInterval = null;
+        this.jobEventSource = null;
+        this.cancelJobWait = null;
+        this.injectedFields = new Set();
+        this.activeUpload = null;
+        this.liveTranscription = null;
+        this.mediaRecorder = null;
+        this.recordingTimer = null;
+        this.recordingTimeslice = 5000; // ms of audio per chunk handed to the uploader while recording
         this.isDemoOnly = false; // Now GitHub Pages connects to real AI backend
         this.wasManuallyAborted = false; // Track if user manually killed the robot
         
@@ -78,6 +314,12 @@ class AIPostReport {
         this.uploadBtn.addEventListener('click', () => this.handleUploadClick());
         this.fileInput.addEventListener('change', () => this.handleFileSelect());
         
+        // Recording uploads in the background while the session runs
+        if (this.recordBtn && navigator.mediaDevices && window.MediaRecorder && window.crypto && crypto.subtle) {
+            this.recordBtn.style.display = '';
+            this.recordBtn.addEventListener('click', () => this.toggleRecording());
+        }
+        
         // Show appropriate status based on hosting
         if (window.location.hostname.includes('github.io')) {
             this.updateStatus('🌐 GitHub Pages + Render.com AI - Real AI processing available! Upload an audio file to get started.');
@@ -105,7 +347,7 @@ class AIPostReport {
         this.processAudioFile(file);
     }
     
-    async processAudioFile(file) {
+    async processAudioFile(file, upload = null, live = null) {
         try {
             // Reset the manual abort flag for new processing
             this.wasManuallyAborted = false;
@@ -134,9 +376,23 @@ class AIPostReport {
             
             this.updateStatus(`Processing ${file.name}...`);
             
+            // A recording transcribed live only needs its last segment and the report
+            if (live) {
+                try {
+                    await this.finishLiveSession(live, file);
+                    if (upload) upload.abort();
+                    this.activeUpload = null;
+                    return;
+                } catch (error) {
+                    if (this.wasManuallyAborted) throw new Error('AbortError: Process was manually terminated');
+                    console.warn(`Live transcription failed (${error.message}); processing the uploaded recording instead`);
+                    this.resetProgress();
+                }
+            }
+            
             // Step 1: Upload and process
             this.setStepActive('upload');
-            await this.uploadAndProcess(file);
+            await this.uploadAndProcess(file, upload);
             
         } catch (error) {
             this.handleError(error.message);
@@ -222,116 +478,67 @@ class AIPostReport {
         this.injectReportData(demoData);
     }
     
-    async uploadAndProcess(file) {
-        this.abortController = new AbortController();
-        
-        const formData = new FormData();
-        formData.append('file', file);
-        
-        // Track upload progress and timing
-        const fileSize = file.size;
-        const fileSizeMB = (fileSize / (1024 * 1024)).toFixed(1);
-        let uploadStartTime = Date.now();
+    async uploadAndProcess(file, upload = null) {
+        // `upload` is passed for recordings, whose chunks are already on the server
+        const fileSizeMB = (file.size / (1024 * 1024)).toFixed(1);
         let totalStartTime = Date.now();
         
         try {
-            // Step 1: Starting upload
+            // Step 1: Send the file in resumable chunks (only the tail is left for a recording)
             this.setStepActive('upload');
             this.updateProgress(5);
-            this.updateStatus(`📤 Starting upload of ${file.name} (${fileSizeMB} MB)...`);
-            await this.simulateDelay(500);
-            
-            // Step 2: Simulate upload progress
-            const uploadDuration = Math.max(3, Math.min(8, Math.ceil(fileSize / (1024 * 1024) * 1.5))); // 1.5 seconds per MB
-            console.log(`File size: ${fileSizeMB} MB, Upload duration: ${uploadDuration}s`);
-            await this.simulateUploadProgress(fileSizeMB, uploadDuration);
-            
-            // Step 3: Upload completed, now waiting for server processing
-            this.updateProgress(25);
-            this.updateStatus(`📤 Upload complete! Server is processing ${fileSizeMB} MB... (this may take 30-90 seconds)`);
-            
-            // Start the actual upload (this is what takes the real time)
-            const uploadPromise = fetch(`${this.apiBaseUrl}/api/post-report/audio`, {
-                method: 'POST',
-                body: formData,
-                signal: this.abortController.signal
-            });
-            
-            // Step 4: Show server processing feedback while waiting
-            this.setStepActive('transcribe');
-            let waitingTime = 0;
-            const maxWaitTime = 120; // 2 minutes max
-            let analyzeStepActivated = false;
             
-            // Show processing feedback every 3 seconds
-            this.processingInterval = setInterval(() => {
-                waitingTime += 3;
-                const remainingEstimate = Math.max(5, 90 - waitingTime); // Estimate decreases over time
-                let progressValue;
-                
-                if (waitingTime < 30) {
-                    progressValue = 25 + (waitingTime / 60) * 35; // Progress from 25% to 60% over 60 seconds
-                    this.updateStatus(`🎤 Server processing audio (${waitingTime}s elapsed, ~${remainingEstimate}s remaining)...`);
-                } else if (waitingTime < 60) {
-                    progressValue = 35 + ((waitingTime - 30) / 30) * 25; // Progress from 35% to 60%
-                    this.updateStatus(`🎤 AI transcribing with OpenAI Whisper (${waitingTime}s elapsed, ~${remainingEstimate}s remaining)...`);
-                } else if (waitingTime < 120) {
-                    // Activate analyze step when we start AI analysis
-                    if (!analyzeStepActivated) {
-                        this.setStepActive('analyze');
-                        analyzeStepActivated = true;
-                    }
-                    // Cap the progress calculation to prevent going over 95%
-                    const analysisProgress = Math.min((waitingTime - 60) / 60, 1); // 0 to 1 over 60 seconds
-                    progressValue = 60 + (analysisProgress * 35); // Progress from 60% to 95% over 60 seconds
-                    this.updateStatus(`🧠 AI analyzing content with GPT-4 (${waitingTime}s elapsed, ~${Math.max(5, 120 - waitingTime)}s remaining)...`);
-                } else {
-                    // After 2 minutes, cap at 95% and show extended processing message
-                    if (!analyzeStepActivated) {
-                        this.setStepActive('analyze');
-                        analyzeStepActivated = true;
-                    }
-                    progressValue = 95;
-                    this.updateStatus(`🧠 AI processing taking longer than expected (${waitingTime}s elapsed)... Please wait.`);
-                }
-                
-                // Always cap progress at 95% to never exceed 100% before completion
-                this.updateProgress(Math.min(progressValue, 95));
-            }, 3000);
+            if (!upload) {
+                this.updateStatus(`📤 Starting upload of ${file.name} (${fileSizeMB} MB)...`);
+                upload = new ResumableUpload(this.apiBaseUrl, {
+                    filename: file.name,
+                    contentType: file.type,
+                    totalSize: file.size
+                });
+                this.activeUpload = upload;
+                await upload.start();
+                upload.append(file);
+            }
             
-            // Wait for the actual response
-            const response = await uploadPromise;
+            upload.onProgress = (sent, total) => {
+                const sentMB = (sent / (1024 * 1024)).toFixed(1);
+                this.updateProgress(5 + 20 * (sent / total));
+                this.updateStatus(`📤 Uploading ${sentMB}/${fileSizeMB} MB...`);
+            };
             
-            // Clean up the interval once we get a response (success or failure)
-            if (this.processingInterval) {
-                clearInterval(this.processingInterval);
-                this.processingInterval = null;
-            }
+            upload.onBusy = (seconds) => {
+                this.updateStatus(`⏳ Server is busy with other reports; retrying in ${seconds}s...`);
+            };
             
-            if (!response.ok) {
-                const errorData = await response.json().catch(() => ({}));
-                throw new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
-            }
+            // Resolves once every chunk is confirmed and the checksum matched;
+            // the backend answers with a job id and processes it in the background
+            const job = await upload.finish();
+            this.activeUpload = null;
+            console.log(`Queued AI job ${job.job_id}`);
             
-            // Get the result
-            const result = await response.json();
+            // Step 2: Upload completed, follow real server progress until the job finishes
+            this.updateProgress(25);
+            this.updateStatus(`📤 Upload complete! Server is processing ${fileSizeMB} MB...`);
+            this.setStepActive('transcribe');
+            const result = await this.waitForJob(job);
             
-            // Step 5: Complete
+            // Step 3: Complete
             this.setStepActive('complete');
             this.updateProgress(100);
             this.updateStatus('✅ AI processing complete! Filling form fields...');
             
-            // Inject the data into form fields
-            this.injectReportData(result.report_data);
+            // Inject any sections that didn't already stream in
+            this.injectNewSections(result.report_data);
             
             const totalTime = Math.ceil((Date.now() - totalStartTime) / 1000);
             this.updateStatus(`🎉 Success! Processed ${fileSizeMB} MB in ${totalTime}s. Form fields updated. ${result.mode === 'demo' ? '(Demo Mode)' : '(Real AI Processing)'}`);
             
         } catch (error) {
-            // Clean up the interval if an error occurs
-            if (this.processingInterval) {
-                clearInterval(this.processingInterval);
-                this.processingInterval = null;
+            // Stop following the job and clean up the interval if an error occurs
+            this.closeJobStream();
+            if (this.activeUpload) {
+                this.activeUpload.abort();
+                this.activeUpload = null;
             }
             
             if (error.name === 'AbortError' || error.message.includes('cancelled')) {
@@ -354,34 +561,311 @@ class AIPostReport {
         }
     }
     
-    async simulateUploadProgress(fileSizeMB, durationSeconds) {
-        const steps = Math.max(8, Math.min(25, Math.ceil(durationSeconds * 3))); // More frequent updates
-        const timePerStep = (durationSeconds * 1000) / steps;
-        const progressPerStep = 15 / steps; // Upload goes from 5% to 20%
+    async finishLiveSession(live, file) {
+        const startTime = Date.now();
+        const sizeMB = (file.size / (1024 * 1024)).toFixed(1);
+        this.liveTranscription = live;
+        this.injectedFields = new Set();
         
-        console.log(`Upload simulation: ${steps} steps, ${timePerStep}ms per step`);
+        this.setStepActive('transcribe');
+        this.updateProgress(30);
+        this.updateStatus('🎤 Transcribing the end of the session...');
         
-        for (let i = 0; i < steps; i++) {
-            // Check if we were manually aborted
-            if (this.wasManuallyAborted) {
-                throw new Error('AbortError: Upload progress terminated by user');
+        live.onMessage = (message) => {
+            if (message.type === 'status' && message.stage === 'extracting') {
+                this.setStepActive('analyze');
+                this.updateProgress(70);
+                this.updateStatus('🧠 AI analyzing content with GPT-4...');
+            } else if (message.type === 'section') {
+                // Report sections stream in while GPT is still writing the rest
+                this.injectNewSections({ [message.field]: message.text });
+                this.updateProgress(Math.min(70 + 2 * this.injectedFields.size, 95));
+            }
+        };
+        
+        try {
+            const result = await live.finish();
+            
+            this.setStepActive('complete');
+            this.updateProgress(100);
+            this.injectNewSections(result.report_data);
+            
+            const totalTime = Math.ceil((Date.now() - startTime) / 1000);
+            this.updateStatus(`🎉 Success! Processed ${sizeMB} MB recording ${totalTime}s after it ended. Form fields updated. ${result.mode === 'demo' ? '(Demo Mode)' : '(Real AI Processing)'}`);
+        } finally {
+            live.close();
+            this.liveTranscription = null;
+        }
+    }
+    
+    async toggleRecording() {
+        if (this.mediaRecorder) {
+            await this.stopRecording();
+        } else if (!this.isProcessing) {
+            await this.startRecording();
+        }
+    }
+    
+    async startRecording() {
+        this.hideError();
+        this.resetProgress();
+        this.showLiveTranscript('');
+        
+        try {
+            const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
+            const preferredType = ['audio/webm;codecs=opus', 'audio/ogg;codecs=opus', 'audio/mp4']
+                .find(type => MediaRecorder.isTypeSupported(type));
+            const recorder = new MediaRecorder(stream, preferredType ? { mimeType: preferredType } : undefined);
+            const contentType = (recorder.mimeType || preferredType || 'audio/webm').split(';')[0];
+            const extension = { 'audio/webm': 'webm', 'audio/ogg': 'ogg', 'audio/mp4': 'm4a' }[contentType] || 'webm';
+            const stamp = new Date().toISOString().slice(0, 19).replace(/[:T]/g, '-');
+            
+            // Open the upload session first so every chunk can be sent as soon as it is recorded
+            const upload = new ResumableUpload(this.apiBaseUrl, {
+                filename: `session-recording-${stamp}.${extension}`,
+                contentType
+            });
+            await upload.start();
+            
+            // Live transcription is best effort: without it the uploaded recording is processed as usual
+            let live = new LiveTranscription(this.apiBaseUrl);
+            try {
+                await live.start();
+                live.onTranscript = (transcript) => this.showLiveTranscript(transcript);
+            } catch (error) {
+                console.warn(`Live transcription unavailable: ${error.message}`);
+                live = null;
             }
             
-            const currentProgress = 5 + (i * progressPerStep);
-            const uploadedMB = ((i + 1) / steps * parseFloat(fileSizeMB)).toFixed(1);
-            const remainingTime = Math.ceil((steps - i - 1) * timePerStep / 1000);
+            this.activeUpload = upload;
+            this.liveTranscription = live;
+            this.mediaRecorder = recorder;
+            recorder.ondataavailable = (event) => {
+                upload.append(event.data);
+                if (live) live.send(event.data);
+            };
+            recorder.start(this.recordingTimeslice);
             
-            this.updateProgress(currentProgress);
+            const recordingStart = Date.now();
+            const showRecordingStatus = () => {
+                const elapsed = Math.floor((Date.now() - recordingStart) / 1000);
+                const clock = `${Math.floor(elapsed / 60)}:${String(elapsed % 60).padStart(2, '0')}`;
+                const sentMB = (upload.offset / (1024 * 1024)).toFixed(1);
+                const words = live && live.isOpen && live.transcript ? `, ${live.transcript.split(/\s+/).length} words transcribed` : '';
+                this.updateStatus(`🔴 Recording ${clock} - ${sentMB} MB already uploaded${words}. Click "Stop Recording" when the session ends.`);
+            };
+            showRecordingStatus();
+            this.recordingTimer = setInterval(showRecordingStatus, 1000);
             
-            if (remainingTime > 0) {
-                this.updateStatus(`📤 Uploading ${uploadedMB}/${fileSizeMB} MB... (${remainingTime}s remaining)`);
-                console.log(`Progress: ${currentProgress.toFixed(1)}% - ${uploadedMB}/${fileSizeMB} MB (${remainingTime}s remaining)`);
-            } else {
-                this.updateStatus(`📤 Uploading ${uploadedMB}/${fileSizeMB} MB... (finishing up)`);
-                console.log(`Progress: ${currentProgress.toFixed(1)}% - ${uploadedMB}/${fileSizeMB} MB (finishing up)`);
+            this.updateRecordButton(true);
+            this.uploadBtn.disabled = true;
+            this.uploadBtn.style.opacity = '0.7';
+        } catch (error) {
+            this.cleanupRecording();
+            if (this.liveTranscription) {
+                this.liveTranscription.close();
+                this.liveTranscription = null;
+            }
+            this.handleError(`Could not start recording: ${error.message}`);
+        }
+    }
+    
+    async stopRecording() {
+        const recorder = this.mediaRecorder;
+        const upload = this.activeUpload;
+        const live = this.liveTranscription;
+        
+        // The last dataavailable event fires before 'stop'
+        const stopped = new Promise(resolve => recorder.addEventListener('stop', resolve, { once: true }));
+        recorder.stop();
+        await stopped;
+        this.cleanupRecording();
+        
+        const recording = new File([upload.blob], upload.filename, { type: upload.contentType });
+        if (live && !live.isOpen) {
+            live.close();
+        }
+        await this.processAudioFile(recording, upload, live && live.isOpen ? live : null);
+    }
+    
+    cleanupRecording() {
+        if (this.mediaRecorder) {
+            this.mediaRecorder.stream.getTracks().forEach(track => track.stop());
+            this.mediaRecorder = null;
+        }
+        if (this.recordingTimer) {
+            clearInterval(this.recordingTimer);
+            this.recordingTimer = null;
+        }
+        this.updateRecordButton(false);
+    }
+    
+    showLiveTranscript(transcript) {
+        if (!this.liveTranscriptEl) return;
+        this.liveTranscriptEl.textContent = transcript;
+        this.liveTranscriptEl.style.display = transcript ? 'block' : 'none';
+        this.liveTranscriptEl.scrollTop = this.liveTranscriptEl.scrollHeight;
+    }
+    
+    updateRecordButton(isRecording) {
+        if (!this.recordBtn) return;
+        this.recordBtn.innerHTML = isRecording
+            ? '<i class="fas fa-stop"></i> Stop Recording'
+            : '<i class="fas fa-circle"></i> Record Session';
+        this.recordBtn.classList.toggle('btn-danger', isRecording);
+    }
+    
+    waitForJob(job) {
+        // Follow job progress over Server-Sent Events (with polling fallback).
+        // EventSource reconnects on its own and the server replays the current
+        // state on every connection, so a dropped connection loses nothing.
+        const stageSteps = {
+            queued: 'transcribe',
+            converting: 'transcribe',
+            transcribing: 'transcribe',
+            extracting: 'analyze',
+            complete: 'complete'
+        };
+        const startTime = Date.now();
+        let lastState = null;
+        this.injectedFields = new Set();
+        
+        return new Promise((resolve, reject) => {
+            let settled = false;
+            
+            const finish = (error, state) => {
+                if (settled) return;
+                settled = true;
+                this.cancelJobWait = null;
+                this.closeJobStream();
+                if (error) {
+                    reject(error);
+                } else {
+                    resolve(state);
+                }
+            };
+            
+            const showStatus = () => {
+                if (!lastState) return;
+                const elapsed = Math.round((Date.now() - startTime) / 1000);
+                switch (lastState.stage) {
+                    case 'queued':
+                        this.updateStatus(`⏳ Waiting for an available AI worker (${elapsed}s elapsed)...`);
+                        break;
+                    case 'converting':
+                        this.updateStatus(`🎵 Converting audio format (${elapsed}s elapsed)...`);
+                        break;
+                    case 'transcribing':
+                        this.updateStatus(`🎤 AI transcribing with OpenAI Whisper (${elapsed}s elapsed)...`);
+                        break;
+                    case 'extracting': {
+                        const ready = Object.keys(lastState.report_data || {}).length;
+                        const sectionsNote = ready ? `, ${ready} sections ready` : '';
+                        this.updateStatus(`🧠 AI analyzing content with GPT-4 (${elapsed}s elapsed${sectionsNote})...`);
+                        break;
+                    }
+                }
+            };
+            
+            const handleState = (state) => {
+                lastState = state;
+                
+                // Report sections stream in while GPT is still writing the rest
+                if (state.status !== 'failed') {
+                    this.injectNewSections(state.report_data);
+                }
+                
+                if (state.status === 'completed') {
+                    finish(null, state);
+                    return;
+                }
+                if (state.status === 'failed') {
+                    finish(new Error(state.error || 'AI processing failed'));
+                    return;
+                }
+                
+                const step = stageSteps[state.stage];
+                if (step) {
+                    this.setStepActive(step);
+                }
+                // Server progress (0-100) maps onto the 25%-95% band after upload
+                this.updateProgress(Math.min(25 + state.percent * 0.7, 95));
+                showStatus();
+            };
+            
+            const pollStatus = async () => {
+                try {
+                    const response = await fetch(`${this.apiBaseUrl}${job.status_url}`);
+                    if (!response.ok) {
+                        const errorData = await response.json().catch(() => ({}));
+                        throw new Error(errorData.detail || `HTTP ${response.status}: ${response.statusText}`);
+                    }
+                    handleState(await response.json());
+                } catch (error) {
+                    finish(error);
+                }
+            };
+            
+            // Refresh the elapsed time between server updates; fall back to
+            // polling when the browser has no EventSource support
+            this.cancelJobWait = () => finish(new Error('AbortError: Process was manually terminated'));
+            
+            this.processingInterval = setInterval(() => {
+                if (this.jobEventSource) {
+                    showStatus();
+                } else {
+                    pollStatus();
+                }
+            }, 3000);
+            
+            if (typeof EventSource === 'undefined') {
+                pollStatus();
+                return;
             }
             
-            await this.simulateDelay(timePerStep);
+            const source = new EventSource(`${this.apiBaseUrl}${job.events_url}`);
+            this.jobEventSource = source;
+            
+            source.addEventListener('progress', (event) => {
+                handleState(JSON.parse(event.data));
+            });
+            
+            source.onerror = () => {
+                // CLOSED means the browser gave up reconnecting (e.g. the job
+                // expired); ask the status endpoint directly for the final word
+                if (source.readyState === EventSource.CLOSED) {
+                    this.jobEventSource = null;
+                    pollStatus();
+                }
+            };
+        });
+    }
+    
+    injectNewSections(reportData) {
+        // Fill only the fields that haven't been injected for this job yet
+        if (!reportData || typeof reportData !== 'object') return;
+        
+        const fresh = {};
+        Object.keys(reportData).forEach(fieldId => {
+            if (!this.injectedFields.has(fieldId)) {
+                this.injectedFields.add(fieldId);
+                fresh[fieldId] = reportData[fieldId];
+            }
+        });
+        
+        if (Object.keys(fresh).length > 0) {
+            this.injectReportData(fresh);
+        }
+    }
+    
+    closeJobStream() {
+        if (this.jobEventSource) {
+            this.jobEventSource.close();
+            this.jobEventSource = null;
+        }
+        if (this.processingInterval) {
+            clearInterval(this.processingInterval);
+            this.processingInterval = null;
         }
     }
     
@@ -561,11 +1045,24 @@ class AIPostReport {
             this.abortController = null;
         }
         
-        // Clean up the processing interval
-        if (this.processingInterval) {
-            clearInterval(this.processingInterval);
-            this.processingInterval = null;
+        // Stop any recording or upload in progress
+        if (this.mediaRecorder) {
+            this.cleanupRecording();
+        }
+        if (this.activeUpload) {
+            this.activeUpload.abort();
+            this.activeUpload = null;
+        }
+        if (this.liveTranscription) {
+            this.liveTranscription.close();
+            this.liveTranscription = null;
+        }
+        
+        // Stop following server progress and clean up the processing interval
+        if (this.cancelJobWait) {
+            this.cancelJobWait();
         }
+        this.closeJobStream();
         
         this.isProcessing = false;
         this.updateUploadButton('Choose Audio File', false);
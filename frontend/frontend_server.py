@@ -2,15 +2,31 @@
 """
 Simple static file server for hosting the AI Post Report frontend on Render.
 This serves the index.html and static assets for the frontend.
-Force deploy: 2025-08-19 23:40
+
+Assets are read and compressed (gzip, plus brotli when the `brotli` package
+is installed) once at startup and served from memory with strong ETags.
+index.html points at a content-hashed script URL that browsers may cache
+forever; the page itself is revalidated on every load, which costs a 304.
+Set FRONTEND_WATCH=true (or pass --watch) to reload assets when they change.
 """
 
+import argparse
+import asyncio
+import gzip
+import hashlib
 import os
+import re
+from pathlib import Path
+from typing import Dict, NamedTuple
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, FileResponse, Response
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 app = FastAPI(title="AI Post Report Frontend")
 
 # Enable CORS for all origins
@@ -22,11 +38,134 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+INDEX_PATH = PROJECT_ROOT / "index.html"
+SCRIPT_PATH = PROJECT_ROOT / "frontend" / "ai-post-report-standalone.js"
+
+WATCH_ENABLED = os.getenv("FRONTEND_WATCH", "false").lower() == "true"
+# Per-request access logging goes to stdout; leave it off unless debugging
+ACCESS_LOG = os.getenv("FRONTEND_ACCESS_LOG", "false").lower() == "true"
+WATCH_INTERVAL_SECONDS = 1.0
+
+# Hashed URLs never change content, so browsers and CDNs may keep them for a year;
+# everything else is revalidated with its ETag on each use
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preferred first; identity is always available
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+class Asset(NamedTuple):
+    media_type: str
+    etag: str                   # of the uncompressed body; encoded variants add a suffix
+    bodies: Dict[str, bytes]    # content-coding ("identity", "gzip", "br") -> body
+
+def build_asset(content: bytes, media_type: str) -> Asset:
+    """Hash and precompress one asset, keeping only encodings that are smaller"""
+    bodies = {"identity": content}
+    compressed = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli:
+        compressed["br"] = brotli.compress(content, quality=11)
+    for encoding, body in compressed.items():
+        if len(body) < len(content):
+            bodies[encoding] = body
+    return Asset(media_type, hashlib.sha256(content).hexdigest()[:16], bodies)
+
+class AssetTable(NamedTuple):
+    index: Asset
+    script: Asset
+    script_name: str            # content-hashed file name of the script
+
+def load_assets() -> AssetTable:
+    """Read the page and script from disk and build the in-memory asset table"""
+    script = build_asset(SCRIPT_PATH.read_bytes(), "application/javascript; charset=utf-8")
+    hashed_script_name = f"ai-post-report-standalone.{script.etag[:10]}.js"
+
+    # Point the page's local script tags at the content-hashed URL
+    html = INDEX_PATH.read_text(encoding="utf-8")
+    html = re.sub(r'src="(/?)ai-post-report-standalone\.js"', rf'src="\g<1>{hashed_script_name}"', html)
+
+    return AssetTable(build_asset(html.encode("utf-8"), "text/html; charset=utf-8"), script, hashed_script_name)
+
+def _source_mtimes() -> tuple:
+    return tuple(path.stat().st_mtime_ns for path in (INDEX_PATH, SCRIPT_PATH))
+
+assets = load_assets()
+print(f"📦 Loaded frontend assets ({', '.join(('identity',) + ENCODINGS)}); script at /{assets.script_name}")
+
+def negotiate_encoding(accept_encoding: str, asset: Asset) -> str:
+    """Best precompressed body the client accepts (q=0 excludes a coding)"""
+    accepted = {}
+    for item in accept_encoding.lower().split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+
+    for encoding in ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0 and encoding in asset.bodies:
+            return encoding
+    return "identity"
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def serve_asset(request: Request, asset: Asset, cache_control: str) -> Response:
+    """Answer from memory: 304 when the client's copy is current, otherwise the best encoding"""
+    encoding = negotiate_encoding(request.headers.get("accept-encoding", ""), asset)
+    etag = f'"{asset.etag}"' if encoding == "identity" else f'"{asset.etag}-{encoding}"'
+    headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=asset.bodies[encoding], media_type=asset.media_type, headers=headers)
+
+async def watch_assets():
+    """Development mode: rebuild the asset table whenever index.html or the script changes"""
+    global assets
+    mtimes = _source_mtimes()
+    while True:
+        await asyncio.sleep(WATCH_INTERVAL_SECONDS)
+        try:
+            current = _source_mtimes()
+            if current != mtimes:
+                mtimes = current
+                assets = load_assets()
+                print(f"🔄 Reloaded frontend assets; script at /{assets.script_name}")
+        except OSError as e:
+            # Editors often replace files by rename; try again on the next tick
+            print(f"⚠️ Could not reload frontend assets: {e}")
+
+@app.on_event("startup")
+async def start_watcher():
+    if WATCH_ENABLED:
+        asyncio.create_task(watch_assets())
+        print("👀 Watching index.html and the frontend script for changes")
+
 # Serve static files (JS, CSS, etc.)
+@app.get("/ai-post-report-standalone.{version}.js")
+async def get_hashed_js(request: Request, version: str):
+    # A page from before a deploy may still ask for an old hash; it gets the current
+    # script, but without the immutable caching that would pin it under that URL
+    current = f"ai-post-report-standalone.{version}.js" == assets.script_name
+    return serve_asset(request, assets.script, IMMUTABLE_CACHE_CONTROL if current else REVALIDATE_CACHE_CONTROL)
+
 @app.get("/ai-post-report-standalone.js")
-async def get_js():
-    print("📁 Serving ai-post-report-standalone.js")
-    return FileResponse("frontend/ai-post-report-standalone.js", media_type="application/javascript")
+async def get_js(request: Request):
+    return serve_asset(request, assets.script, REVALIDATE_CACHE_CONTROL)
 
 @app.get("/favicon.ico")
 async def get_favicon():
@@ -34,16 +173,18 @@ async def get_favicon():
     return Response(status_code=204)
 
 # Serve the main HTML page for all routes
-@app.get("/", response_class=HTMLResponse)
-@app.get("/{path:path}", response_class=HTMLResponse)
+@app.get("/")
+@app.get("/{path:path}")
 async def serve_frontend(request: Request, path: str = ""):
     """Serve the main HTML page for all routes (SPA behavior)"""
-    print(f"📄 Serving HTML for path: {path}")
-    with open("index.html", "r", encoding="utf-8") as f:
-        html_content = f.read()
-    return HTMLResponse(content=html_content)
+    return serve_asset(request, assets.index, REVALIDATE_CACHE_CONTROL)
 
 if __name__ == "__main__":
     import uvicorn
+    parser = argparse.ArgumentParser(description="AI Post Report frontend server")
+    parser.add_argument("--watch", action="store_true", help="reload assets when index.html or the script changes")
+    args = parser.parse_args()
+    if args.watch:
+        WATCH_ENABLED = True
     port = int(os.environ.get("PORT", 8080))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(app, host="0.0.0.0", port=port, access_log=ACCESS_LOG)
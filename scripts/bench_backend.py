@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+"""
+Load-test and benchmark harness for the backend, run against a local fake
+OpenAI server (scripts/fake_openai.py) so no API credit is spent.
+
+It starts `backend.main:app` under uvicorn in a child process, pointed at
+the fake server, then pushes generated audio files of several formats and
+durations through the audio endpoint (job mode by default, following each
+job's SSE stream). For every case it reports p50/p95/p99 latency,
+requests/s, peak backend RSS, time per stage and event-loop lag per stage.
+The loop lag is sampled inside the backend process every --lag-interval-ms.
+Micro-benchmarks for format_report_text, the streamed multipart builder and
+report store search run in this process. The report store one first checks
+that a report stored after a delete is still searchable.
+
+Results are written as JSON so runs can be compared over time:
+    python scripts/bench_backend.py --formats mp3 wav --durations 30 300 \\
+        --requests 20 --concurrency 4 --latency-ms 800
+    python scripts/bench_backend.py --compare bench-results/<earlier>.json
+
+Needs ffmpeg (for generating audio) and the backend requirements.
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import urllib.parse
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+import fake_openai  # noqa: E402
+
+# Encoder settings for generated test audio (wav is mono 22 kHz so long cases stay under the upload limit)
+AUDIO_ENCODERS = {
+    "mp3": ["-ac", "2", "-ar", "44100", "-c:a", "libmp3lame", "-b:a", "128k"],
+    "m4a": ["-ac", "2", "-ar", "44100", "-c:a", "aac", "-b:a", "128k"],
+    "wav": ["-ac", "1", "-ar", "22050", "-c:a", "pcm_s16le"],
+    "ogg": ["-ac", "2", "-ar", "48000", "-c:a", "libopus", "-b:a", "96k"],
+}
+CONTENT_TYPES = {"mp3": "audio/mpeg", "m4a": "audio/mp4", "wav": "audio/wav", "ogg": "audio/ogg"}
+STAGES = ["upload", "queued", "converting", "transcribing", "extracting"]
+
+
+# ---------------------------------------------------------------------------
+# Backend child process: the app plus an event-loop lag / RSS sampler
+# ---------------------------------------------------------------------------
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_backend(port: int, lag_interval: float):
+    """Serve backend.main:app with a sampler task and a /__bench/samples route"""
+    import asyncio
+    from collections import deque
+
+    import uvicorn
+
+    import backend.main as backend_main
+
+    samples = deque(maxlen=200_000)
+
+    async def sample_loop():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(lag_interval)
+            lag = time.perf_counter() - started - lag_interval
+            samples.append((time.time(), max(lag, 0.0), current_rss_mb()))
+
+    @backend_main.app.on_event("startup")
+    async def start_sampler():
+        backend_main.app.state.bench_sampler = asyncio.create_task(sample_loop())
+
+    @backend_main.app.get("/__bench/samples")
+    async def bench_samples(since: float = 0.0):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return {
+            "samples": [sample for sample in samples if sample[0] >= since],
+            "peak_rss_mb": usage.ru_maxrss / 1024,
+            "cpu_seconds": usage.ru_utime + usage.ru_stime,
+        }
+
+    uvicorn.run(backend_main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+def generate_audio(ffmpeg: str, directory: str, fmt: str, seconds: int) -> str:
+    path = os.path.join(directory, f"bench-{seconds}s.{fmt}")
+    subprocess.run(
+        [ffmpeg, "-y", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency=220:sample_rate=48000:duration={seconds}",
+         "-f", "lavfi", "-i", f"anoisesrc=color=pink:amplitude=0.05:duration={seconds}",
+         "-filter_complex", "amix=inputs=2", *AUDIO_ENCODERS[fmt], path],
+        check=True,
+    )
+    return path
+
+
+def multipart_upload(conn: http.client.HTTPConnection, path: str, file_path: str, content_type: str) -> dict:
+    """POST a file as multipart/form-data, streaming it from disk"""
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{os.path.basename(file_path)}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode()
+    tail = f"\r\n--{boundary}--\r\n".encode()
+
+    conn.putrequest("POST", path)
+    conn.putheader("Content-Type", f"multipart/form-data; boundary={boundary}")
+    conn.putheader("Content-Length", str(len(head) + os.path.getsize(file_path) + len(tail)))
+    conn.endheaders()
+    conn.send(head)
+    with open(file_path, "rb") as audio_file:
+        while chunk := audio_file.read(256 * 1024):
+            conn.send(chunk)
+    conn.send(tail)
+
+    response = conn.getresponse()
+    body = response.read()
+    if response.status >= 400:
+        raise RuntimeError(f"{path} returned {response.status}: {body[:200]!r}")
+    return json.loads(body)
+
+
+def follow_job_events(conn: http.client.HTTPConnection, events_url: str, on_snapshot) -> dict:
+    """Read a job's SSE stream until it reaches a final status"""
+    conn.request("GET", events_url, headers={"Accept": "text/event-stream"})
+    response = conn.getresponse()
+    data_lines = []
+    while True:
+        line = response.readline()
+        if not line:
+            raise RuntimeError("Event stream closed before the job finished")
+        line = line.decode().rstrip("\r\n")
+        if line.startswith("data:"):
+            data_lines.append(line[5:].strip())
+        elif not line and data_lines:
+            snapshot = json.loads("\n".join(data_lines))
+            data_lines = []
+            on_snapshot(snapshot)
+            if snapshot.get("status") in ("completed", "failed"):
+                response.close()
+                return snapshot
+
+
+def run_one_request(base_url: str, endpoint: str, file_path: str, content_type: str) -> dict:
+    """One end-to-end request; returns latency, success flag and stage start times"""
+    parsed = urllib.parse.urlsplit(base_url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=900)
+    started = time.time()
+    stage_starts = {"upload": started}
+    try:
+        if endpoint == "sync":
+            multipart_upload(conn, "/api/post-report/audio", file_path, content_type)
+            final = {"status": "completed"}
+        else:
+            job = multipart_upload(conn, "/api/post-report/audio/jobs", file_path, content_type)
+            stage_starts["queued"] = time.time()
+
+            def on_snapshot(snapshot: dict):
+                stage = snapshot.get("stage")
+                if snapshot.get("status") == "running" and stage and stage not in stage_starts:
+                    stage_starts[stage] = time.time()
+
+            final = follow_job_events(conn, job["events_url"], on_snapshot)
+        ok = final.get("status") == "completed"
+        error = final.get("error")
+    except Exception as e:
+        ok, error = False, str(e)
+    finally:
+        conn.close()
+    finished = time.time()
+    return {"started": started, "finished": finished, "latency": finished - started,
+            "ok": ok, "error": error, "stage_starts": stage_starts}
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize_ms(values: list) -> dict:
+    return {
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p95_ms": round(percentile(values, 95) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(max(values, default=0.0) * 1000, 1),
+    }
+
+
+def stage_windows(result: dict) -> list:
+    """(stage, start, end) for each stage the request went through"""
+    ordered = sorted(result["stage_starts"].items(), key=lambda item: item[1])
+    ends = [start for _, start in ordered[1:]] + [result["finished"]]
+    return [(stage, start, end) for (stage, start), end in zip(ordered, ends)]
+
+
+def run_case(base_url: str, endpoint: str, file_path: str, fmt: str, requests: int, concurrency: int) -> dict:
+    started = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda _: run_one_request(base_url, endpoint, file_path, CONTENT_TYPES[fmt]),
+            range(requests),
+        ))
+    wall = time.time() - started
+
+    stats = fetch_backend_samples(base_url, started)
+    samples = stats["samples"]
+    windows = [window for result in results for window in stage_windows(result)]
+
+    stages = {}
+    for stage in STAGES:
+        durations = [end - start for name, start, end in windows if name == stage]
+        if not durations:
+            continue
+        spans = [(start, end) for name, start, end in windows if name == stage]
+        lags = [lag for t, lag, _ in samples if any(start <= t < end for start, end in spans)]
+        stages[stage] = {"duration": summarize_ms(durations), "loop_lag": summarize_ms(lags)}
+
+    ok = [result for result in results if result["ok"]]
+    errors = sorted({result["error"] for result in results if not result["ok"]} - {None})
+    return {
+        "format": fmt,
+        "file_mb": round(os.path.getsize(file_path) / (1024 * 1024), 2),
+        "requests": requests,
+        "concurrency": concurrency,
+        "succeeded": len(ok),
+        "failed": len(results) - len(ok),
+        "errors": errors[:10],
+        "wall_seconds": round(wall, 2),
+        "requests_per_second": round(len(ok) / wall, 3) if wall else 0.0,
+        "latency": summarize_ms([result["latency"] for result in ok]),
+        "loop_lag": summarize_ms([lag for _, lag, _ in samples]),
+        "peak_rss_mb": round(max((rss for _, _, rss in samples), default=stats["peak_rss_mb"]), 1),
+        "stages": stages,
+    }
+
+
+def fetch_backend_samples(base_url: str, since: float) -> dict:
+    parsed = urllib.parse.urlsplit(base_url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=30)
+    try:
+        conn.request("GET", f"/__bench/samples?since={since}")
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def wait_for_backend(base_url: str, process: subprocess.Popen, timeout: float = 30):
+    parsed = urllib.parse.urlsplit(base_url)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Backend exited during startup")
+        try:
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=2)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Backend did not start in time")
+
+
+# ---------------------------------------------------------------------------
+# Micro-benchmarks (run in this process)
+# ---------------------------------------------------------------------------
+
+def time_call(function, repeat: int = 5) -> dict:
+    """Best-of-`repeat` time per call, auto-scaling the loop count like `python -m timeit`"""
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {"per_call_us": round(best * 1e6, 2), "calls_per_loop": number}
+
+
+def run_micro_benchmarks(work_dir: str) -> dict:
+    import backend.main as backend_main
+
+    fields = list(backend_main.REPORT_FIELDS)
+    small_report = dict(backend_main.DEMO_REPORT_DATA)
+    large_report = fake_openai.make_report(fields, items=25)
+
+    results = {
+        "format_report_text_demo": time_call(lambda: backend_main.format_report_text(small_report)),
+        "format_report_text_25_items": time_call(lambda: backend_main.format_report_text(large_report)),
+    }
+
+    for size_mb in (1, 25):
+        file_path = os.path.join(work_dir, f"multipart-{size_mb}mb.bin")
+        with open(file_path, "wb") as data:
+            data.write(os.urandom(size_mb * 1024 * 1024))
+
+        def consume():
+            multipart = backend_main.build_multipart_body(
+                fields={"model": "whisper-1", "response_format": "text"},
+                file_field="file", file_path=file_path, filename="audio.mp3", file_content_type="audio/mpeg",
+            )
+            total = sum(len(chunk) for chunk in multipart.chunks())
+            assert total == multipart.content_length
+
+        timing = time_call(consume, repeat=3)
+        timing["mb_per_second"] = round(size_mb / (timing["per_call_us"] / 1e6), 1)
+        results[f"build_multipart_body_{size_mb}mb"] = timing
+        os.unlink(file_path)
+
+    results["report_store_search"] = report_store_benchmark(backend_main, work_dir)
+    return results
+
+
+def report_store_benchmark(backend_main, work_dir: str, reports: int = 2000) -> dict:
+    """
+    Full-text search over a seeded report store, after checking that a report
+    stored right after the newest one was deleted is still found by search
+    """
+    store = backend_main.ReportStore(
+        Path(work_dir) / "bench-reports.db", enabled=True, batch_size=200, flush_seconds=0.05, queue_size=reports + 10
+    )
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(store.start())
+        for index in range(reports):
+            store.add("upload", f"session-{index}.mp3", f"Session {index}: we discussed hiring and the marketing budget.", {})
+        newest = store.add("upload", "newest.mp3", "A report that gets deleted.", {})
+        assert loop.run_until_complete(store.delete(newest))
+        replacement = store.add("upload", "replacement.mp3", "The zebra crossing outside the clinic.", {})
+        # stop() writes out the queue; search reads the file directly
+        loop.run_until_complete(store.stop())
+        found = loop.run_until_complete(store.search("zebra"))["reports"]
+        assert [report["report_id"] for report in found] == [replacement], "report stored after a delete is not searchable"
+
+        return time_call(lambda: loop.run_until_complete(store.search("hiring budget", limit=20)))
+    finally:
+        loop.close()
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_case(case: dict):
+    latency = case["latency"]
+    print(f"{case['format']:>4} {case['duration_seconds']:>5}s ({case['file_mb']:>6.2f} MB)  "
+          f"ok {case['succeeded']}/{case['requests']}  {case['requests_per_second']:>6.2f} req/s  "
+          f"p50 {latency['p50_ms']:>8.0f} ms  p95 {latency['p95_ms']:>8.0f} ms  p99 {latency['p99_ms']:>8.0f} ms  "
+          f"peak RSS {case['peak_rss_mb']:>6.1f} MB  loop lag p99 {case['loop_lag']['p99_ms']:.1f} ms")
+    for stage, numbers in case["stages"].items():
+        print(f"        {stage:<13} p50 {numbers['duration']['p50_ms']:>8.0f} ms   "
+              f"loop lag p99 {numbers['loop_lag']['p99_ms']:>6.1f} ms  max {numbers['loop_lag']['max_ms']:>6.1f} ms")
+
+
+def compare_runs(current: dict, baseline_path: str):
+    """Print p50/p95 latency and RSS deltas against an earlier results file"""
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)
+    previous = {(case["format"], case["duration_seconds"]): case for case in baseline.get("cases", [])}
+
+    print(f"\nCompared with {baseline_path} ({baseline.get('git_commit')}, {baseline.get('timestamp')}):")
+    for case in current.get("cases", []):
+        before = previous.get((case["format"], case["duration_seconds"]))
+        if not before:
+            continue
+        deltas = []
+        for metric in ("p50_ms", "p95_ms"):
+            old, new = before["latency"][metric], case["latency"][metric]
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            deltas.append(f"{metric} {old:.0f} -> {new:.0f} ({change})")
+        deltas.append(f"peak RSS {before['peak_rss_mb']:.1f} -> {case['peak_rss_mb']:.1f} MB")
+        print(f"  {case['format']:>4} {case['duration_seconds']:>5}s  " + "  ".join(deltas))
+    for name, timing in current.get("micro", {}).items():
+        old = baseline.get("micro", {}).get(name)
+        if old:
+            print(f"  {name:<28} {old['per_call_us']:.1f} -> {timing['per_call_us']:.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", default=["mp3", "wav", "m4a"], choices=sorted(AUDIO_ENCODERS))
+    parser.add_argument("--durations", type=int, nargs="+", default=[30, 300], help="generated audio lengths in seconds")
+    parser.add_argument("--requests", type=int, default=10, help="requests per case")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight per case")
+    parser.add_argument("--endpoint", choices=["jobs", "sync"], default="jobs",
+                        help="job API with SSE (per-stage timings) or the synchronous endpoint")
+    parser.add_argument("--backend-port", type=int, default=9180)
+    parser.add_argument("--fake-port", type=int, default=9190)
+    parser.add_argument("--lag-interval-ms", type=float, default=20, help="event-loop lag sampling interval")
+    parser.add_argument("--ffmpeg", default=shutil.which("ffmpeg"), help="ffmpeg used to generate test audio")
+    parser.add_argument("--skip-load", action="store_true", help="only run the micro-benchmarks")
+    parser.add_argument("--skip-micro", action="store_true", help="only run the load test")
+    parser.add_argument("--output", help="results file (default: bench-results/bench-<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--backend-env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the backend (e.g. JOB_WORKERS=8)")
+    parser.add_argument("--verbose", action="store_true", help="show the backend's log output")
+    parser.add_argument("--serve-backend", action="store_true", help=argparse.SUPPRESS)
+    fake_openai.add_config_arguments(parser)
+    args = parser.parse_args()
+
+    if args.serve_backend:
+        run_backend(args.backend_port, args.lag_interval_ms / 1000)
+        return
+
+    timestamp = time.strftime("%Y%m%dT%H%M%S")
+    work_dir = tempfile.mkdtemp(prefix="bench-")
+    # The backend reads its config at import; keep uploads and caches out of the project tree
+    os.environ.update({"OPENAI_API_KEY": "sk-benchmark", "UPLOAD_DIR": work_dir, "CACHE_ENABLED": "false",
+                       "OPENAI_BASE_URL": f"http://127.0.0.1:{args.fake_port}/v1"})
+
+    fake_config = fake_openai.config_from_args(args)
+    report = {
+        "timestamp": timestamp,
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "endpoint": args.endpoint,
+        "fake_openai": {key: value for key, value in vars(fake_config).items() if key not in ("lock", "counts")},
+        "backend_env": args.backend_env,
+        "cases": [],
+    }
+
+    try:
+        if not args.skip_load:
+            if not args.ffmpeg:
+                parser.error("ffmpeg not found; pass --ffmpeg or use --skip-load")
+            fake_server = fake_openai.serve(args.fake_port, fake_config)
+            backend_env = {**os.environ, **dict(item.split("=", 1) for item in args.backend_env)}
+            backend = subprocess.Popen(
+                [sys.executable, __file__, "--serve-backend", "--backend-port", str(args.backend_port),
+                 "--lag-interval-ms", str(args.lag_interval_ms)],
+                env=backend_env, cwd=PROJECT_ROOT,
+                stdout=None if args.verbose else subprocess.DEVNULL,
+                stderr=None if args.verbose else subprocess.DEVNULL,
+            )
+            base_url = f"http://127.0.0.1:{args.backend_port}"
+            try:
+                wait_for_backend(base_url, backend)
+                for fmt in args.formats:
+                    for seconds in args.durations:
+                        audio_path = generate_audio(args.ffmpeg, work_dir, fmt, seconds)
+                        case = run_case(base_url, args.endpoint, audio_path, fmt, args.requests, args.concurrency)
+                        case["duration_seconds"] = seconds
+                        report["cases"].append(case)
+                        print_case(case)
+                        os.unlink(audio_path)
+            finally:
+                backend.terminate()
+                backend.wait(timeout=30)
+                fake_server.shutdown()
+            report["fake_openai_requests"] = dict(fake_config.counts)
+
+        if not args.skip_micro:
+            report["micro"] = run_micro_benchmarks(work_dir)
+            for name, timing in report["micro"].items():
+                extra = f"  ({timing['mb_per_second']} MB/s)" if "mb_per_second" in timing else ""
+                print(f"{name:<30} {timing['per_call_us']:>12.1f} us/call{extra}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = Path(args.output or PROJECT_ROOT / "bench-results" / f"bench-{timestamp}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare_runs(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
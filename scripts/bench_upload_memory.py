@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for the streaming Whisper upload.
+
+For each file size, a fresh Python process sends a generated audio file
+through backend.main.transcribe_audio to a local sink server that discards
+the body, and reports the process's peak RSS. With the streamed multipart
+body the peak should stay flat as the file grows.
+
+Usage (from the project root):
+    python scripts/bench_upload_memory.py --sizes 5 25 50 100
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+
+class SinkHandler(BaseHTTPRequestHandler):
+    """Reads and discards the request body, answers like the text transcription API"""
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        remaining = int(self.headers.get("Content-Length", 0))
+        received = 0
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            received += len(chunk)
+            remaining -= len(chunk)
+
+        body = f"received {received} bytes".encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_sink(port: int):
+    ThreadingHTTPServer(("127.0.0.1", port), SinkHandler).serve_forever()
+
+
+def run_child(file_path: str) -> dict:
+    """Upload one file through transcribe_audio and report peak RSS (runs in its own process)"""
+    import asyncio
+
+    sys.path.insert(0, str(PROJECT_ROOT))
+    import backend.main as backend_main
+
+    baseline_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    transcript = asyncio.run(backend_main.transcribe_audio(file_path))
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    return {
+        "file_mb": round(os.path.getsize(file_path) / (1024 * 1024), 1),
+        "baseline_rss_mb": round(baseline_kb / 1024, 1),
+        "peak_rss_mb": round(peak_kb / 1024, 1),
+        "upload_growth_mb": round((peak_kb - baseline_kb) / 1024, 1),
+        "seconds": round(elapsed, 2),
+        "response": transcript,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 25, 50, 100], help="file sizes in MB")
+    parser.add_argument("--port", type=int, default=9101, help="port for the local sink server")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--sink", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.sink:
+        run_sink(args.port)
+        return
+    if args.child:
+        print(json.dumps(run_child(args.child)))
+        return
+
+    sink = subprocess.Popen([sys.executable, __file__, "--sink", "--port", str(args.port)])
+    time.sleep(0.5)
+
+    env = {
+        **os.environ,
+        "OPENAI_API_KEY": "sk-benchmark",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{args.port}/v1",
+        "UPLOAD_DIR": tempfile.gettempdir(),
+    }
+
+    results = []
+    try:
+        for size_mb in args.sizes:
+            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=False) as audio_file:
+                block = os.urandom(1024 * 1024)
+                for _ in range(size_mb):
+                    audio_file.write(block)
+                file_path = audio_file.name
+
+            try:
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", file_path],
+                    env=env, capture_output=True, text=True, check=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                results.append(result)
+                print(f"{result['file_mb']:>7.1f} MB file  peak RSS {result['peak_rss_mb']:>7.1f} MB  "
+                      f"(+{result['upload_growth_mb']:.1f} MB during upload, {result['seconds']}s)")
+            finally:
+                os.unlink(file_path)
+    finally:
+        sink.terminate()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
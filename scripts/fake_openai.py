@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI endpoints the backend calls.
+
+Serves POST /v1/audio/transcriptions (text or verbose_json) and
+POST /v1/chat/completions (plain or streamed), answering with generated
+content after a configurable delay. A share of requests can be failed with
+a configurable status to exercise the upstream retry path, and a
+per-minute request limit can be enforced with OpenAI-style x-ratelimit-*
+headers and 429s. Nothing is billed and nothing leaves the machine.
+
+Usage (from the project root):
+    python scripts/fake_openai.py --port 9100 --latency-ms 800 --error-rate 0.05
+
+Then start the backend with OPENAI_BASE_URL=http://127.0.0.1:9100/v1 and
+any OPENAI_API_KEY.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the practice saw new patients this month and the team wants to grow hygiene "
+    "production while the doctor plans to add an operatory before the renewal date"
+).split()
+
+
+class FakeOpenAIConfig:
+    """Knobs shared by all handler threads"""
+
+    def __init__(
+        self,
+        latency_ms: float = 500,
+        jitter_ms: float = 100,
+        error_rate: float = 0.0,
+        error_status: int = 500,
+        transcript_words: int = 1500,
+        report_items: int = 3,
+        stream_chunk_chars: int = 16,
+        stream_interval_ms: float = 5,
+        requests_per_minute: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.transcript_words = transcript_words
+        self.report_items = report_items
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_interval_ms = stream_interval_ms
+        self.requests_per_minute = requests_per_minute
+        self.lock = threading.Lock()
+        self.counts = {"transcriptions": 0, "chat": 0, "errors": 0, "rate_limited": 0}
+        self.recent: dict = {}  # path -> timestamps of requests in the last minute
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+    def admit(self, path: str) -> tuple[bool, dict]:
+        """Sliding one-minute window per path; returns (allowed, rate-limit headers)"""
+        if not self.requests_per_minute:
+            return True, {}
+        now = time.monotonic()
+        with self.lock:
+            window = [t for t in self.recent.get(path, []) if now - t < 60]
+            allowed = len(window) < self.requests_per_minute
+            if allowed:
+                window.append(now)
+            self.recent[path] = window
+            reset = 60 - (now - window[0]) if window else 0
+        return allowed, {
+            "x-ratelimit-limit-requests": str(self.requests_per_minute),
+            "x-ratelimit-remaining-requests": str(max(0, self.requests_per_minute - len(window))),
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+        }
+
+
+def make_transcript(words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences = []
+    while words > 0:
+        length = min(words, rng.randint(8, 20))
+        sentence = " ".join(rng.choice(WORDS) for _ in range(length))
+        sentences.append(sentence.capitalize() + ".")
+        words -= length
+    return " ".join(sentences)
+
+
+def make_report(fields: list, items: int) -> dict:
+    return {
+        field: " ".join(f"[{n}] {field.replace('_', ' ')} point {n}: {make_transcript(12, n)}" for n in range(1, items + 1))
+        for field in fields
+    }
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = FakeOpenAIConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    rate_limit_headers: dict = {}
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in self.rate_limit_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        remaining = int(self.headers.get("Content-Length", 0))
+        chunks = []
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 64 * 1024))
+            if not chunk:
+                break
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def _simulate_latency(self):
+        config = self.config
+        delay = config.latency_ms + random.uniform(-config.jitter_ms, config.jitter_ms)
+        time.sleep(max(delay, 0) / 1000)
+
+    def _maybe_fail(self) -> bool:
+        if random.random() >= self.config.error_rate:
+            return False
+        self.config.count("errors")
+        body = json.dumps({"error": {"message": "Injected failure", "type": "fake_openai"}}).encode()
+        self.send_response(self.config.error_status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.config.error_status == 429:
+            self.send_header("Retry-After", "1")
+        self.end_headers()
+        self.wfile.write(body)
+        return True
+
+    def do_POST(self):
+        body = self._read_body()
+        allowed, self.rate_limit_headers = self.config.admit(self.path)
+        if not allowed:
+            self.config.count("rate_limited")
+            self._send(429, b'{"error": {"message": "Rate limit reached", "type": "requests"}}')
+            return
+        self._simulate_latency()
+        if self._maybe_fail():
+            return
+
+        if self.path.endswith("/audio/transcriptions"):
+            self.config.count("transcriptions")
+            self._transcription(body)
+        elif self.path.endswith("/chat/completions"):
+            self.config.count("chat")
+            self._chat(json.loads(body))
+        else:
+            self._send(404, b'{"error": {"message": "Not found"}}')
+
+    def _transcription(self, body: bytes):
+        text = make_transcript(self.config.transcript_words, len(body))
+        if b'name="response_format"\r\n\r\nverbose_json' in body:
+            payload = {"text": text, "segments": [{"start": 0.0, "end": 1.0, "text": text}]}
+            self._send(200, json.dumps(payload).encode())
+        else:
+            self._send(200, text.encode(), "text/plain")
+
+    def _chat(self, request: dict):
+        prompt = request["messages"][-1]["content"]
+        fields = re.findall(r'^    "(\w+)": ', prompt, re.M)
+        content = json.dumps(make_report(fields, self.config.report_items))
+
+        if not request.get("stream"):
+            payload = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+            self._send(200, json.dumps(payload).encode())
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for name, value in self.rate_limit_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        def write_chunk(data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        step = self.config.stream_chunk_chars
+        for start in range(0, len(content), step):
+            event = {"choices": [{"index": 0, "delta": {"content": content[start:start + step]}}]}
+            write_chunk(f"data: {json.dumps(event)}\n\n".encode())
+            time.sleep(self.config.stream_interval_ms / 1000)
+        write_chunk(b"data: [DONE]\n\n")
+        write_chunk(b"")
+
+
+def serve(port: int, config: FakeOpenAIConfig) -> ThreadingHTTPServer:
+    """Start the fake server on a background thread and return it"""
+    handler = type("ConfiguredFakeOpenAIHandler", (FakeOpenAIHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=500, help="base delay before each response")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="uniform +/- jitter on the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500, help="status for injected failures (429 adds Retry-After)")
+    parser.add_argument("--transcript-words", type=int, default=1500, help="words per transcription response")
+    parser.add_argument("--report-items", type=int, default=3, help="numbered items per report field")
+    parser.add_argument("--stream-chunk-chars", type=int, default=16, help="characters per streamed chat delta")
+    parser.add_argument("--stream-interval-ms", type=float, default=5, help="delay between streamed chat deltas")
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="per-endpoint request limit, answered with 429 (0 = off)")
+
+
+def config_from_args(args: argparse.Namespace) -> FakeOpenAIConfig:
+    return FakeOpenAIConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        transcript_words=args.transcript_words,
+        report_items=args.report_items,
+        stream_chunk_chars=args.stream_chunk_chars,
+        stream_interval_ms=args.stream_interval_ms,
+        requests_per_minute=args.requests_per_minute,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9100)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    server = serve(args.port, config)
+    print(f"Fake OpenAI API on http://127.0.0.1:{args.port}/v1 (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(60)
+            print(f"requests so far: {config.counts}")
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()